@@ -0,0 +1,69 @@
+"""A module to model and solve algebraic equations.
+
+Importing the package loads nothing else: each name below is imported from its
+submodule the first time it is used, and the optional heavy backends (NumPy for
+PolyArray and Template, multiprocessing for the parallel product and the
+server, concurrent.futures for the thread pools) only load when they are. A
+process that only parses and simplifies never pays for them.
+
+    >>> from pylgebra import Parser
+    >>> expr = Parser("(x + 1)^2").parse()
+
+Submodules can be imported directly too (pylgebra.operations, pylgebra.term, ...).
+"""
+import importlib
+
+
+# Public names, and the submodule each is loaded from.
+_API = {
+    "Variable": "term", "VariablePower": "term", "Term": "term",
+    "ADD": "operations", "SUB": "operations", "MULT": "operations", "DIV": "operations",
+    "POW": "operations", "substitute": "operations", "substitute_many": "operations",
+    "set_eager_folding": "operations", "get_eager_folding": "operations",
+    "Equation": "equation", "EquationError": "equation",
+    "Parser": "parser",
+    "write": "writer", "to_string": "writer",
+    "differentiate": "derivative", "Differentiator": "derivative",
+    "compile_expr": "compiler", "compile_exprs": "compiler",
+    "newton": "newton", "newton_system": "newton", "NewtonSolver": "newton", "SolveError": "newton",
+    "set_monomial_order": "order", "get_monomial_order": "order",
+    "Budget": "budget", "BudgetExceeded": "budget",
+    "set_coefficient_backend": "coefficients", "get_coefficient_backend": "coefficients",
+    "expand_multimodular": "multimodular",
+    "expand_external": "spill", "ExternalCombiner": "spill",
+    "MonomialEncoder": "monomial", "MonomialOverflow": "monomial", "PackedTerm": "monomial",
+    "plan": "planner", "simplify_for": "planner",
+    "equal": "identity", "is_zero": "identity",
+    "simplify_all": "threads", "substitute_all": "threads",
+    "groebner": "groebner", "GroebnerBasis": "groebner",
+    "PolyArray": "polyarray",
+    "Template": "template",
+    "SolveServer": "server", "SolveClient": "server", "ServerError": "server",
+}
+
+_SUBMODULES = ("budget", "coefficients", "compiler", "derivative", "equation", "groebner",
+               "identity", "monomial", "multimodular", "newton", "operations", "order", "parallel", "parser",
+               "planner", "polyarray", "server", "spill", "template", "term", "threads", "tokenlist", "writer")
+
+__all__ = sorted(_API)
+
+# Seconds a fresh interpreter may take for "from pylgebra import Parser, Term":
+# what every short-lived worker pays before its first parse. The test suite
+# checks it, and that none of the heavy optional modules were loaded.
+IMPORT_TIME_TARGET = 0.15
+
+
+def __getattr__(name):
+    module = _API.get(name)
+    if module is not None:
+        value = getattr(importlib.import_module("." + module, __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module("." + name, __name__)
+    else:
+        raise AttributeError("module {!r} has no attribute {!r}".format(__name__, name))
+    # cache it, so __getattr__ only runs on first use
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_API) | set(_SUBMODULES))
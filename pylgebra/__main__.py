@@ -0,0 +1,14 @@
+from .operations import ADD, MULT
+from .term import Variable, Term
+
+
+if __name__ == "__main__":
+    x = Variable("x")
+    t1 = Term(1)
+    t2 = Term((x, 1))
+
+    _expr = MULT(3, ADD(Term((x, 1)), 1))
+    expr = ADD(1, ADD(2, MULT(3, ADD(Term((x, 1)), 1))))
+    print(expr)
+    expr.simplify()
+    print(expr.value)
@@ -0,0 +1,100 @@
+import threading
+import time
+from contextlib import contextmanager
+
+
+class BudgetExceeded(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class Budget(object):
+    """Limits on the work one simplify or solve may do.
+
+    The work checks the budget cooperatively, between steps that leave the
+    expression consistent: an operation is either rewritten completely or left
+    as it was, so after BudgetExceeded the expression still has the same value,
+    only partly simplified.
+
+    Instance variables:
+    max_nodes -- most Terms and operations the work may produce in total
+    max_terms -- most terms any one sum may have, including the estimated size
+        of an expansion before it is started
+    deadline -- time.monotonic() time after which the work stops
+    nodes -- Terms and operations produced so far
+
+    Public methods:
+    cancel -- ask the work to stop at its next check (from any thread)
+    check -- raise BudgetExceeded if the budget has run out
+    spend -- count produced nodes, then check
+    expect -- check an expected number of terms, before producing them
+    """
+    def __init__(self, max_nodes=None, max_terms=None, deadline=None):
+        """Parameters:
+        max_nodes, max_terms -- see above; None for no limit
+        deadline -- seconds from now; None for no limit
+        """
+        self.max_nodes = max_nodes
+        self.max_terms = max_terms
+        self.deadline = time.monotonic() + deadline if deadline is not None else None
+        self.nodes = 0
+        self._cancelled = False
+
+    def cancel(self):
+        self._cancelled = True
+
+    def check(self):
+        if self._cancelled:
+            raise BudgetExceeded("cancelled")
+        if self.deadline is not None and time.monotonic() > self.deadline:
+            raise BudgetExceeded("deadline exceeded")
+
+    def spend(self, nodes=1):
+        self.nodes += nodes
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            raise BudgetExceeded("more than {} nodes".format(self.max_nodes))
+        self.check()
+
+    def expect(self, terms):
+        if self.max_terms is not None and terms > self.max_terms:
+            raise BudgetExceeded("{} terms is more than the limit of {}".format(terms, self.max_terms))
+        self.check()
+
+
+# The budget of the work running in each thread; the loops that can take long
+# look it up here rather than having it passed through every call.
+_local = threading.local()
+
+def current():
+    """Return the Budget of the work running in this thread, or None."""
+    return getattr(_local, "budget", None)
+
+@contextmanager
+def using(budget):
+    """Make budget the current Budget inside a with block (None leaves it as it is)."""
+    previous = current()
+    if budget is not None:
+        _local.budget = budget
+    try:
+        yield budget
+    finally:
+        _local.budget = previous
+
+def check():
+    """Check the current Budget, if there is one."""
+    budget = current()
+    if budget is not None:
+        budget.check()
+
+def spend(nodes=1):
+    """Charge the current Budget, if there is one."""
+    budget = current()
+    if budget is not None:
+        budget.spend(nodes)
+
+def expect(terms):
+    """Check an expected number of terms against the current Budget, if there is one."""
+    budget = current()
+    if budget is not None:
+        budget.expect(terms)
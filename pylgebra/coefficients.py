@@ -0,0 +1,201 @@
+import threading
+from contextlib import contextmanager
+from fractions import Fraction
+
+
+# Coefficient backends. Every Term does its coefficient arithmetic through the
+# selected one (see set_coefficient_backend):
+# exact -- ints, and Fractions once a division doesn't come out even; floats
+#     given as input stay floats
+# float -- everything is a float, as fast and as inexact as hardware arithmetic
+# modular -- ints modulo a prime; exact and fixed width, for multimodular
+BACKENDS = ("exact", "float", "modular")
+
+
+class ExactCoefficients(object):
+    """int and Fraction arithmetic; results that are whole numbers are always ints.
+
+    While the values stay integral no Fraction is ever made, so the common case
+    costs no more than plain int arithmetic.
+    """
+    name = "exact"
+
+    def normalize(self, c):
+        if type(c) is int:
+            return c
+        if _is_fraction(c):
+            return c.numerator if c.denominator == 1 else c
+        return c
+
+    def add(self, a, b):
+        if type(a) is int and type(b) is int:
+            return a + b
+        return self.normalize(a + b)
+
+    def multiply(self, a, b):
+        if type(a) is int and type(b) is int:
+            return a * b
+        return self.normalize(a * b)
+
+    def divide(self, a, b):
+        if type(a) is int and type(b) is int:
+            quotient, remainder = divmod(a, b)
+            return quotient if not remainder else Fraction(a, b)
+        if type(a) is float or type(b) is float:
+            return a / b
+        return self.normalize(Fraction(a) / b)
+
+    def power(self, a, exponent):
+        if type(a) is float or not _is_int(exponent):
+            return a ** exponent
+        if exponent < 0:
+            return self.normalize(Fraction(a) ** exponent)
+        return self.normalize(a ** exponent)
+
+
+class FloatCoefficients(object):
+    """float arithmetic throughout."""
+    name = "float"
+
+    def normalize(self, c):
+        return float(c)
+
+    def add(self, a, b):
+        return float(a) + float(b)
+
+    def multiply(self, a, b):
+        return float(a) * float(b)
+
+    def divide(self, a, b):
+        return float(a) / float(b)
+
+    def power(self, a, exponent):
+        return float(a) ** exponent
+
+
+class ModularCoefficients(object):
+    """Arithmetic modulo a prime; coefficients are ints in [0, modulus).
+
+    Fractions are mapped to numerator * denominator^-1. Floats are only accepted
+    when they are whole numbers.
+
+    Raises:
+    ZeroDivisionError -- dividing by a multiple of the modulus
+    """
+    name = "modular"
+
+    def __init__(self, modulus):
+        if not _is_int(modulus) or not _is_prime(modulus):
+            raise ValueError("modulus must be a prime int")
+        self.modulus = modulus
+
+    def normalize(self, c):
+        if type(c) is int:
+            return c % self.modulus
+        if _is_fraction(c):
+            return c.numerator * self._inverse(c.denominator) % self.modulus
+        if type(c) is float and c.is_integer():
+            return int(c) % self.modulus
+        raise ValueError("{} has no value modulo {}".format(c, self.modulus))
+
+    def _inverse(self, c):
+        c %= self.modulus
+        if not c:
+            raise ZeroDivisionError("{} has no inverse modulo {}".format(c, self.modulus))
+        return pow(c, self.modulus - 2, self.modulus)
+
+    def add(self, a, b):
+        return (self.normalize(a) + self.normalize(b)) % self.modulus
+
+    def multiply(self, a, b):
+        return self.normalize(a) * self.normalize(b) % self.modulus
+
+    def divide(self, a, b):
+        return self.normalize(a) * self._inverse(self.normalize(b)) % self.modulus
+
+    def power(self, a, exponent):
+        if not _is_int(exponent):
+            raise ValueError("only int powers exist modulo {}".format(self.modulus))
+        a = self.normalize(a)
+        if exponent < 0:
+            a, exponent = self._inverse(a), -exponent
+        return pow(a, exponent, self.modulus)
+
+
+def _is_prime(n):
+    """Deterministic Miller-Rabin; the bases are enough for every n below 3.3 * 10**24."""
+    if n < 2:
+        return False
+    bases = (2, 3, 5, 7, 11, 13, 17, 19, 23, 29, 31, 37, 41)
+    for p in bases:
+        if n % p == 0:
+            return n == p
+    d, s = n - 1, 0
+    while d % 2 == 0:
+        d //= 2
+        s += 1
+    for a in bases:
+        x = pow(a, d, n)
+        if x in (1, n - 1):
+            continue
+        for _ in range(s - 1):
+            x = x * x % n
+            if x == n - 1:
+                break
+        else:
+            return False
+    return True
+
+def _is_int(c):
+    return type(c) is int
+
+def _is_fraction(c):
+    return type(c) is Fraction
+
+
+_backend = ExactCoefficients()
+
+# Backends selected with using() apply to the thread that selected them only;
+# set_coefficient_backend sets the one every other thread uses.
+_local = threading.local()
+
+def _make_backend(name, modulus=None):
+    if name == "exact":
+        return ExactCoefficients()
+    if name == "float":
+        return FloatCoefficients()
+    if name == "modular":
+        return ModularCoefficients(modulus)
+    raise ValueError("unknown coefficient backend: {}".format(name))
+
+def set_coefficient_backend(name, modulus=None):
+    """Select the coefficient arithmetic of Terms: "exact", "float", or "modular" with a prime modulus.
+
+    This is the process-wide setting; set it before starting any threads. A
+    thread inside a using() block keeps the backend of that block until it ends.
+
+    Terms made before the switch keep their coefficients as they are.
+    """
+    global _backend
+    _backend = _make_backend(name, modulus)
+
+def get_coefficient_backend():
+    """Return the current backend; its name attribute is one of BACKENDS."""
+    backend = getattr(_local, "backend", None)
+    return backend if backend is not None else _backend
+
+@contextmanager
+def using(name, modulus=None):
+    """Select a backend inside a with block, for this thread only; the previous one is restored after."""
+    with _selected(_make_backend(name, modulus)) as backend:
+        yield backend
+
+@contextmanager
+def _selected(backend):
+    """Make backend this thread's backend inside a with block."""
+    previous = getattr(_local, "backend", None)
+    _local.backend = backend
+    try:
+        yield backend
+    finally:
+        _local.backend = previous
@@ -0,0 +1,102 @@
+from .operations import *
+from .operations import _operands
+from .term import Term, Variable, _is_a
+from fractions import Fraction
+
+
+def _literal(number):
+    """Python source for a coefficient or exponent."""
+    if _is_a(number, Fraction):
+        return "({}/{})".format(number.numerator, number.denominator)
+    return repr(number)
+
+def _labels(variables):
+    """Get the labels of a list of Variables or strs."""
+    labels = []
+    for var in variables:
+        if _is_a(var, Variable): labels.append(var.label)
+        elif _is_a(var, str): labels.append(var)
+        else: raise TypeError("variables must be of type Variable or str.")
+    return labels
+
+
+class _Compiler(object):
+    """Turns expression trees into the body of a Python function.
+
+    Every node is assigned to a local variable, and nodes that are structurally
+    identical share one local: a subexpression that appears many times in a tree
+    (as happens with derivatives) is only evaluated once per call.
+    """
+    def __init__(self, labels):
+        self.args = {label: "_v{}".format(i) for i, label in enumerate(labels)}
+        self.lines = []
+        self._locals = {}
+
+    def _emit(self, source):
+        name = self._locals.get(source)
+        if name is None:
+            name = "_t{}".format(len(self._locals))
+            self._locals[source] = name
+            self.lines.append("    {} = {}".format(name, source))
+        return name
+
+    def _term(self, term):
+        factors = []
+        if term.coefficient != 1 or not term.variables:
+            factors.append(_literal(term.coefficient))
+        for var in term.variables:
+            arg = self.args.get(var.base.label)
+            if arg is None:
+                raise ValueError("{} is not one of the compiled variables".format(var.base))
+            factors.append(arg if var.power == 1 else "{}**{}".format(arg, _literal(var.power)))
+        return " * ".join(factors)
+
+    def visit(self, expr):
+        """Emit the lines to compute expr; returns the name of the local holding it."""
+        # post-order over an explicit stack so long ADD chains don't recurse
+        names = {}
+        stack = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+            if _is_a(node, Term):
+                names[id(node)] = self._emit(self._term(node))
+            elif not ready:
+                stack.append((node, True))
+                for operand in _operands(node):
+                    stack.append((operand, False))
+            elif _is_a(node, POW):
+                names[id(node)] = self._emit("{} ** {}".format(names[id(node._base)], _literal(node._exponent)))
+            else:
+                a, b = (names[id(operand)] for operand in _operands(node))
+                symbol = "+" if _is_a(node, ADD) else "*" if _is_a(node, MULT) else "/"
+                names[id(node)] = self._emit("{} {} {}".format(a, symbol, b))
+        return names[id(expr)]
+
+
+def compile_exprs(exprs, variables):
+    """Compile a list of expressions into one Python function.
+
+    The function takes one argument per variable, in the given order, and returns
+    a tuple with the value of each expression. Subexpressions shared between the
+    expressions are computed once. Only arithmetic operators are used, so the
+    function works elementwise on NumPy arrays as well as on numbers.
+
+    Raises:
+    ValueError -- if an expression contains a variable not in variables
+    """
+    labels = _labels(variables)
+    compiler = _Compiler(labels)
+    results = [compiler.visit(expr) for expr in exprs]
+    source = ["def _compiled({}):".format(", ".join(compiler.args[label] for label in labels))]
+    source += compiler.lines
+    source.append("    return ({},)".format(", ".join(results)))
+    namespace = {}
+    exec("\n".join(source), namespace)
+    return namespace["_compiled"]
+
+def compile_expr(expr, variables):
+    """Compile a single expression into a Python function of the variables."""
+    compiled = compile_exprs([expr], variables)
+    def evaluate(*args):
+        return compiled(*args)[0]
+    return evaluate
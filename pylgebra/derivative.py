@@ -0,0 +1,142 @@
+from .operations import *
+from .operations import _operands, _set_operands
+from .term import Term, Variable, _is_a
+
+
+# The derivatives are built from the operands as they are, without copying
+# them: a derivative refers to its subexpression's derivative and to nodes of
+# the expression itself, and Differentiator.differentiate copies the result once.
+
+def _add(a, b):
+    """ADD a and b, dropping either one if it is 0."""
+    if _is_a(a, Term) and a.is_zero: return b
+    if _is_a(b, Term) and b.is_zero: return a
+    return ADD._join(a, b)
+
+def _mult(a, b):
+    """MULT a and b, folding 0, 1, and Term * Term."""
+    if _is_a(a, Term) and a.is_zero or _is_a(b, Term) and b.is_zero: return Term(0)
+    if _is_a(a, Term) and a.is_one: return b
+    if _is_a(b, Term) and b.is_one: return a
+    if _is_a(a, Term) and _is_a(b, Term):
+        prod = a.clone()
+        prod.multiply(b)
+        return prod
+    mult = object.__new__(MULT)
+    _set_operands(mult, (a, b))
+    return mult
+
+def _term(term, label):
+    for var in term.variables:
+        if var.base.label == label:
+            break
+    else:
+        return Term(0)
+    variables = [other.clone() for other in term.variables if other is not var]
+    return Term(term.coefficient * var.power, variables, (var.base, var.power - 1))
+
+def _rule(expr, derivatives):
+    """The derivative of an operation, given the derivatives of its operands."""
+    if _is_a(expr, ADD):
+        return _add(*derivatives)
+    if _is_a(expr, MULT):
+        # product rule: (uv)' = u'v + uv'
+        u, v = expr._multiplicand, expr._multiplier
+        du, dv = derivatives
+        return _add(_mult(du, v), _mult(u, dv))
+    if _is_a(expr, DIV):
+        # quotient rule: (u/v)' = (u'v - uv') / v^2
+        u, v = expr._dividend, expr._divisor
+        du, dv = derivatives
+        numer = _add(_mult(du, v), _mult(Term(-1), _mult(u, dv)))
+        if _is_a(numer, Term) and numer.is_zero:
+            return Term(0)
+        return DIV(numer, POW(v, 2))
+    # power rule with the chain rule: (b^n)' = n * b^(n-1) * b'
+    base, exponent = expr._base, expr._exponent
+    (inner,) = derivatives
+    if exponent == 1:
+        return inner
+    if _is_a(inner, Term) and inner.is_zero:
+        return Term(0)
+    power = base if exponent == 2 else POW(base, exponent - 1)
+    return _mult(_mult(Term(exponent), power), inner)
+
+
+class Differentiator(object):
+    """Symbolic differentiation of Terms and operations.
+
+    The tree is walked post-order with an explicit stack, so nesting of any
+    depth takes no extra Python stack. Derivatives are memoized by the
+    structure of the subexpression, across every call on the same
+    Differentiator: a subexpression that appears several times in a tree, or
+    again in another expression differentiated with respect to the same
+    variable (the residuals of a system, say), is only differentiated once.
+    The results are not simplified; trivial 0 and 1 factors are folded away.
+
+    The memo grows with every call; use one Differentiator per thread.
+
+    Public methods:
+    differentiate -- return the derivative of an expression with respect to a variable
+    """
+    def __init__(self):
+        self._shapes = {}
+        self._memo = {}
+
+    def differentiate(self, expr, variable):
+        """Return d(expr)/d(variable) as a new expression."""
+        if _is_a(variable, Variable):
+            label = variable.label
+        elif _is_a(variable, str):
+            label = variable
+        else:
+            raise TypeError("variable must be of type Variable or str.")
+        if not _is_a(expr, Term, OPERATION):
+            raise TypeError("{} must be a Term or operation to differentiate.".format(expr))
+        return self._differentiate(expr, label).clone()
+
+    def _shape(self, node, shapes):
+        """A number naming node's structure, given the numbers of its operands."""
+        if _is_a(node, Term):
+            key = (type(node.coefficient), node.coefficient,
+                   tuple(sorted((var.base.label, var.power) for var in node.variables)))
+        elif _is_a(node, POW):
+            key = (POW, shapes[id(node._base)], node._exponent)
+        else:
+            key = (type(node),) + tuple(shapes[id(operand)] for operand in _operands(node))
+        return self._shapes.setdefault(key, len(self._shapes))
+
+    def _differentiate(self, expr, label):
+        # number every node by its structure first, then differentiate only
+        # the nodes the memo doesn't already have
+        shapes = {}
+        stack = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+            if id(node) in shapes:
+                continue
+            if ready or _is_a(node, Term):
+                shapes[id(node)] = self._shape(node, shapes)
+            else:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in _operands(node))
+
+        memo = self._memo
+        stack = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+            key = (label, shapes[id(node)])
+            if key in memo:
+                continue
+            if _is_a(node, Term):
+                memo[key] = _term(node, label)
+            elif not ready:
+                stack.append((node, True))
+                stack.extend((operand, False) for operand in _operands(node))
+            else:
+                memo[key] = _rule(node, [memo[label, shapes[id(operand)]] for operand in _operands(node)])
+        return memo[label, shapes[id(expr)]]
+
+def differentiate(expr, variable):
+    """Return d(expr)/d(variable) as a new expression."""
+    return Differentiator().differentiate(expr, variable)
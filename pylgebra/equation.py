@@ -0,0 +1,223 @@
+import hashlib
+import itertools
+import math
+import string
+
+from .operations import *
+from .operations import simplify_tree, _operands, _set_operands
+from .term import Variable, Term, _is_a
+from .order import sort_terms, using as _using_order
+from .parser import Parser
+
+
+# Canonical forms sort their terms by this order whatever the current monomial
+# order is, so fingerprints don't depend on it.
+CANONICAL_ORDER = "grlex"
+
+# canonical(rename=True) tries every order of the variables its invariants can't
+# tell apart, up to this many, and keeps the smallest result.
+MAX_RENAMINGS = 720
+
+
+class EquationError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+class Equation(object):
+    def __init__(self, variables, left=None, right=None, eqn_str=None):
+        if (left is None and right is not None) or (right is None and left is not None):
+            raise EquationError("both left and right sides of equation must be provided")
+        # initialize using the given left and right sides
+        if left is not None and right is not None:
+            if not _is_a(left, Term, OPERATION) or not _is_a(right, Term, OPERATION):
+                raise TypeError("left and right must be a Term or operation")
+            self.left = left
+            self.right = right
+        elif eqn_str is not None:
+            sides = eqn_str.split("=")
+            if len(sides) != 2:
+                raise EquationError("eqn_str must contain exactly one '='")
+            self.left = Parser(sides[0]).parse()
+            self.right = Parser(sides[1]).parse()
+        else:
+            raise EquationError("must provide either left and right, or eqn_str")
+        
+        if _is_a(variables, Variable):
+            self.variables = [variables]
+        elif _is_a(variables, list):
+            self.variables = []
+            for var in variables:
+                if not _is_a(var, Variable): raise TypeError("variables must be of type Variable")
+                self.variables.append(var)
+        else:
+            raise TypeError("variables must be of type Variable")
+
+    def simplify(self):
+        if not _is_a(self.left, Term): 
+            self.left.simplify()
+            self.left = self.left.value
+
+        if not _is_a(self.right, Term): 
+            self.right.simplify()
+            self.right = self.right.value
+
+    def canonical(self, rename=False):
+        """Return the canonical form of the equation, as a new Equation "... = 0".
+
+        Equations that differ only by the order of their terms, by which side
+        terms are on, or by a constant factor have the same canonical form:
+        everything is moved to the left and simplified, the Terms are sorted by
+        CANONICAL_ORDER (any other operations that remain come after them, sorted
+        by their text), and a polynomial is divided by its leading coefficient.
+        Operations other than Terms can't be divided through, so the factor is
+        only normalized for polynomials.
+
+        With rename, the variables are renamed a, b, c, ... in an order that only
+        depends on how they are used, so equations that differ by the naming of
+        their variables agree as well. The variables of the result are the
+        renamed variables of this one, in the same order.
+        """
+        residual = ADD(self.left, MULT(-1, self.right))
+        # sums inside other operations keep the order they are simplified in
+        with _using_order(CANONICAL_ORDER):
+            simplify_tree(residual)
+        residual = residual.value
+        parts = residual.terms if _is_a(residual, ADD) else [residual]
+        unknowns = [var.label for var in self.variables]
+        labels = sorted(_labels(parts) | set(unknowns))
+        if not rename:
+            mapping = {label: label for label in labels}
+        else:
+            mapping = min((_normal_text(parts, m, unknowns), m) for m in _renamings(parts, labels, unknowns))[1]
+        left = _normal_form(parts, mapping)
+        return Equation([Variable(mapping[label]) for label in unknowns], left, Term(0))
+
+    def fingerprint(self, rename=False):
+        """Return a 128-bit fingerprint of the canonical form, as 32 hex digits.
+
+        Equations with the same canonical form (see canonical) have the same
+        fingerprint, whatever the process or platform; batches and caches can key
+        on it to simplify and solve each distinct equation once.
+        """
+        canonical = self.canonical(rename)
+        text = _equation_text(canonical.left, [var.label for var in canonical.variables])
+        return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+    def __str__(self):
+        return "{} = {} | for {}".format(self.left, self.right, ", ".join(map(str, self.variables)))
+
+
+def _labels(parts):
+    labels = set()
+    stack = list(parts)
+    while stack:
+        node = stack.pop()
+        if _is_a(node, Term):
+            labels.update(var.base.label for var in node.variables)
+        else:
+            stack.extend(_operands(node))
+    return labels
+
+def _occurrences(expr):
+    """For each variable label in expr: the number of Terms it is in, and the sum of its powers in them."""
+    occurrences = {}
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if _is_a(node, Term):
+            for var in node.variables:
+                count, total = occurrences.get(var.base.label, (0, 0))
+                occurrences[var.base.label] = (count + 1, total + var.power)
+        else:
+            stack.extend(_operands(node))
+    return occurrences
+
+def _renamed_term(term, mapping):
+    """The Term with its variables renamed and sorted by their new labels."""
+    powers = sorted((mapping[var.base.label], var.power) for var in term.variables)
+    return Term(term.coefficient, [(Variable(label), power) for label, power in powers])
+
+def _sorted(terms, others):
+    """Terms sorted by CANONICAL_ORDER, then the other operations sorted by their text."""
+    return sort_terms(terms, CANONICAL_ORDER), sorted(others, key=str)
+
+def _renamed(expr, mapping):
+    """A copy of expr with its variables renamed, and every sum in it sorted
+    again for the new names (inner sums first, since outer ones sort by text)."""
+    if _is_a(expr, Term):
+        return _renamed_term(expr, mapping)
+    expr = expr.clone()
+    # (node, whether it is directly inside a sum, whether its operands are done)
+    stack = [(expr, False, False)]
+    while stack:
+        node, in_sum, ready = stack.pop()
+        if not ready:
+            operands = [_renamed_term(op, mapping) if _is_a(op, Term) else op for op in _operands(node)]
+            _set_operands(node, operands)
+            stack.append((node, in_sum, True))
+            stack.extend((op, _is_a(node, ADD), False) for op in operands if not _is_a(op, Term))
+        elif _is_a(node, ADD) and not in_sum:
+            # the outermost ADD of a sum sorts the terms of all of its nested ADDs
+            terms = node.terms
+            terms, others = _sorted([t for t in terms if _is_a(t, Term)], [t for t in terms if not _is_a(t, Term)])
+            node._set_terms(terms + others, CANONICAL_ORDER)
+    return expr
+
+def _normal_form(parts, mapping):
+    """The sum of parts renamed by mapping, sorted and scaled (see Equation.canonical)."""
+    terms = [_renamed_term(part, mapping) for part in parts if _is_a(part, Term) and not part.is_zero]
+    others = [_renamed(part, mapping) for part in parts if not _is_a(part, Term)]
+    terms, others = _sorted(terms, others)
+    if terms and not others:
+        lead = terms[0].coefficient
+        for term in terms:
+            term.divide(lead)
+    parts = terms + others
+    if not parts:
+        return Term(0)
+    if len(parts) == 1:
+        return parts[0]
+    result = ADD._join(None, None)
+    result._set_terms(parts)
+    return result
+
+def _equation_text(left, unknowns):
+    return "{} = 0 | {}".format(left, ",".join(unknowns))
+
+def _normal_text(parts, mapping, unknowns):
+    return _equation_text(_normal_form(parts, mapping), [mapping[label] for label in unknowns])
+
+def _canonical_labels(count):
+    if count <= len(string.ascii_lowercase):
+        return list(string.ascii_lowercase[:count])
+    return ["v{}".format(i) for i in range(count)]
+
+def _renamings(parts, labels, unknowns):
+    """Candidate renamings: labels are ranked by invariants that don't depend on
+    names (where the variable is among the unknowns, the powers, degrees and
+    coefficients of the terms it is in, and how often and to what total power
+    it appears in each other part); only labels with equal invariants are
+    tried in every order."""
+    invariants = {label: [unknowns.index(label) if label in unknowns else len(unknowns)]
+                  for label in labels}
+    for part in parts:
+        if _is_a(part, Term):
+            degree = sum(var.power for var in part.variables)
+            for var in part.variables:
+                invariants[var.base.label].append((var.power, degree, len(part.variables), str(part.coefficient)))
+        else:
+            for label, occurrences in _occurrences(part).items():
+                invariants[label].append(occurrences)
+    keys = {label: repr(sorted(map(repr, invariant[1:])) + invariant[:1]) for label, invariant in invariants.items()}
+    groups = [list(group) for _, group in itertools.groupby(sorted(labels, key=keys.get), key=keys.get)]
+    count = 1
+    for group in groups:
+        count *= math.factorial(len(group))
+    names = _canonical_labels(len(labels))
+    if count > MAX_RENAMINGS:
+        # too many to try: ties keep the order of their labels
+        yield dict(zip([label for group in groups for label in group], names))
+        return
+    for orders in itertools.product(*(itertools.permutations(group) for group in groups)):
+        yield dict(zip([label for order in orders for label in order], names))
@@ -0,0 +1,527 @@
+import heapq
+from fractions import Fraction
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .operations import ADD, MULT, OPERATION, simplify_tree, _operands
+from .term import Term, Variable, _is_a
+from .equation import Equation
+from .order import ORDERS, get_monomial_order
+from .coefficients import get_coefficient_backend
+from . import budget as _budget
+
+
+# Polynomials are worked on as {exponents: coefficient}, exponents being a tuple
+# with one int per variable, in the order of the basis' variables (the first is
+# the biggest). Coefficients are Fractions (or ints), or ints modulo a prime.
+
+
+def _order_key(order):
+    """Sort key of exponent tuples for a monomial order; a bigger key is a bigger
+    monomial. Keys are flat tuples of ints, so negating them reverses the order."""
+    if order == "lex":
+        return lambda exponents: exponents
+    if order == "grlex":
+        return lambda exponents: (sum(exponents),) + exponents
+    if order == "grevlex":
+        return lambda exponents: (sum(exponents),) + tuple(-e for e in reversed(exponents))
+    raise ValueError("unknown monomial order: {}".format(order))
+
+def _divides(a, b):
+    return all(x <= y for x, y in zip(a, b))
+
+def _lcm(a, b):
+    return tuple(max(x, y) for x, y in zip(a, b))
+
+def _quotient(a, b):
+    return tuple(x - y for x, y in zip(a, b))
+
+def _times(a, b):
+    return tuple(x + y for x, y in zip(a, b))
+
+
+class _Field(object):
+    """The rationals (modulus None) or the ints modulo a prime."""
+    def __init__(self, modulus=None):
+        self.modulus = modulus
+
+    def normalize(self, c):
+        if self.modulus is not None:
+            if _is_a(c, Fraction):
+                return c.numerator * pow(c.denominator, self.modulus - 2, self.modulus) % self.modulus
+            return c % self.modulus
+        if _is_a(c, Fraction):
+            return c.numerator if c.denominator == 1 else c
+        return c
+
+    def inverse(self, c):
+        if self.modulus is not None:
+            return pow(c, self.modulus - 2, self.modulus)
+        return Fraction(1, c) if _is_a(c, int) else 1 / c
+
+    def multiply(self, a, b):
+        if self.modulus is not None:
+            return a * b % self.modulus
+        return self.normalize(a * b)
+
+    def subtract(self, a, b):
+        if self.modulus is not None:
+            return (a - b) % self.modulus
+        return self.normalize(a - b)
+
+
+def _to_polynomial(expr, variables, field):
+    """{exponents: coefficient} of a polynomial expression in variables."""
+    if _is_a(expr, Equation):
+        expr = ADD(expr.left, MULT(-1, expr.right))
+    else:
+        expr = expr.clone()
+    if not _is_a(expr, Term):
+        simplify_tree(expr)
+        expr = expr.value
+    terms = expr.terms if _is_a(expr, ADD) else [expr]
+    index = {label: i for i, label in enumerate(variables)}
+    poly = {}
+    for term in terms:
+        if not _is_a(term, Term) or _is_a(term.coefficient, float):
+            raise ValueError("{} is not a polynomial with exact coefficients".format(expr))
+        exponents = [0] * len(variables)
+        for var in term.variables:
+            if not _is_a(var.power, int) or var.power < 0 or var.base.label not in index:
+                raise ValueError("{} is not a polynomial in {}".format(term, ", ".join(variables)))
+            exponents[index[var.base.label]] = var.power
+        exponents = tuple(exponents)
+        c = field.normalize(poly.get(exponents, 0) + field.normalize(term.coefficient))
+        if c:
+            poly[exponents] = c
+        else:
+            poly.pop(exponents, None)
+    return poly
+
+def _variables_of(exprs):
+    labels = set()
+    stack = list(exprs)
+    while stack:
+        node = stack.pop()
+        if _is_a(node, Equation):
+            stack += [node.left, node.right]
+        elif _is_a(node, Term):
+            labels.update(var.base.label for var in node.variables)
+        elif _is_a(node, ADD):
+            stack += node.terms
+        else:
+            stack += _operands(node)
+    return sorted(labels)
+
+
+class _Polynomial(object):
+    """A basis element: terms sorted leading monomial first, made monic."""
+    __slots__ = ("monomials", "coefficients", "lead")
+
+    def __init__(self, poly, key, field):
+        self.monomials = sorted(poly, key=key, reverse=True)
+        inverse = field.inverse(poly[self.monomials[0]])
+        self.coefficients = [field.multiply(poly[m], inverse) for m in self.monomials]
+        self.lead = self.monomials[0]
+
+    def shifted(self, monomial):
+        """The monomials of monomial * self."""
+        return [_times(m, monomial) for m in self.monomials]
+
+
+class _Pair(object):
+    __slots__ = ("i", "j", "lcm", "degree")
+
+    def __init__(self, i, j, lcm):
+        self.i, self.j, self.lcm = i, j, lcm
+        self.degree = sum(lcm)
+
+
+def _update(basis, active, pairs, k):
+    """Add the pairs of basis element k, pruned by Buchberger's criteria
+    (Gebauer and Moeller's installation of them).
+
+    Elements whose leading monomial is a multiple of element k's stop being
+    active: they get no new pairs and are left out of the result, but the pairs
+    they already have are still reduced.
+    """
+    lead = basis[k].lead
+    new = [_Pair(i, k, _lcm(basis[i].lead, lead)) for i in range(k) if active[i]]
+    # chain criterion among the new pairs: drop (i, k) when a pair (j, k) with a
+    # strictly smaller lcm divides it, and keep one pair per equal lcm
+    kept = []
+    for p in new:
+        if any(_divides(q.lcm, p.lcm) and q.lcm != p.lcm for q in new):
+            continue
+        if any(q.lcm == p.lcm for q in kept):
+            continue
+        kept.append(p)
+    # product criterion: coprime leading monomials reduce to 0
+    kept = [p for p in kept if p.lcm != _times(basis[p.i].lead, lead)]
+    # chain criterion on the old pairs: (i, j) is redundant when lead divides its
+    # lcm and both (i, k) and (j, k) have different lcms
+    survivors = [p for p in pairs
+                 if not (_divides(lead, p.lcm) and _lcm(basis[p.i].lead, lead) != p.lcm
+                         and _lcm(basis[p.j].lead, lead) != p.lcm)]
+    for i in range(k):
+        if active[i] and _divides(lead, basis[i].lead):
+            active[i] = False
+    return survivors + kept
+
+
+class _Matrix(object):
+    """Sparse rows over monomial columns, reduced to echelon form.
+
+    Rows are {column: coefficient}; column 0 is the biggest monomial. Pivot rows
+    are monic and stored without their leading 1, and every row is reduced
+    against all pivots (not only at its leading column) before it becomes one.
+    """
+    def __init__(self, field):
+        self.field = field
+        self.pivots = {}
+
+    def reduce(self, row):
+        # columns are visited in increasing order through a heap; reducing one
+        # only changes later columns. Modular values are left unreduced until
+        # their column is visited, so the inner loop is plain int arithmetic.
+        modulus = self.field.modulus
+        pivots = self.pivots
+        heap = list(row)
+        heapq.heapify(heap)
+        pop, push = heapq.heappop, heapq.heappush
+        while heap:
+            column = pop(heap)
+            c = row[column]
+            if modulus is not None:
+                c %= modulus
+            if not c:
+                del row[column]
+                continue
+            pivot = pivots.get(column)
+            if pivot is None:
+                row[column] = c
+                continue
+            del row[column]
+            for other, value in pivot.items():
+                if other in row:
+                    row[other] -= c * value
+                else:
+                    row[other] = -c * value
+                    push(heap, other)
+        return row
+
+    def add(self, row):
+        """Reduce row; if anything is left, make it a pivot. Returns its pivot column or None."""
+        row = self.reduce(row)
+        if not row:
+            return None
+        column = min(row)
+        inverse = self.field.inverse(row.pop(column))
+        self.pivots[column] = {other: self.field.multiply(value, inverse) for other, value in row.items()}
+        return column
+
+    def row(self, column):
+        """The monic row of a pivot."""
+        row = dict(self.pivots[column])
+        row[column] = 1
+        return row
+
+
+class GroebnerBasis(object):
+    """A reduced Groebner basis of the polynomials of a system of Equations.
+
+    Built with F4: the S-polynomials of all critical pairs of the lowest degree are
+    reduced together, as the rows of one sparse matrix together with every
+    multiple of the basis that can reduce them (symbolic preprocessing). Pairs are
+    pruned with Buchberger's criteria before any of that work is done.
+
+    Instance variables:
+    variables -- labels of the variables, biggest first
+    order -- the monomial order, one of order.ORDERS
+    modulus -- the prime coefficients are taken modulo, or None for exact rationals
+    polynomials -- the basis as Terms and ADDs, leading term first, monic
+
+    Public methods:
+    reduce -- the normal form of an expression modulo the basis
+    contains -- whether an expression is in the ideal
+    eliminate -- the basis elements that only involve some of the variables
+    triangular -- the basis grouped by the variable it solves for (lex only)
+    solve -- the real solutions, by back-substitution (lex only, needs NumPy)
+    """
+    def __init__(self, polynomials, variables, order, modulus):
+        self.variables = variables
+        self.order = order
+        self.modulus = modulus
+        self._field = _Field(modulus)
+        self._key = _order_key(order)
+        self._basis = polynomials
+        self.polynomials = [_expr_of(variables, p.monomials, p.coefficients) for p in polynomials]
+
+    def reduce(self, expr):
+        """The remainder of expr divided by the basis: 0 exactly when expr is in the ideal."""
+        remainder = self._remainder(expr)
+        if not remainder:
+            return Term(0)
+        monomials = sorted(remainder, key=self._key, reverse=True)
+        return _expr_of(self.variables, monomials, [remainder[m] for m in monomials])
+
+    def contains(self, expr):
+        return not self._remainder(expr)
+
+    def _remainder(self, expr):
+        return _normal_form(_to_polynomial(expr, self.variables, self._field), self._basis, self._key, self._field)
+
+    def eliminate(self, variables):
+        """The basis elements that only involve variables; for lex order with the other
+        variables first, they generate the elimination ideal."""
+        keep = set(variables)
+        others = [i for i, label in enumerate(self.variables) if label not in keep]
+        return [expr for expr, p in zip(self.polynomials, self._basis)
+                if all(not m[i] for m in p.monomials for i in others)]
+
+    def triangular(self):
+        """The basis as a triangular system: for each variable, last first, the
+        elements whose biggest variable it is.
+
+        Returns a list of (label, [expressions]); the first group only involves
+        the last variable, and every later group adds one variable, so the system
+        can be solved by back-substitution.
+        """
+        if self.order != "lex":
+            raise ValueError("a triangular form needs a lex basis")
+        groups = {label: [] for label in self.variables}
+        for expr, p in zip(self.polynomials, self._basis):
+            first = _first_variable(p)
+            if first is None:
+                return []   # the basis is {1}: no solutions
+            groups[self.variables[first]].append(expr)
+        return [(label, groups[label]) for label in reversed(self.variables)]
+
+    def solve(self, tolerance=1e-9):
+        """The real solutions of the system, as {label: value} dicts.
+
+        The triangular form is solved last variable first: the univariate
+        polynomials of each group are solved numerically at every partial
+        solution, keeping the roots all of them share. Only systems with finitely
+        many solutions can be solved this way.
+        """
+        if numpy is None:
+            raise ImportError("solving by back-substitution needs NumPy; install numpy to use it.")
+        if self.order != "lex":
+            raise ValueError("back-substitution needs a lex basis")
+        if self.modulus is not None:
+            raise ValueError("back-substitution needs exact coefficients")
+        groups = {}
+        for p in self._basis:
+            first = _first_variable(p)
+            if first is None:
+                return []
+            groups.setdefault(first, []).append(p)
+        if len(groups) != len(self.variables):
+            raise ValueError("the system has infinitely many solutions")
+        solutions = [{}]
+        for i in reversed(range(len(self.variables))):
+            extended = []
+            for solution in solutions:
+                polys = [_univariate(p, i, solution, self.variables) for p in groups[i]]
+                polys = [p for p in polys if numpy.max(numpy.abs(p)) > tolerance]
+                if not polys:
+                    raise ValueError("the system has infinitely many solutions")
+                polys.sort(key=len)
+                for root in numpy.roots(polys[0]):
+                    if abs(root.imag) > tolerance * max(1, abs(root)):
+                        continue
+                    root = float(root.real)
+                    if all(abs(numpy.polyval(p, root)) <= tolerance * max(1, numpy.max(numpy.abs(p)))
+                           * max(1, abs(root)) ** (len(p) - 1) for p in polys[1:]):
+                        partial = dict(solution)
+                        partial[self.variables[i]] = root
+                        extended.append(partial)
+            solutions = extended
+        return solutions
+
+
+def _first_variable(p):
+    """Index of the biggest variable in p, or None if p is a constant."""
+    used = [i for m in p.monomials for i, e in enumerate(m) if e]
+    return min(used) if used else None
+
+def _expr_of(variables, monomials, coefficients):
+    terms = [Term(c, [(label, e) for label, e in zip(variables, m) if e])
+             for m, c in zip(monomials, coefficients)]
+    if len(terms) == 1:
+        return terms[0]
+    result = ADD._join(None, None)
+    result._set_terms(terms)
+    return result
+
+def _univariate(p, i, solution, variables):
+    """The coefficients (highest power first) of p in variable i, with the later
+    variables replaced by their values in solution."""
+    degree = max(m[i] for m in p.monomials)
+    coefficients = [0.0] * (degree + 1)
+    for m, c in zip(p.monomials, p.coefficients):
+        value = float(c)
+        for j in range(i + 1, len(variables)):
+            if m[j]:
+                value *= solution[variables[j]] ** m[j]
+        coefficients[degree - m[i]] += value
+    return coefficients
+
+
+def _normal_form(poly, basis, key, field):
+    """The remainder of poly ({exponents: coefficient}) divided by basis elements:
+    no monomial of it is divisible by any of their leading monomials."""
+    poly = dict(poly)
+    # biggest monomial first, through a heap of negated keys
+    heap = [(tuple(-k for k in key(m)), m) for m in poly]
+    heapq.heapify(heap)
+    remainder = {}
+    while heap:
+        lead = heapq.heappop(heap)[1]
+        c = poly.pop(lead)
+        if not c:
+            continue
+        for g in basis:
+            if _divides(g.lead, lead):
+                shift = _quotient(lead, g.lead)
+                for m, value in zip(g.monomials[1:], g.coefficients[1:]):
+                    m = _times(m, shift)
+                    if m in poly:
+                        poly[m] = field.subtract(poly[m], field.multiply(c, value))
+                    else:
+                        poly[m] = field.subtract(0, field.multiply(c, value))
+                        heapq.heappush(heap, (tuple(-k for k in key(m)), m))
+                break
+        else:
+            remainder[lead] = c
+    return remainder
+
+
+def _select(pairs):
+    """The normal strategy: every pair of the lowest lcm degree."""
+    degree = min(p.degree for p in pairs)
+    return [p for p in pairs if p.degree == degree], [p for p in pairs if p.degree != degree]
+
+def _f4(polys, key, field):
+    basis = []
+    active = []
+    pairs = []
+    for poly in polys:
+        if poly:
+            basis.append(_Polynomial(poly, key, field))
+            active.append(True)
+            pairs = _update(basis, active, pairs, len(basis) - 1)
+
+    while pairs:
+        _budget.check()
+        selected, pairs = _select(pairs)
+        # the two halves of every S-polynomial, as (shift, element)
+        rows = []
+        for p in selected:
+            for i in (p.i, p.j):
+                rows.append((_quotient(p.lcm, basis[i].lead), basis[i]))
+        # symbolic preprocessing: a reducer for every monomial a basis element divides
+        leads = {_times(shift, g.lead) for shift, g in rows}
+        monomials = set()
+        for shift, g in rows:
+            monomials.update(g.shifted(shift))
+        reducers = []
+        pending = list(monomials - leads)
+        done = set(leads)
+        reducing = [g for g, on in zip(basis, active) if on]
+        while pending:
+            m = pending.pop()
+            if m in done:
+                continue
+            done.add(m)
+            for g in reducing:
+                if _divides(g.lead, m):
+                    shift = _quotient(m, g.lead)
+                    reducers.append((shift, g))
+                    for other in g.shifted(shift)[1:]:
+                        if other not in done:
+                            monomials.add(other)
+                            pending.append(other)
+                    break
+        _budget.expect(len(monomials))
+
+        columns = sorted(monomials, key=key, reverse=True)
+        index = {m: i for i, m in enumerate(columns)}
+        matrix = _Matrix(field)
+        for shift, g in reducers:
+            matrix.add({index[m]: c for m, c in zip(g.shifted(shift), g.coefficients)})
+        known = set(matrix.pivots) | {index[m] for m in leads}
+        found = []
+        for shift, g in rows:
+            column = matrix.add({index[m]: c for m, c in zip(g.shifted(shift), g.coefficients)})
+            if column is not None and column not in known:
+                found.append(column)
+        for column in found:
+            row = matrix.row(column)
+            basis.append(_Polynomial({columns[c]: value for c, value in row.items()}, key, field))
+            active.append(True)
+            pairs = _update(basis, active, pairs, len(basis) - 1)
+    return [g for g, on in zip(basis, active) if on]
+
+def _interreduce(basis, key, field):
+    """Make a Groebner basis minimal, then reduce the tail of every element by the
+    others; returns the reduced basis, sorted by leading monomial, smallest first."""
+    # input equations never go through the matrix, so their leading monomials
+    # can still be multiples of others
+    minimal = []
+    for g in sorted(basis, key=lambda g: key(g.lead)):
+        if not any(_divides(h.lead, g.lead) for h in minimal):
+            minimal.append(g)
+    basis = minimal
+    reduced = []
+    for g in basis:
+        others = [h for h in basis if h is not g]
+        tail = dict(zip(g.monomials[1:], g.coefficients[1:]))
+        remainder = _normal_form(tail, others, key, field)
+        remainder[g.lead] = g.coefficients[0]
+        reduced.append(_Polynomial(remainder, key, field))
+    return sorted(reduced, key=lambda g: key(g.lead))
+
+
+def groebner(equations, variables=None, order=None, modulus=None):
+    """Compute the reduced Groebner basis of a system of Equations or polynomial expressions.
+
+    Parameters:
+    equations -- Equations (left - right is used) or Terms and operations
+    variables -- Variables or labels, biggest first; defaults to all the labels, sorted
+        (so x > y > z, like the monomial orders of simplified sums)
+    order -- one of order.ORDERS; defaults to the current monomial order. Use "lex"
+        to eliminate variables and get a triangular system
+    modulus -- a prime to work modulo; defaults to the modulus of the modular
+        coefficient backend when it is selected, otherwise the rationals
+
+    Raises:
+    ValueError -- if an expression is not a polynomial with exact coefficients
+    BudgetExceeded -- if the current budget.Budget runs out
+    """
+    if _is_a(equations, Equation, Term, *OPERATION):
+        equations = [equations]
+    for eqn in equations:
+        if not _is_a(eqn, Equation, Term, *OPERATION):
+            raise TypeError("{} must be an Equation, Term or operation.".format(eqn))
+    if variables is None:
+        variables = _variables_of(equations)
+    else:
+        variables = [var.label if _is_a(var, Variable) else var for var in variables]
+    order = order or get_monomial_order()
+    if order not in ORDERS:
+        raise ValueError("unknown monomial order: {}".format(order))
+    if modulus is None:
+        backend = get_coefficient_backend()
+        if backend.name == "float":
+            raise ValueError("a Groebner basis needs exact or modular coefficients")
+        modulus = getattr(backend, "modulus", None)
+    field = _Field(modulus)
+    key = _order_key(order)
+    polys = [_to_polynomial(eqn, variables, field) for eqn in equations]
+    basis = _interreduce(_f4(polys, key, field), key, field)
+    return GroebnerBasis(basis, variables, order, modulus)
@@ -0,0 +1,241 @@
+import math
+import random
+from fractions import Fraction
+
+from .operations import ADD, MULT, DIV, POW, OPERATION, simplify_tree, _operands
+from .term import Term, _is_a
+from .coefficients import _is_prime
+
+
+# Evaluations are done modulo random primes of this many bits, a new one for
+# every point. A nonzero polynomial of degree d vanishes at a random point with
+# probability at most d / prime (Schwartz-Zippel), so every evaluation that
+# agrees makes a false "equal" that much less likely. A fresh prime each time
+# also keeps a difference whose coefficients happen to be multiples of one
+# prime from looking like 0.
+PRIME_BITS = 61
+
+# Default bound on the probability that equal() says two different expressions are equal.
+ERROR = 2.0 ** -64
+
+# Expressions with at most this many Terms, and no products, quotients or powers
+# to multiply out, are compared exactly instead: combining their like terms is
+# cheaper than evaluating them a few times.
+STRUCTURAL_LIMIT = 64
+
+# Points tried before giving up on finding one where no divisor is 0.
+MAX_ATTEMPTS = 32
+
+
+class _NotModular(Exception):
+    """The expression has a float or an exponent that isn't an int; it has no value modulo a prime."""
+
+
+def _random_prime(rng):
+    while True:
+        n = rng.getrandbits(PRIME_BITS - 1) | (1 << (PRIME_BITS - 1)) | 1
+        if _is_prime(n):
+            return n
+
+def _residue(c, prime):
+    if type(c) is int:
+        return c % prime
+    if _is_a(c, Fraction):
+        if not c.denominator % prime:
+            raise _NotModular()
+        return c.numerator * pow(c.denominator, -1, prime) % prime
+    if _is_a(c, float) and c.is_integer():
+        return int(c) % prime
+    raise _NotModular()
+
+def _exponent(e):
+    if type(e) is int:
+        return e
+    if _is_a(e, float, Fraction) and e == int(e):
+        return int(e)
+    raise _NotModular()
+
+def _power(value, e, prime):
+    if e < 0:
+        if not value:
+            raise ZeroDivisionError()
+        return pow(pow(value, -1, prime), -e, prime)
+    return pow(value, e, prime)
+
+def _evaluate(expr, point, prime):
+    """The value of expr modulo prime, with every variable label at its value in point.
+
+    Raises ZeroDivisionError if a divisor is 0 at the point.
+    """
+    values = {}
+    stack = [(expr, False)]
+    while stack:
+        node, ready = stack.pop()
+        if id(node) in values:
+            continue
+        if _is_a(node, Term):
+            value = _residue(node.coefficient, prime)
+            for var in node.variables:
+                value = value * _power(point[var.base.label], _exponent(var.power), prime) % prime
+            values[id(node)] = value
+            continue
+        children = node.terms if _is_a(node, ADD) else _operands(node)
+        if not ready:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children)
+            continue
+        operands = [values[id(child)] for child in children]
+        if _is_a(node, ADD):
+            value = sum(operands) % prime
+        elif _is_a(node, MULT):
+            value = operands[0] * operands[1] % prime
+        elif _is_a(node, DIV):
+            if not operands[1]:
+                raise ZeroDivisionError()
+            value = operands[0] * pow(operands[1], -1, prime) % prime
+        else:
+            value = _power(operands[0], _exponent(node._exponent), prime)
+        values[id(node)] = value
+    return values[id(expr)]
+
+def _degrees(expr):
+    """Bounds on the degrees of the numerator and denominator of expr as one fraction,
+    plus the labels of its variables."""
+    degrees = {}
+    labels = set()
+    stack = [(expr, False)]
+    while stack:
+        node, ready = stack.pop()
+        if id(node) in degrees:
+            continue
+        if _is_a(node, Term):
+            powers = [_exponent(var.power) for var in node.variables]
+            labels.update(var.base.label for var in node.variables)
+            degrees[id(node)] = (sum(p for p in powers if p > 0), -sum(p for p in powers if p < 0))
+            continue
+        children = node.terms if _is_a(node, ADD) else _operands(node)
+        if not ready:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children)
+            continue
+        operands = [degrees[id(child)] for child in children]
+        if _is_a(node, ADD):
+            # a/b + c/d = (ad + bc) / bd, over all the terms
+            den = sum(d for _, d in operands)
+            num = max(n + den - d for n, d in operands)
+        elif _is_a(node, MULT):
+            num, den = operands[0][0] + operands[1][0], operands[0][1] + operands[1][1]
+        elif _is_a(node, DIV):
+            num, den = operands[0][0] + operands[1][1], operands[0][1] + operands[1][0]
+        else:
+            e = _exponent(node._exponent)
+            num, den = operands[0]
+            num, den = (num * e, den * e) if e >= 0 else (den * -e, num * -e)
+        degrees[id(node)] = (num, den)
+    return degrees[id(expr)], labels
+
+def _structural(expr):
+    """expr with its like terms combined, if that is cheap (see STRUCTURAL_LIMIT); otherwise None."""
+    if _is_a(expr, Term):
+        return expr
+    if not _is_a(expr, ADD):
+        return None
+    terms = expr.terms
+    if len(terms) > STRUCTURAL_LIMIT or not all(_is_a(term, Term) for term in terms):
+        return None
+    expr = expr.clone()
+    simplify_tree(expr)
+    return expr.value
+
+def _exactly_equal(a, b):
+    """The exact answer, by simplifying (multiplying out) both.
+
+    Sums raised to powers that aren't non-negative ints can't be multiplied
+    out; such expressions are only known to be equal when they are the same tree.
+    """
+    try:
+        simplified = []
+        for expr in (a, b):
+            expr = expr.clone()
+            if not _is_a(expr, Term):
+                simplify_tree(expr)
+                expr = expr.value
+            simplified.append(expr)
+        return _difference_is_zero(*simplified)
+    except (NotImplementedError, ValueError):
+        if a == b:
+            return True
+        raise ValueError("can't decide whether {} and {} are equal: they have no value modulo "
+                         "a prime and can't be simplified".format(a, b))
+
+def _difference_is_zero(a, b):
+    difference = ADD(a, MULT(-1, b))
+    simplify_tree(difference)
+    difference = difference.value
+    return _is_a(difference, Term) and difference.is_zero
+
+def equal(a, b, error=ERROR, rng=None, prime=None):
+    """Return True if the expressions a and b are (almost certainly) equal.
+
+    Small sums of Terms are compared exactly. Anything else is evaluated at random
+    points modulo random primes, through the tree as it is, without multiplying
+    anything out. Different values prove a and b different; equal values are repeated at
+    new points until the chance that a and b differ anyway (Schwartz-Zippel,
+    degree / prime per point) is below error. False is always right; True is
+    wrong with probability at most error.
+
+    Expressions with float coefficients or exponents that aren't ints have no
+    value modulo a prime; they are compared by simplifying both instead.
+
+    rng -- a random.Random to draw the points and primes from (for repeatable results)
+    prime -- evaluate modulo this prime every time rather than random ones
+
+    Raises:
+    ValueError -- if a or b has no value modulo a prime and can't be simplified
+        either (e.g. (x + 1)^0.5), unless they are the same tree (then they are equal)
+    """
+    for expr in (a, b):
+        if not _is_a(expr, Term, OPERATION):
+            raise TypeError("{} must be a Term or operation to compare.".format(expr))
+    if not 0 < error < 1:
+        raise ValueError("error must be in (0, 1)")
+    small_a, small_b = _structural(a), _structural(b)
+    if small_a is not None and small_b is not None:
+        return _difference_is_zero(small_a, small_b)
+    try:
+        ((num_a, den_a), labels_a), ((num_b, den_b), labels_b) = _degrees(a), _degrees(b)
+    except _NotModular:
+        return _exactly_equal(a, b)
+    # a - b = (na * db - nb * da) / (da * db)
+    degree = max(num_a + den_b, num_b + den_a)
+    labels = sorted(labels_a | labels_b)
+    smallest = prime or 1 << (PRIME_BITS - 1)
+    if degree == 0 or not labels:
+        trials = 1
+    elif degree >= smallest:
+        return _exactly_equal(a, b)
+    else:
+        trials = max(1, math.ceil(math.log(error) / math.log(degree / smallest)))
+    rng = rng or random.Random()
+    attempts = 0
+    while trials:
+        prime_ = prime or _random_prime(rng)
+        point = {label: rng.randrange(prime_) for label in labels}
+        try:
+            value_a, value_b = _evaluate(a, point, prime_), _evaluate(b, point, prime_)
+        except ZeroDivisionError:
+            # a divisor vanishes here, which only happens on a few points; try another
+            attempts += 1
+            if attempts >= MAX_ATTEMPTS:
+                raise ZeroDivisionError("a divisor is 0 at every point tried")
+            continue
+        except _NotModular:
+            return _exactly_equal(a, b)
+        if value_a != value_b:
+            return False
+        trials -= 1
+    return True
+
+def is_zero(expr, error=ERROR, rng=None, prime=None):
+    """Return True if expr is (almost certainly) 0 everywhere; see equal."""
+    return equal(expr, Term(0), error, rng, prime)
@@ -0,0 +1,199 @@
+from .term import Term, Variable, _is_a
+from . import budget
+
+
+class MonomialOverflow(OverflowError):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class VariableIndex(object):
+    """Interns variables as small integers: the slot each variable gets in a packed monomial.
+
+    The first Variable seen for a label is kept, so unpacked Terms share it
+    (and its value) with the Terms that were packed.
+    """
+    def __init__(self, variables=()):
+        self.variables = []
+        self._index = {}
+        for var in variables:
+            self.index(var)
+
+    def index(self, variable):
+        """Return the slot of a Variable (or label), giving it the next free one if new."""
+        label = variable.label if _is_a(variable, Variable) else variable
+        i = self._index.get(label)
+        if i is None:
+            i = self._index[label] = len(self.variables)
+            self.variables.append(variable if _is_a(variable, Variable) else Variable(label))
+        return i
+
+    def __len__(self):
+        return len(self.variables)
+
+
+class MonomialEncoder(object):
+    """Packs the exponents of a monomial into a single integer (Kronecker substitution).
+
+    Variable i of the VariableIndex owns bits [i*(bits+1), (i+1)*(bits+1)) of the
+    packed integer: bits for its exponent plus one guard bit above them. Multiplying
+    two monomials is then one integer addition, and two monomials are alike when
+    their integers are equal. A product whose exponent no longer fits carries
+    into a guard bit, which multiply checks for.
+
+    While (bits + 1) * (number of variables) <= 63 the packed values are machine
+    size (see machine_size); past that they are simply bigger Python ints.
+    Exponents must be in [0, 2**bits); Terms with negative exponents can't be packed.
+
+    Public methods:
+    encode -- pack a Term's variables
+    decode -- unpack to a list of (Variable, power)
+    multiply -- multiply two packed monomials, checking for overflow
+    """
+    def __init__(self, bits=8, index=None):
+        if not _is_a(bits, int) or bits < 1:
+            raise ValueError("bits must be a positive int")
+        self.bits = bits
+        self.index = index if index is not None else VariableIndex()
+        self._width = bits + 1
+        self._limit = 1 << bits
+        self._mask = self._limit - 1
+        self._guards = (0, 0)
+
+    @property
+    def machine_size(self):
+        return self._width * len(self.index) <= 63
+
+    def _guard_mask(self):
+        count, mask = self._guards
+        if count != len(self.index):
+            mask = 0
+            for i in range(len(self.index)):
+                mask |= self._limit << (i * self._width)
+            self._guards = (len(self.index), mask)
+        return mask
+
+    def encode(self, term):
+        """Return the packed monomial of term's variables.
+
+        Raises:
+        MonomialOverflow -- if an exponent is negative or needs more than bits bits
+        """
+        packed = 0
+        for var in term.variables:
+            power = var.power
+            if not _is_a(power, int) or not 0 <= power < self._limit:
+                raise MonomialOverflow("{} can't be packed in {} bits".format(var, self.bits))
+            packed += power << (self.index.index(var.base) * self._width)
+        return packed
+
+    def decode(self, packed):
+        """Return the (Variable, power) pairs of a packed monomial."""
+        powers = []
+        i = 0
+        while packed:
+            power = packed & self._mask
+            if power:
+                powers.append((self.index.variables[i], power))
+            packed >>= self._width
+            i += 1
+        return powers
+
+    def multiply(self, a, b):
+        """Multiply two packed monomials.
+
+        Raises:
+        MonomialOverflow -- if an exponent of the product needs more than bits bits
+        """
+        product = a + b
+        if product & self._guard_mask():
+            raise MonomialOverflow("exponent overflow multiplying packed monomials")
+        return product
+
+
+class PackedTerm(object):
+    """A Term whose variables are packed into one integer by a MonomialEncoder.
+
+    Public methods:
+    from_term -- (classmethod) pack a Term
+    to_term -- unpack to a Term
+    like_term -- True if other has the same variables and powers (one integer compare)
+    add -- add a like PackedTerm's coefficient to this one
+    multiply -- multiply by another PackedTerm (one integer add)
+    """
+    def __init__(self, coefficient, monomial, encoder):
+        self.coefficient = coefficient
+        self.monomial = monomial
+        self.encoder = encoder
+
+    @classmethod
+    def from_term(cls, term, encoder):
+        return cls(term.coefficient, encoder.encode(term), encoder)
+
+    def to_term(self):
+        return Term(self.coefficient, self.encoder.decode(self.monomial))
+
+    def like_term(self, other):
+        return self.monomial == other.monomial
+
+    def add(self, other):
+        """Raises ValueError if other is not a like term."""
+        if self.monomial != other.monomial:
+            raise ValueError("{} and {} are not like terms".format(self, other))
+        self.coefficient += other.coefficient
+
+    def multiply(self, other):
+        """Raises MonomialOverflow if an exponent no longer fits (see MonomialEncoder)."""
+        self.monomial = self.encoder.multiply(self.monomial, other.monomial)
+        self.coefficient *= other.coefficient
+
+    def __eq__(self, other):
+        if not _is_a(other, PackedTerm): return False
+        return self.monomial == other.monomial and self.coefficient == other.coefficient
+
+    def __str__(self):
+        return str(self.to_term())
+
+
+def encoder_for_product(terms_a, terms_b):
+    """Return a MonomialEncoder wide enough that no product of the two sums overflows.
+
+    Returns None if some Term can't be packed (it has a negative or fractional
+    exponent); callers then fall back to multiplying Terms directly.
+    """
+    highest = []
+    for terms in (terms_a, terms_b):
+        top = 0
+        for term in terms:
+            for var in term.variables:
+                if not _is_a(var.power, int) or var.power < 0:
+                    return None
+                top = max(top, var.power)
+        highest.append(top)
+    return MonomialEncoder(max(8, (highest[0] + highest[1]).bit_length()))
+
+def multiply_terms(terms_a, terms_b):
+    """Multiply two sums of Terms using packed monomials; returns the list of product Terms.
+
+    Like terms are combined (keyed on the packed integer) and zero terms dropped.
+    The coefficients are multiplied and summed as plain numbers and only reduced
+    by the coefficient backend once, when the product Terms are made.
+    Returns None if the Terms can't be packed (see encoder_for_product).
+    """
+    encoder = encoder_for_product(terms_a, terms_b)
+    if encoder is None:
+        return None
+    packed_b = [(term.coefficient, encoder.encode(term)) for term in terms_b]
+    products = {}
+    for term in terms_a:
+        budget.check()
+        coefficient_a, monomial_a = term.coefficient, encoder.encode(term)
+        for coefficient_b, monomial_b in packed_b:
+            monomial = monomial_a + monomial_b
+            products[monomial] = products.get(monomial, 0) + coefficient_a * coefficient_b
+    # Terms reduce their coefficients by the backend, which may leave more zeros
+    # (see coefficients)
+    terms = [Term(coefficient, encoder.decode(monomial))
+             for monomial, coefficient in products.items() if coefficient != 0]
+    return [term for term in terms if not term.is_zero]
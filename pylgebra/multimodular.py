@@ -0,0 +1,116 @@
+from . import coefficients
+from .coefficients import _is_prime
+from .operations import ADD, DIV, POW, OPERATION, _operands
+from .term import Term, _is_a
+
+
+# Bits of the primes expand_multimodular works modulo; every residue, and the
+# product of two of them, stays within fixed-width (64 and 128 bit) arithmetic.
+PRIME_BITS = 62
+
+
+def primes(bits=PRIME_BITS):
+    """Generate the primes below 2**bits, largest first."""
+    n = (1 << bits) - 1
+    while n > 2:
+        if _is_prime(n):
+            yield n
+        n -= 2
+
+def _monomial(term):
+    return tuple(sorted((var.base.label, var.power) for var in term.variables))
+
+def _check_integral(expr):
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if _is_a(node, Term):
+            if type(node.coefficient) is not int:
+                raise ValueError("{} doesn't have an int coefficient".format(node))
+            for var in node.variables:
+                if not _is_a(var.power, int) or var.power < 0:
+                    raise ValueError("{} is not a polynomial term".format(node))
+        elif _is_a(node, ADD):
+            stack.extend(node.terms)
+        elif _is_a(node, DIV):
+            raise ValueError("{} is a quotient, not a polynomial".format(node))
+        else:
+            if _is_a(node, POW) and (not _is_a(node._exponent, int) or node._exponent < 0):
+                raise ValueError("{} is not a polynomial power".format(node))
+            stack.extend(_operands(node))
+
+def _expand_modulo(expr, prime):
+    """Simplify a copy of expr modulo prime; returns {monomial: (residue, Term)}."""
+    with coefficients.using("modular", prime):
+        result = expr.clone()
+        result.simplify()
+        result = result.value
+    terms = result.terms if _is_a(result, ADD) else [result]
+    residues = {}
+    for term in terms:
+        if not _is_a(term, Term):
+            raise ValueError("{} does not simplify to a polynomial".format(expr))
+        if not term.is_zero:
+            residues[_monomial(term)] = (term.coefficient, term)
+    return residues
+
+def _symmetric(value, modulus):
+    """The representative of value modulo modulus closest to 0."""
+    return value - modulus if value > modulus // 2 else value
+
+def expand_multimodular(expr, bound=None, max_primes=64):
+    """Multiply out a polynomial with int coefficients modulo several primes, and
+    rebuild the int coefficients by Chinese remaindering.
+
+    Every modular expansion only works with residues below 2**PRIME_BITS, however
+    big the true coefficients get. With bound (the largest absolute value any
+    coefficient of the result can have) just enough primes are used to cover
+    it. Without, primes are added until the reconstruction stops changing, which
+    is right unless a coefficient happens to match by chance in the last prime.
+
+    Returns a Term or an ADD of Terms, sorted like any simplified sum.
+
+    Raises:
+    ValueError -- if expr has a coefficient that is not an int, doesn't simplify
+        to a polynomial, or needs more than max_primes primes
+    """
+    if not _is_a(expr, Term, OPERATION):
+        raise TypeError("{} must be a Term or operation to expand.".format(expr))
+    _check_integral(expr)
+    coefficients_ = {}
+    templates = {}
+    modulus = 1
+    previous = None
+    for count, prime in enumerate(primes(), 1):
+        if count > max_primes:
+            raise ValueError("no stable reconstruction with {} primes".format(max_primes))
+        residues = _expand_modulo(expr, prime)
+        # Chinese remaindering, one prime at a time: keep c = r (mod prime) and
+        # c = coefficients_[m] (mod modulus)
+        inverse = pow(modulus % prime, prime - 2, prime)
+        for monomial in set(coefficients_) | set(residues):
+            residue, term = residues.get(monomial, (0, None))
+            if term is not None:
+                templates.setdefault(monomial, term)
+            c = coefficients_.get(monomial, 0)
+            coefficients_[monomial] = c + modulus * ((residue - c) * inverse % prime)
+        modulus *= prime
+        current = {monomial: _symmetric(c, modulus) for monomial, c in coefficients_.items()}
+        current = {monomial: c for monomial, c in current.items() if c}
+        if bound is not None:
+            if modulus > 2 * bound:
+                break
+        elif current == previous:
+            break
+        previous = current
+
+    terms = [Term(c, [var.clone() for var in templates[monomial].variables])
+             for monomial, c in current.items()]
+    if not terms:
+        return Term(0)
+    if len(terms) == 1:
+        return terms[0]
+    result = ADD._join(None, None)
+    result._set_terms(terms)
+    result.simplify()
+    return result
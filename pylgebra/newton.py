@@ -0,0 +1,207 @@
+from .operations import *
+from .term import Term, _is_a
+from .equation import Equation
+from .compiler import compile_exprs, _labels
+from .derivative import Differentiator
+from . import budget as _budget
+
+
+class SolveError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+def _residual(equation):
+    """left - right, without simplifying (the result is only compiled)."""
+    if not _is_a(equation, Equation):
+        raise TypeError("{} must be of type Equation to solve.".format(equation))
+    return ADD(equation.left, MULT(-1, equation.right))
+
+def _linear_solve(matrix, rhs):
+    """Solve matrix * x = rhs by Gaussian elimination with partial pivoting."""
+    n = len(rhs)
+    rows = [list(row) + [value] for row, value in zip(matrix, rhs)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        if rows[pivot][col] == 0:
+            raise SolveError("Jacobian is singular")
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        for r in range(col + 1, n):
+            factor = rows[r][col] / rows[col][col]
+            if factor:
+                for c in range(col, n + 1):
+                    rows[r][c] -= factor * rows[col][c]
+    x = [0.0] * n
+    for r in range(n - 1, -1, -1):
+        total = rows[r][n] - sum(rows[r][c] * x[c] for c in range(r + 1, n))
+        x[r] = total / rows[r][r]
+    return x
+
+
+class NewtonSolver(object):
+    """Numeric root finding for one Equation, or a square system of Equations.
+
+    The residuals (left - right) and their symbolic derivatives are compiled into
+    a single Python function when the solver is created; each iteration is then
+    one call to it. The solver differentiates every residual with one
+    derivative.Differentiator, so derivatives of subexpressions shared across
+    the system are computed once.
+
+    Public methods:
+    solve -- iterate from one starting point; returns the root(s)
+    solve_many -- solve from many starting points; returns a list of roots (None
+        for starting points that didn't converge)
+
+    Properties:
+    variables -- labels of the unknowns, in the order the roots are returned
+    """
+    def __init__(self, equations, variables=None, tolerance=1e-12, max_iterations=50, damping=1.0,
+                 budget=None):
+        """Compile the residuals and Jacobian of equations.
+
+        Parameters:
+        equations -- an Equation, or a list of Equations
+        variables -- the unknowns to solve for, as Variables or labels; defaults to
+            the variables of the equations
+        tolerance -- stop when a step or every residual is at most this big
+        max_iterations -- give up (SolveError) after this many steps
+        damping -- fraction (0, 1] of each Newton step to take
+        budget -- optional budget.Budget, checked while the derivatives are built
+            and at every iteration; BudgetExceeded is raised when it runs out
+        """
+        if _is_a(equations, Equation):
+            equations = [equations]
+        if variables is None:
+            variables = []
+            for equation in equations:
+                variables += [var for var in equation.variables if var not in variables]
+        self.variables = _labels(variables)
+        if len(self.variables) != len(equations):
+            raise SolveError("need as many equations as unknowns; got {} and {}".format(
+                len(equations), len(self.variables)))
+        if not 0 < damping <= 1:
+            raise ValueError("damping must be in (0, 1]")
+        self.tolerance = tolerance
+        self.max_iterations = max_iterations
+        self.damping = damping
+        self.budget = budget
+
+        with _budget.using(budget):
+            differentiator = Differentiator()
+            residuals = [_residual(equation) for equation in equations]
+            jacobian = []
+            for residual in residuals:
+                for label in self.variables:
+                    _budget.check()
+                    jacobian.append(differentiator.differentiate(residual, label))
+            self._residuals = compile_exprs(residuals, self.variables)
+            self._system = compile_exprs(residuals + jacobian, self.variables)
+
+    def _check(self):
+        if self.budget is not None:
+            self.budget.check()
+
+    def solve(self, start):
+        """Iterate from start (a number, or one number per unknown).
+
+        Returns a number for a single unknown, otherwise a list of numbers.
+
+        Raises:
+        SolveError -- if the Jacobian is singular or there is no convergence
+        BudgetExceeded -- if the solver's budget runs out (see budget.Budget)
+        """
+        single = len(self.variables) == 1
+        x = [float(start)] if single else [float(value) for value in start]
+        n = len(x)
+        for _ in range(self.max_iterations):
+            self._check()
+            try:
+                values = self._system(*x)
+            except ZeroDivisionError:
+                raise SolveError("residual is undefined at {}".format(x))
+            except OverflowError:
+                raise SolveError("diverged: residual overflows at {}".format(x))
+            residuals, jacobian = values[:n], values[n:]
+            if max(abs(value) for value in residuals) <= self.tolerance:
+                return x[0] if single else x
+            matrix = [jacobian[i * n:(i + 1) * n] for i in range(n)]
+            step = _linear_solve(matrix, [-value for value in residuals])
+            x = self._damped_step(x, step, residuals)
+            if max(abs(value) for value in step) <= self.tolerance * (1 + max(abs(value) for value in x)):
+                return x[0] if single else x
+        raise SolveError("no convergence after {} iterations from {}".format(self.max_iterations, start))
+
+    def _damped_step(self, x, step, residuals):
+        """Take the damped step, halving it while it makes the residuals worse."""
+        norm = sum(value * value for value in residuals)
+        scale = self.damping
+        for _ in range(10):
+            candidate = [value + scale * delta for value, delta in zip(x, step)]
+            try:
+                new_norm = sum(value * value for value in self._residuals(*candidate))
+            except (ZeroDivisionError, OverflowError):
+                new_norm = None
+            if new_norm is not None and new_norm <= norm:
+                return candidate
+            scale /= 2
+        return candidate
+
+    def solve_many(self, starts):
+        """Solve from every starting point in starts.
+
+        With a single unknown and NumPy available, all starting points iterate
+        together as one array; otherwise they are solved one at a time.
+        """
+        if len(self.variables) == 1:
+            try:
+                import numpy
+            except ImportError:
+                numpy = None
+            if numpy is not None:
+                return self._solve_array(numpy, starts)
+        roots = []
+        for start in starts:
+            try:
+                roots.append(self.solve(start))
+            except SolveError:
+                roots.append(None)
+        return roots
+
+    def _solve_array(self, numpy, starts):
+        x = numpy.array(starts, dtype=float)
+        done = numpy.zeros(x.shape, dtype=bool)
+        with numpy.errstate(all="ignore"):
+            for _ in range(self.max_iterations):
+                self._check()
+                residual, derivative = self._system(x)
+                done |= numpy.abs(residual) <= self.tolerance
+                step = numpy.where(done, 0.0, -residual / derivative)
+                x = self._damped_steps(numpy, x, step, residual)
+                done |= numpy.abs(step) <= self.tolerance * (1 + numpy.abs(x))
+                if done.all():
+                    break
+        return [float(root) if ok and numpy.isfinite(root) else None for root, ok in zip(x, done)]
+
+    def _damped_steps(self, numpy, x, step, residual):
+        """_damped_step for an array of starting points: each one halves its own
+        step while the step makes its residual worse."""
+        norm = residual * residual
+        scale = numpy.full(x.shape, self.damping)
+        for _ in range(10):
+            candidate = x + scale * step
+            (new_residual,) = self._residuals(candidate)
+            worse = ~(new_residual * new_residual <= norm)
+            if not worse.any():
+                break
+            scale = numpy.where(worse, scale / 2, scale)
+        return candidate
+
+
+def newton(equation, start, **options):
+    """Find a root of a single-variable Equation, starting from start."""
+    return NewtonSolver(equation, **options).solve(start)
+
+def newton_system(equations, start, **options):
+    """Find a root of a square system of Equations; returns one value per unknown."""
+    return NewtonSolver(equations, **options).solve(start)
@@ -0,0 +1,1262 @@
+import threading
+from contextlib import contextmanager
+from .term import Term, Variable, NUMBER, _is_a
+from math import factorial
+from . import parallel
+from .monomial import multiply_terms
+from .order import get_monomial_order, combine_terms, merge_terms, monomial_keys, sort_terms
+from . import budget as _budget
+from .coefficients import get_coefficient_backend
+
+def _seq_product(first, last):
+    """Multiply the numbers from first to last, inclusive."""
+    prod = 1
+    for i in range(first, last+1):
+        prod *= i
+    return prod
+
+def choose(n, k):
+    """Return the number of ways to choose k items from n items."""
+    if not _is_a(n, int) or not _is_a(k, int):
+        raise TypeError("n and k must be of type int to calculate combination.")
+    
+    # for known results skip the arithmetic
+    if k > n: return 0
+    if k == 0 or k == n: return 1
+    if k == 1: return n
+    # nCk = n! / (k! * (n-k)!)
+    # don't need the entire n! in the numerator, reduce by the (n-k)! in the denominator
+    # so numerator = n * (n-1) * (n-2) * ... * (n-k+1)!
+    numer = _seq_product((n-k) + 1, n)
+    # we already reduced the (n-k)! factor, just need k!
+    denom = factorial(k)
+    return numer // denom
+
+# Eager folding: when on, the ADD, SUB, MULT, DIV and POW constructors return
+# the folded Term, or the operand itself, instead of a new node when their
+# operands are constants or a constant identity (see _fold_sum and friends).
+# A constructor may then return a Term rather than the operation it names.
+_eager = False
+
+# Settings selected with eager_folding() apply to the thread that selected them
+# only; set_eager_folding sets the one every other thread uses.
+_local = threading.local()
+
+def set_eager_folding(enabled):
+    """Turn eager constant folding in the operation constructors on or off.
+
+    This is the process-wide setting; a thread inside an eager_folding() block
+    keeps the setting of that block until it ends.
+    """
+    global _eager
+    _eager = bool(enabled)
+
+def get_eager_folding():
+    eager = getattr(_local, "eager", None)
+    return eager if eager is not None else _eager
+
+@contextmanager
+def eager_folding(enabled):
+    """Turn eager folding on or off inside a with block, for this thread only; the previous setting is restored after."""
+    previous = getattr(_local, "eager", None)
+    _local.eager = bool(enabled)
+    try:
+        yield _local.eager
+    finally:
+        _local.eager = previous
+
+def _constant(operand):
+    """The number an int, float or constant Term stands for; None for anything else."""
+    if _is_a(operand, NUMBER):
+        return operand
+    if _is_a(operand, Term) and operand.is_constant:
+        return operand.coefficient
+    return None
+
+def _as_expr(operand, copy):
+    """An operand as a Term or operation: numbers become Terms, and the rest is cloned if copy."""
+    if _is_a(operand, NUMBER):
+        return Term(operand)
+    return operand.clone() if copy else operand
+
+def _foldable(*operands):
+    return all(_is_a(operand, NUMBER, Term, OPERATION) for operand in operands)
+
+def _fold_sum(augend, addend, subtract):
+    """The folded augend + addend (or augend - addend), or None if there is nothing to fold.
+
+    Never returns an ADD, since the constructor would then initialize it again.
+    """
+    a, b = _constant(augend), _constant(addend)
+    if b is not None and subtract:
+        b = -b
+    if a is not None and b is not None:
+        return Term(a + b)
+    if b == 0 and not _is_a(augend, ADD):
+        return _as_expr(augend, True)
+    if a == 0 and not subtract and not _is_a(addend, ADD):
+        return _as_expr(addend, True)
+    if a == 0 and subtract and _is_a(addend, Term):
+        negated = addend.clone()
+        negated.multiply(-1)
+        return negated
+    return None
+
+def _fold_product(multiplicand, multiplier):
+    """The folded multiplicand * multiplier, or None (never a MULT)."""
+    a, b = _constant(multiplicand), _constant(multiplier)
+    if a is not None and b is not None:
+        return Term(a * b)
+    if a == 0 or b == 0:
+        return Term(0)
+    for constant, other in ((a, multiplier), (b, multiplicand)):
+        if constant is None:
+            continue
+        if constant == 1 and not _is_a(other, MULT):
+            return _as_expr(other, True)
+        # a number times a Term (this covers negation by -1) is still a Term
+        if _is_a(other, Term):
+            product = other.clone()
+            product.multiply(constant)
+            return product
+    return None
+
+def _fold_quotient(dividend, divisor):
+    """The folded dividend / divisor, or None (never a DIV)."""
+    b = _constant(divisor)
+    if b is None or b == 0:
+        return None
+    if b == 1 and not _is_a(dividend, DIV):
+        return _as_expr(dividend, False)
+    if _is_a(dividend, NUMBER, Term):
+        quotient = _as_expr(dividend, True)
+        quotient.divide(b)
+        return quotient
+    return None
+
+def _fold_power(base, exponent):
+    """The folded base ^ exponent, or None (never a POW)."""
+    if not _is_a(exponent, int, float):
+        return None
+    if exponent == 0:
+        return Term(1)
+    if exponent == 1 and not _is_a(base, POW):
+        return _as_expr(base, False)
+    a = _constant(base)
+    if a is not None:
+        try:
+            power = get_coefficient_backend().power(a, exponent)
+        except (ZeroDivisionError, OverflowError, ValueError):
+            return None
+        # a negative base to a fractional power is complex; leave it alone
+        return Term(power) if not _is_a(power, complex) else None
+    if _is_a(base, Term) and _is_a(exponent, int):
+        power = base.clone()
+        power.power(exponent)
+        return power
+    return None
+
+def _to_string(expr):
+    # writer imports this module, so import it here to avoid a circular import
+    from .writer import to_string
+    return to_string(expr)
+
+def _rewritten(expr):
+    """Apply expr's own simplify rule, its operands being simplified already; return its value.
+
+    expr may be a Term when it was folded on construction (see set_eager_folding).
+    """
+    if _is_a(expr, Term):
+        return expr
+    expr._simplify_node()
+    return expr.value
+
+def _sorted_terms(expr, order):
+    """The terms of expr if they are all Terms, sorted and combined in order; else None."""
+    if _is_a(expr, ADD):
+        return expr.terms if expr._order == order else None
+    if _is_a(expr, Term):
+        return [expr] if not expr.is_zero else []
+    return None
+
+class ADD(object):
+    def __new__(cls, augend, addend, subtract=False):
+        if get_eager_folding() and _foldable(augend, addend):
+            folded = _fold_sum(augend, addend, subtract)
+            if folded is not None:
+                return folded
+        return object.__new__(cls)
+
+    def __init__(self, augend, addend, subtract=False):
+        """Create an addition between the augend and the addend.
+
+        Parameters:
+        augend -- the first part of the addition. Can be an int, float, Term 
+            or any other operation 
+        addend -- the second part of the addition. Same restrictions as augend
+        subtract -- consider this object as subtraction? If so, MULT the addend
+            by -1
+        """
+        if _is_a(augend, Term, OPERATION):
+            self._augend = augend.clone()
+        elif _is_a(augend, NUMBER):
+            self._augend = Term(augend)
+        else:
+            raise TypeError("{} and {} must be of type int, float, Term, or any operation object.".format(augend, addend))
+
+        if _is_a(addend, Term, OPERATION):
+            self._addend = addend.clone()
+        elif _is_a(addend, NUMBER):
+            self._addend = Term(addend)
+        else:
+            raise TypeError("{} and {} must be of type int, float, Term, or any operation object.".format(a, addend))
+    
+        # set to the monomial order when the terms are all Terms, sorted and combined
+        self._order = None
+
+        # for subtraction, multiply through a -1 and deal with it like addition
+        if subtract:
+            negated = MULT(-1, self._addend)
+            negated.simplify()
+            self._addend = negated.value
+
+    @staticmethod
+    def _join(augend, addend):
+        """Create an ADD that takes augend and addend as they are, without cloning."""
+        add = object.__new__(ADD)
+        add._augend = augend
+        add._addend = addend
+        add._order = None
+        return add
+
+    def _unpack_add(self):
+        """Separate nested ADDs into a flat list of terms.
+
+        No other operators are simplified here; they are just returned with
+        the rest of the terms. Nested sums can be very deep, so they are walked
+        with an explicit stack instead of recursion.
+        """
+        terms = []
+        stack = [self._addend, self._augend]
+        while stack:
+            addend = stack.pop()
+            if _is_a(addend, ADD):
+                stack.append(addend._addend)
+                stack.append(addend._augend)
+            # only include non-trivial terms and operations other than ADDs
+            elif _is_a(addend, Term) and not addend.is_zero:
+                terms.append(addend)
+            elif not _is_a(addend, Term):
+                terms.append(addend)
+        return terms
+
+    def _pack_add(self, terms):
+        """Pack a list of terms into nested ADDs.
+
+        The terms are used as they are (not cloned), so they must not be shared
+        with any other expression.
+        """
+        a = None
+        b = None
+        # Everything cancelled: the sum is 0
+        if not terms:
+            a = Term(0)
+            b = Term(0)
+        # One term: save it to a, make b = 0
+        elif len(terms) == 1:
+            a = terms[0]
+            b = Term(0)
+        # More than one: nest ADDs as needed for > 2 terms, to the right
+        # (t0 + (t1 + (t2 + ...))) so that the terms come back out in the same
+        # order and the first one is always the augend
+        else:
+            b = terms[-1]
+            for term in reversed(terms[1:-1]):
+                b = ADD._join(term, b)
+            a = terms[0]
+        
+        return (a, b)
+
+    def _set_terms(self, terms, order=None):
+        """Replace the sum's terms; order is the monomial order they are sorted by, if any."""
+        self._augend, self._addend = self._pack_add(terms)
+        self._order = order
+
+    def simplify(self, budget=None):
+        """Combines all like terms within both terms of the add.
+
+        Unpacks nested ADD objects and flattens all terms to a single list.
+        All posible like terms are combined. Simplifies the ADD object in place.
+        Any other operation among the terms is simplified first (see simplify_tree).
+
+        Terms are sorted by the monomial order (see order.set_monomial_order),
+        leading term first, followed by any other operations. Like terms are then
+        next to each other, and two sums that are already sorted are added with a
+        single merge.
+
+        budget -- optional budget.Budget limiting the work (see simplify_tree)
+        """
+        simplify_tree(self, budget)
+
+    def _simplify_node(self):
+        """Combine like terms, assuming every term is already simplified."""
+        order = get_monomial_order()
+        # Adding sorted sums (or a Term to a sorted sum): merge them
+        sorted_a = _sorted_terms(_reduced(self._augend), order)
+        sorted_b = _sorted_terms(_reduced(self._addend), order)
+        if sorted_a is not None and sorted_b is not None:
+            self._set_terms(merge_terms(sorted_a, sorted_b, order), order)
+            return
+
+        # Collect all the terms (flattens all sub-ADDs, including the sums that
+        # simplified operations reduce to)
+        all_terms = []
+        for term in self.terms:
+            term = _reduced(term)
+            if _is_a(term, ADD):
+                all_terms += term.terms
+            elif not (_is_a(term, Term) and term.is_zero):
+                all_terms.append(term)
+        terms = [term for term in all_terms if _is_a(term, Term)]
+        others = [term for term in all_terms if not _is_a(term, Term)]
+        # It's all addition; combine like terms, unless it's another operation
+        terms = combine_terms(terms, order)
+        self._set_terms(terms + others, order if not others else None)
+
+    def distribute(self, factor):
+        """Multiply factor to every term of the sum.
+
+        The terms are multiplied one by one from the flat list of terms, so nested
+        sums of any depth are handled without recursion.
+        """
+        self._order = None
+        # If the factor is an ADD, then every term of the sum is multiplied by
+        # every term of the factor: (a+b)(c+d) = ac + ad + bc + bd
+        # Those new products become the terms of this ADD
+        if _is_a(factor, ADD):
+            terms_a, terms_b = self.terms, factor.terms
+            # products of plain polynomials multiply packed monomials (see monomial),
+            # and big ones are multiplied in a process pool
+            _budget.expect(_expected_product_size(terms_a, terms_b))
+            _budget.spend(len(terms_a) * len(terms_b))
+            products = None
+            if all(_is_a(term, Term) for term in terms_a + terms_b):
+                if len(terms_a) * len(terms_b) >= parallel.THRESHOLD:
+                    products = parallel.multiply(terms_a, terms_b)
+                else:
+                    products = multiply_terms(terms_a, terms_b)
+            if products is not None:
+                self._set_terms(sort_terms(products), get_monomial_order())
+                return
+            products = []
+            for term in terms_a:
+                for other in terms_b:
+                    products += _terms_of(_product(term, other))
+            # collect any like terms
+            self._set_terms(products)
+            self._simplify_node()
+        # If factor is a Term, int, or float, multiply each Term by factor
+        # If a term is another operation, wrap it in a MULT and simplify that
+        # (The products are collected before any term is replaced, so running out
+        # of budget part way leaves the sum as it was.)
+        elif _is_a(factor, Term, NUMBER):
+            terms = self.terms
+            _budget.spend(len(terms))
+            factor = factor if _is_a(factor, Term) else Term(factor)
+            products = []
+            for term in terms:
+                products += _terms_of(_product(factor, term))
+            self._set_terms(products)
+        # if factor is some other operation, MULT each term and simplify
+        elif _is_a(factor, OPERATION):
+            terms = self.terms
+            _budget.spend(len(terms))
+            products = []
+            for term in terms:
+                products += _terms_of(_product(factor, term))
+            self._set_terms(products)
+        else:
+            raise TypeError(factor, "({}) is not a recognized type to ditribute over an ADD.".format(type))
+
+    def substitute(self, values):
+        """Return a new, simplified expression with the variables in values replaced."""
+        return substitute(self, values)
+
+    def evaluate(self):
+        """Substitute the value of every Variable that has one, in place.
+
+        Like simplify, the result is read back through ADD.value.
+        """
+        result = _evaluated(self)
+        if result is not None:
+            self._augend, self._addend = result, Term(0)
+            self._order = None
+
+    def clone(self):
+        """Create a new ADD object identical to this one."""
+        return _clone_tree(self)
+            
+    @property
+    def terms(self):
+        """Get a flat list of all terms in both addends of the ADD, unpacking ADDs."""
+        return self._unpack_add()
+
+    @property
+    def addends(self):
+        """Get both addends (terms) of the sum as a tuple."""
+        return (self._augend.value, self._addend.value)
+
+    @property
+    def augend(self):
+        return self._augend.value
+
+    @property
+    def addend(self):
+        return self._addend.value
+
+    @property
+    def value(self):
+        """Get the true value of the ADD; return a copy.
+        
+        If the self._addend term is 0, then only return the value of the self._augend term.
+        Otherwise, clone this ADD.
+        
+        A value of 0 in the addend term is an indication that this ADD has been simplified.
+        By returning only the augend term, ADDs can be reduced, when possible, by calling
+        ADD.value.
+        """
+        if _is_a(self._addend, Term) and self._addend.is_zero:
+            return self._augend.value
+        else:
+            return self.clone()
+
+    @property
+    def leading_term(self):
+        """Get the leading Term of the sum under the current monomial order.
+
+        Immediate for a simplified sum, whose leading term is its augend.
+
+        Raises:
+        ValueError -- if the sum contains operations other than ADD
+        """
+        order = get_monomial_order()
+        if self._order == order:
+            return self._augend.value
+        terms = self.terms
+        if not all(_is_a(term, Term) for term in terms):
+            raise ValueError("{} is not a polynomial; it has no leading term".format(self))
+        terms = combine_terms(terms, order)
+        return terms[0] if terms else Term(0)
+
+    def __eq__(self, other):
+        if not _is_a(other, ADD): return False
+        # Shallow equality, doesn't take commutivity/associativity into consideration
+        # return (self.augend == other.augend) and (self.addend == other.addend)
+        # Deeper equality: would they evaluate to the same value? Check term by term.
+        self_terms = self.terms
+        other_terms = other.terms
+        if len(self_terms) != len(other_terms): return False
+        # Sums of Terms: sorted sums compare in a single scan; others are sorted
+        # first (by monomial, then coefficient, so duplicate like terms line up)
+        if all(_is_a(term, Term) for term in self_terms + other_terms):
+            if self._order is None or self._order != other._order:
+                both = self_terms + other_terms
+                keys = monomial_keys(both)
+                ranked = sorted(range(len(both)), key=lambda i: (keys[i], both[i].coefficient))
+                self_terms = [both[i] for i in ranked if i < len(self_terms)]
+                other_terms = [both[i] for i in ranked if i >= len(self_terms)]
+            return all(a == b for a, b in zip(self_terms, other_terms))
+        for self_term in self_terms:
+            found = False
+            for i, other_term in enumerate(other_terms):
+                if other_term is not None and self_term == other_term:
+                    found = True
+                    other_terms[i] = None
+                    break
+            if not found: return False
+        return True
+
+    def __str__(self):
+        return _to_string(self)
+
+
+class SUB(ADD):
+    def __new__(cls, augend, addend):
+        return super().__new__(cls, augend, addend, subtract=True)
+
+    def __init__(self, augend, addend):
+        super().__init__(augend, addend, subtract=True)
+
+
+class MULT(object):
+    def __new__(cls, multiplicand, multiplier):
+        if get_eager_folding() and _foldable(multiplicand, multiplier):
+            folded = _fold_product(multiplicand, multiplier)
+            if folded is not None:
+                return folded
+        return object.__new__(cls)
+
+    def __init__(self, multiplicand, multiplier):
+        """Create a multiplication object between the multiplicand and the multiplier.
+
+        Parameters:
+        multiplicand -- the first factor of the product. Can be type int, float, Term,
+            or any operation
+        multiplier -- the second factor of the product. Same restrictions as multiplicand
+        """
+        if _is_a(multiplicand, Term, OPERATION):
+            self._multiplicand = multiplicand.clone()
+        elif _is_a(multiplicand, NUMBER):
+            self._multiplicand = Term(multiplicand)
+        else:
+            raise TypeError("{} and {} must be of type int, float, Term, or any operation object.".format(multiplicand, multiplier))
+
+        if _is_a(multiplier, Term, OPERATION):
+            self._multiplier = multiplier.clone()
+        elif _is_a(multiplier, NUMBER):
+            self._multiplier = Term(multiplier)
+        else:
+            raise TypeError("{} and {} must be of type int, float, Term, or any operation object.".format(multiplicand, multiplier))
+    
+    def _unpack_mult(self):
+        """Separate nested MULTs into a flat list of factors.
+
+        No other operators are simplified here; they are just returned with
+        the rest of the factors.
+        """
+        factors = []
+        stack = [self._multiplier.value, self._multiplicand.value]
+        while stack:
+            factor = stack.pop()
+            if _is_a(factor, MULT):
+                stack.append(factor._multiplier.value)
+                stack.append(factor._multiplicand.value)
+            # only include non-trivial factors
+            elif _is_a(factor, Term) and not factor.is_one:
+                factors.append(factor)
+            # include any other operation encountered
+            elif not _is_a(factor, Term):
+                factors.append(factor)
+        return factors
+
+    def simplify(self, budget=None):
+        """Perform the multiplication, simplify results as much as possible.
+
+        Multiplication can always be performed, and so the result should never
+        be a MULT. For consistency, the result
+        is stored in self._multiplicand, with the multiplicative identity in self._multiplier.
+        Inner groups are simplified first (PEMDAS; see simplify_tree).
+        """
+        simplify_tree(self, budget)
+
+    def _simplify_node(self):
+        """Multiply the factors, assuming both are already simplified."""
+        multiplicand = _reduced(self._multiplicand)
+        multiplier = _reduced(self._multiplier)
+      
+        if _is_a(multiplicand, Term) and _is_a(multiplier, Term):
+            multiplicand.multiply(multiplier)
+            self._multiplicand, self._multiplier = multiplicand, Term(1)
+        elif _is_a(multiplicand, Term) and _is_a(multiplier, ADD):
+            multiplier.distribute(multiplicand)
+            self._multiplicand, self._multiplier = multiplier, Term(1)
+        elif _is_a(multiplicand, ADD) and _is_a(multiplier, Term):
+            multiplicand.distribute(multiplier)
+            self._multiplicand, self._multiplier = multiplicand, Term(1)
+        elif _is_a(multiplicand, ADD) and _is_a(multiplier, ADD):
+            multiplicand.distribute(multiplier)
+            self._multiplicand, self._multiplier = multiplicand, Term(1)
+        elif _is_a(multiplicand, Term, ADD) and _is_a(multiplier, DIV):
+            numer = _product(multiplicand, multiplier.dividend)
+            self._multiplicand = DIV(numer, multiplier.divisor)
+            self._multiplier = Term(1)
+        elif _is_a(multiplicand, DIV) and _is_a(multiplier, Term, ADD):
+            numer = _product(multiplier, multiplicand.dividend)
+            self._multiplicand = DIV(numer, multiplicand.divisor)
+            self._multiplier = Term(1)
+        elif _is_a(multiplicand, DIV) and _is_a(multiplier, DIV):
+            numer = _product(multiplicand.dividend, multiplier.dividend)
+            denom = _product(multiplicand.divisor, multiplier.divisor)
+            self._multiplicand = DIV(numer, denom)
+            self._multiplier = Term(1)
+        else:
+            self._multiplicand, self._multiplier = multiplicand, multiplier
+    
+    def substitute(self, values):
+        """Return a new, simplified expression with the variables in values replaced."""
+        return substitute(self, values)
+
+    def evaluate(self):
+        """Substitute the value of every Variable that has one, in place.
+
+        Like simplify, the result is read back through MULT.value.
+        """
+        result = _evaluated(self)
+        if result is not None:
+            self._multiplicand, self._multiplier = result, Term(1)
+
+    def clone(self):
+        return _clone_tree(self)
+
+    @property
+    def value(self):
+        """Get the "true" value of the MULT; return a copy.
+        
+        If the b factor is 1, then only return the value of the a factor; otherwise
+        clone this MULT. 
+        
+        A value of 1 in the b factor is an indication that this MULT has been simplified.
+        By returning only the a factor, MULTs can be reduced, when possible, by using
+        MULT.value.
+        """
+        if _is_a(self._multiplier, Term) and self._multiplier.is_one:
+            return self._multiplicand.value
+        else:
+            return self.clone()
+
+    @property
+    def factors(self):
+        return (self._multiplicand.value, self._multiplier.value)
+
+    @property
+    def multiplicand(self):
+        return self._multiplicand.value
+    
+    @property
+    def multiplier(self):
+        return self._multiplier.value
+
+    def __eq__(self, other):
+        if not _is_a(other, MULT): return False
+        self_facts = self._unpack_mult()
+        other_facts = other._unpack_mult()
+        if len(self_facts) != len(other_facts): return False
+        for self_fact in self_facts:
+            found = False
+            for i, other_fact in enumerate(other_facts):
+                if other_fact is not None and self_fact == other_fact:
+                    other_facts[i] = None
+                    found = True
+                    break
+            if not found: return False
+        return True
+
+    def __str__(self):
+        return _to_string(self)
+
+
+class DIV(object):
+    def __new__(cls, dividend, divisor):
+        if get_eager_folding() and _foldable(dividend, divisor):
+            folded = _fold_quotient(dividend, divisor)
+            if folded is not None:
+                return folded
+        return object.__new__(cls)
+
+    def __init__(self, dividend, divisor):
+        if _is_a(dividend, NUMBER):
+            self._dividend = Term(dividend)
+        elif _is_a(dividend, Term, OPERATION):
+            self._dividend = dividend
+        else:
+            raise TypeError("dividend and divisor must be of type int, float, Term, or any operation object.")
+        if _is_a(divisor, NUMBER):
+            self._divisor = Term(divisor)
+        elif _is_a(divisor, Term, OPERATION):
+            self._divisor = divisor
+        else:
+            raise TypeError("dividend and divisor must be of type int, float, Term, or any operation object.")
+    
+    def simplify(self, budget=None):
+        """Attempt to simplify the division, simplifying higher-precedence operations first.
+
+        Note that in this case, due to the binary nature of the operation classes, precedence/
+        order of operations is explicit, not implied. Nesting => precedence. 
+        
+        The following rules are used:
+        - Simplify dividend and divisor first (see simplify_tree)
+        - Term / Term => use Term.divide() to simplify to a single Term
+        - x / DIV => reciprocate and multiply: create a DIV of (MULT of x and divisor) and
+            dividend; simplify and save the div's dividend and divisor in self 
+        - ADD / x => wrap a DIV around each term, dividing by x. Simplify the new DIVs,
+            create an ADD of each DIV.value
+        - Term / ADD => can't be simplified further at the moment
+
+        - MULT / x => POW.simplify can still return a MULT...
+        """
+        simplify_tree(self, budget)
+
+    def _simplify_node(self):
+        """Divide, assuming the dividend and divisor are already simplified."""
+        # divisor == 1 means the DIV is already simplified (or doesn't need to be)
+        if _is_a(self._divisor, Term) and self._divisor.is_one:
+            return
+
+        numer = _reduced(self._dividend)
+        denom = _reduced(self._divisor)
+
+        if _is_a(numer, Term) and _is_a(denom, Term):
+            numer.divide(denom)
+            self._dividend = numer
+            self._divisor = Term(1)
+        elif _is_a(denom, DIV):
+            # reciprocate and multiply! 
+            # simplify the mult because it can always be reduced
+            numer = _product(numer, denom.divisor)
+            denom = denom.dividend  # * 1
+            # simplify the new div, since that's what we were really doing here
+            self._dividend = _rewritten(DIV(numer, denom))
+            self._divisor = Term(1)
+        elif _is_a(numer, ADD) and _is_a(denom, Term):
+            # divide every term by the divisor, simplify if possible
+            quotients = []
+            for term in numer.terms:
+                quotients += _terms_of(_rewritten(DIV(term.clone(), denom.clone())))
+            numer._set_terms(quotients)
+            numer._simplify_node()
+            self._dividend = numer
+            self._divisor = Term(1)
+        else:
+            # Term / ADD, ADD / ADD, ...: can't do anything further, keep the
+            # simplified numer and denom as the quotient
+            self._dividend = numer
+            self._divisor = denom
+
+    def substitute(self, values):
+        """Return a new, simplified expression with the variables in values replaced."""
+        return substitute(self, values)
+
+    def evaluate(self):
+        """Substitute the value of every Variable that has one, in place.
+
+        Like simplify, the result is read back through DIV.value.
+        """
+        result = _evaluated(self)
+        if result is not None:
+            self._dividend, self._divisor = result, Term(1)
+
+    def clone(self):
+        return _clone_tree(self)
+
+    @property
+    def dividend(self):
+        return self._dividend.value
+    
+    @property
+    def divisor(self):
+        return self._divisor.value
+    
+    @property
+    def value(self):
+        """Get the true value of the DIV; return a copy.
+        
+        If the divisor is 1, then only return the value of the dividend; otherwise
+        clone this DIV. 
+        
+        A value of 1 in the divisor is an indication that this DIV has been simplified.
+        By returning only the value of dividend, DIVs can be reduced, when possible, by using
+        DIV.value.
+        """
+        if _is_a(self._divisor, Term) and self._divisor.is_one:
+            return self._dividend.value
+        else:
+            return self.clone()
+
+    def __str__(self):
+        return _to_string(self)
+
+class POW(object):
+    def __new__(cls, base, exponent):
+        if get_eager_folding() and _foldable(base):
+            folded = _fold_power(base, exponent)
+            if folded is not None:
+                return folded
+        return object.__new__(cls)
+
+    def __init__(self, base, exponent):
+        if not _is_a(exponent, int, float):
+            raise TypeError("exponent must be of type int or float.")
+        self._exponent = exponent
+        if _is_a(base, NUMBER):
+            self._base = Term(base)
+        elif _is_a(base, Term, OPERATION):
+            self._base = base
+        else:
+            raise TypeError("base must be a Term or operation")
+    
+    def simplify(self, budget=None):
+        """Apply the exponent to the base; see _simplify_node for the rules."""
+        simplify_tree(self, budget)
+
+    def _simplify_node(self):
+        """Apply the exponent to the base according to the rules of exponents.
+
+        Powers can always be simplified, since Terms keep track of the exponent on their
+        variables. Therefore, the simplfied result is stored in base with exponent set 
+        to 1. The base is assumed to be simplified already (see simplify_tree).
+
+        According to https://en.wikipedia.org/wiki/Zero_to_the_power_of_zero, the general 
+        consensus (specifically for algebraic contexts) is that 0^0 = 1. This method is
+        making the same assumption, and thus will simplify all POWs with an exponent 0 to 
+        Term(1) as base and 1 as the exponent. 
+
+        Rules of exponents:
+        Term: apply exponent to the coefficient, add power to exponents of variables
+        ADD: multiply the sum out, squaring as in binary exponentiation
+        MULT: wrap POW around both factors with same power, keep as MULT 
+        DIV: wrap POW around divisor and dividend with same power, keep as DIV
+        POW: make base = POW's base; multiply powers
+        """
+        self._base = _reduced(self._base)
+        # in case of nested POWs; get down to some other operation/term as the base
+        while _is_a(self._base, POW):
+            self._exponent *= self._base._exponent
+            self._base = _reduced(self._base._base)
+
+        # Anything ^0 = 1 (see docstring)
+        if self._exponent == 0:
+            self._base = Term(1)
+            self._exponent = 1
+            return
+        # exponent = 1 is already simplified (or was given as simplified) 
+        if self._exponent == 1:
+            return
+
+        if _is_a(self._base, Term):
+            self._base.power(self._exponent)
+            self._exponent = 1
+        elif _is_a(self._base, ADD):
+            # Error on negative (and fractional) exponents on ADDs for now. 
+            # TODO: add binomial expansion for neg exp.
+            if not _is_a(self._exponent, int) or self._exponent < 0:
+                raise NotImplementedError
+            self._base = _power_of_sum(self._base, self._exponent)
+            self._exponent = 1
+        elif _is_a(self._base, MULT):
+            multiplicand = _rewritten(POW(self._base.multiplicand, self._exponent))
+            multiplier = _rewritten(POW(self._base.multiplier, self._exponent))
+            # MULTs can always be reduced; no need to save that as the base
+            self._base = _product(multiplicand, multiplier)
+            self._exponent = 1
+        elif _is_a(self._base, DIV):
+            dividend = _rewritten(POW(self._base.dividend, self._exponent))
+            divisor = _rewritten(POW(self._base.divisor, self._exponent))
+            self._base = DIV(dividend, divisor)
+            self._exponent = 1
+            
+    def substitute(self, values):
+        """Return a new, simplified expression with the variables in values replaced."""
+        return substitute(self, values)
+
+    def evaluate(self):
+        """Substitute the value of every Variable that has one, in place.
+
+        Like simplify, the result is read back through POW.value.
+        """
+        result = _evaluated(self)
+        if result is not None:
+            self._base, self._exponent = result, 1
+
+    def clone(self):
+        """Return a new POW identical to this one."""
+        return _clone_tree(self)
+
+    @property
+    def base(self):
+        return self._base.value
+
+    @property
+    def exponent(self):
+        return self._exponent
+
+    @property
+    def value(self):
+        """Get the value of the POW: the value of the base if exp is 1, else a clone of this POW."""
+        if self._exponent == 1:
+            return self._base.value
+        else:
+            return self.clone()
+
+    def __eq__(self, other):
+        if not _is_a(other, POW): return False
+        return (self.exponent == other.exponent) and (self.base == other.base)
+
+    def __str__(self):
+        return _to_string(self)
+        
+        
+OPERATION = (ADD, SUB, MULT, DIV, POW)
+
+
+def _operands(expr):
+    """Return the sub-expressions directly below an operation (nothing for a Term)."""
+    if _is_a(expr, ADD): return (expr._augend, expr._addend)
+    if _is_a(expr, MULT): return (expr._multiplicand, expr._multiplier)
+    if _is_a(expr, DIV): return (expr._dividend, expr._divisor)
+    if _is_a(expr, POW): return (expr._base,)
+    return ()
+
+def _set_operands(expr, operands):
+    """Replace the sub-expressions directly below an operation (see _operands)."""
+    if _is_a(expr, ADD): expr._augend, expr._addend = operands
+    elif _is_a(expr, MULT): expr._multiplicand, expr._multiplier = operands
+    elif _is_a(expr, DIV): expr._dividend, expr._divisor = operands
+    elif _is_a(expr, POW): (expr._base,) = operands
+
+def _reduced(expr):
+    """What a simplified operand stands for, like .value but without copying it.
+
+    Only for operands the caller owns: the result is shared with expr.
+    """
+    while True:
+        if _is_a(expr, ADD) and _is_a(expr._addend, Term) and expr._addend.is_zero:
+            expr = expr._augend
+        elif _is_a(expr, MULT) and _is_a(expr._multiplier, Term) and expr._multiplier.is_one:
+            expr = expr._multiplicand
+        elif _is_a(expr, DIV) and _is_a(expr._divisor, Term) and expr._divisor.is_one:
+            expr = expr._dividend
+        elif _is_a(expr, POW) and expr._exponent == 1:
+            expr = expr._base
+        else:
+            return expr
+
+def _terms_of(expr):
+    return expr.terms if _is_a(expr, ADD) else [expr]
+
+def _product(a, b):
+    """Return the simplified product of a and b, which must be simplified already."""
+    if _is_a(a, Term) and _is_a(b, Term):
+        product = a.clone()
+        product.multiply(b)
+        return product
+    return _rewritten(MULT(a, b))
+
+def _highest_powers(terms):
+    """The highest power of each variable label in terms, or None unless they are all
+    Terms with non-negative int powers."""
+    highest = {}
+    for term in terms:
+        if not _is_a(term, Term): return None
+        for var in term.variables:
+            if not _is_a(var.power, int) or var.power < 0: return None
+            label = var.base.label
+            highest[label] = max(highest.get(label, 0), var.power)
+    return highest
+
+def _expected_product_size(terms_a, terms_b):
+    """An upper bound on the number of terms in the product of two sums.
+
+    For polynomials it is also bounded by the number of monomials whose powers
+    fit under the sums of the operands' highest powers.
+    """
+    size = len(terms_a) * len(terms_b)
+    highest_a, highest_b = _highest_powers(terms_a), _highest_powers(terms_b)
+    if highest_a is not None and highest_b is not None:
+        bound = 1
+        for label in set(highest_a) | set(highest_b):
+            bound *= highest_a.get(label, 0) + highest_b.get(label, 0) + 1
+        size = min(size, bound)
+    return size
+
+def _expected_power_size(terms, exponent):
+    """An upper bound on the number of terms of a sum of n terms raised to exponent k.
+
+    The multinomial count C(n + k - 1, k), or for polynomials the number of
+    monomials whose powers fit under k times the highest powers, if that is smaller.
+    """
+    size = choose(len(terms) + exponent - 1, len(terms) - 1)
+    highest = _highest_powers(terms)
+    if highest is not None:
+        bound = 1
+        for power in highest.values():
+            bound *= exponent * power + 1
+        size = min(size, bound)
+    return size
+
+def _power_of_sum(base, exponent):
+    """Multiply out a simplified sum raised to a positive int exponent, by repeated squaring.
+
+    The size of the result is estimated up front, so with a budget (see budget.Budget)
+    hopeless expansions fail before any work is done.
+    """
+    _budget.expect(_expected_power_size(base.terms, exponent))
+    result = None
+    square = base
+    while True:
+        if exponent & 1:
+            result = square.clone() if result is None else _product(result, square)
+        exponent >>= 1
+        if not exponent:
+            return result
+        square = _product(square, square)
+
+def _clone_tree(expr):
+    """Copy an expression, with an explicit stack so trees of any depth can be copied."""
+    copies = []
+    stack = [(expr, False)]
+    while stack:
+        node, ready = stack.pop()
+        if _is_a(node, Term):
+            copies.append(node.clone())
+        elif not ready:
+            stack.append((node, True))
+            stack.extend((operand, False) for operand in reversed(_operands(node)))
+        else:
+            count = len(_operands(node))
+            operands = copies[-count:]
+            del copies[-count:]
+            # a copy of a SUB is a plain ADD; its addend is already negated
+            copy = object.__new__(ADD if _is_a(node, ADD) else type(node))
+            copy.__dict__.update(node.__dict__)
+            _set_operands(copy, operands)
+            copies.append(copy)
+    return copies[0]
+
+def simplify_tree(expr, budget=None):
+    """Simplify an expression in place, innermost operations first.
+
+    This is the engine behind every operation's simplify(). The tree is walked
+    post-order with an explicit stack, so nesting of any depth takes no extra
+    Python stack. Each operation is visited once: when its turn comes its operands
+    are already simplified, and its own rule (_simplify_node) is applied to their
+    reduced values. A sum is visited as a whole, through its flat list of terms,
+    rather than once per nested ADD. As with simplify(), read the result back
+    through .value.
+
+    With a budget (see budget.Budget), the work stops with BudgetExceeded once it
+    runs out. The budget is checked between nodes and before each expansion, so
+    every operation is either rewritten completely or left as it was.
+    """
+    with _budget.using(budget):
+        stack = [(expr, False)]
+        while stack:
+            node, ready = stack.pop()
+            if ready:
+                _budget.spend()
+                node._simplify_node()
+            elif not _is_a(node, Term):
+                stack.append((node, True))
+                operands = node.terms if _is_a(node, ADD) else _operands(node)
+                stack.extend((operand, False) for operand in operands if not _is_a(operand, Term))
+
+def _normalize_values(values):
+    """Key a substitution map by variable label, checking keys and values."""
+    normalized = {}
+    for var, val in values.items():
+        if _is_a(var, Variable):
+            label = var.label
+        elif _is_a(var, str):
+            label = var
+        else:
+            raise TypeError("substitution keys must be of type Variable or str.")
+        if not _is_a(val, NUMBER, Term, OPERATION):
+            raise TypeError("substitution values must be of type int, float, Term, or any operation object.")
+        normalized[label] = val
+    return normalized
+
+def _depends_on(expr, labels, dependent):
+    """Add the id of every node in expr that contains one of labels to dependent.
+
+    Returns True if expr itself contains one of the labels. The tree is walked
+    post-order with an explicit stack, like simplify_tree.
+    """
+    found = {}
+    stack = [(expr, None)]
+    while stack:
+        node, operands = stack.pop()
+        if _is_a(node, Term):
+            found[id(node)] = any(var.base.label in labels for var in node.variables)
+        elif operands is None:
+            operands = node.terms if _is_a(node, ADD) else _operands(node)
+            stack.append((node, operands))
+            stack.extend((operand, None) for operand in operands)
+            continue
+        else:
+            # every operand is visited, even after a match, so all ids are recorded
+            found[id(node)] = any([found[id(operand)] for operand in operands])
+        if found[id(node)]:
+            dependent.add(id(node))
+    return found[id(expr)]
+
+def _fold(expr, a, b):
+    """Return the Term for expr's operation applied to constant Terms a and b, or None."""
+    if not (_is_a(a, Term) and a.is_constant): return None
+    backend = get_coefficient_backend()
+    if _is_a(expr, POW):
+        return Term(backend.power(a.coefficient, expr._exponent))
+    if not (_is_a(b, Term) and b.is_constant): return None
+    if _is_a(expr, MULT):
+        return Term(backend.multiply(a.coefficient, b.coefficient))
+    if _is_a(expr, DIV) and not b.is_zero:
+        return Term(backend.divide(a.coefficient, b.coefficient))
+    return None
+
+def _substitute_term(term, values):
+    """Substitute into a single Term; returns (result, changed)."""
+    coefficient = term.coefficient
+    kept = []
+    factors = []
+    operations = []
+    for var in term.variables:
+        value = values.get(var.base.label)
+        if value is None:
+            kept.append(var.clone())
+        elif _is_a(value, NUMBER):
+            backend = get_coefficient_backend()
+            coefficient = backend.multiply(coefficient, backend.power(value, var.power))
+        elif _is_a(value, Term):
+            factor = value.clone()
+            factor.power(var.power)
+            factors.append(factor)
+        else:
+            operations.append(POW(value, var.power))
+    if len(kept) == len(term.variables):
+        return term, False
+
+    result = Term(coefficient, kept, factors)
+    if not operations:
+        return result, True
+    for operation in operations:
+        result = MULT(result, operation)
+    simplify_tree(result)
+    return result.value, True
+
+def _substitute(expr, values):
+    """Substitute values into expr in a single pass; returns (result, changed).
+
+    expr is rewritten in place, so it must be a copy the caller owns; the result
+    may share nodes with it. The tree is walked post-order with an explicit
+    stack. Subtrees without any substituted variable are left as they are,
+    unless a node above them changed: they are then simplified once, so that
+    node's own rule sees simplified operands. Operations whose operands become
+    constants are folded straight into a Term.
+    """
+    results = {}
+    stack = [(expr, None)]
+    while stack:
+        node, operands = stack.pop()
+        if _is_a(node, Term):
+            results[id(node)] = _substitute_term(node, values)
+        elif operands is None:
+            operands = node.terms if _is_a(node, ADD) else _operands(node)
+            stack.append((node, operands))
+            stack.extend((operand, None) for operand in operands)
+        elif _is_a(node, ADD):
+            results[id(node)] = _substitute_sum(node, [results[id(term)] for term in operands])
+        else:
+            results[id(node)] = _substitute_operation(node, [results[id(operand)] for operand in operands])
+    return results[id(expr)]
+
+def _substitute_operation(expr, operands):
+    """Rebuild a MULT, DIV or POW from its substituted (result, changed) operands."""
+    if not any(changed for _, changed in operands):
+        return expr, False
+    operands = _simplified_operands(operands)
+    a = operands[0]
+    b = operands[1] if len(operands) > 1 else None
+    folded = _fold(expr, a, b)
+    if folded is not None:
+        return folded, True
+    _set_operands(expr, operands)
+    expr._simplify_node()
+    return _reduced(expr), True
+
+def _substitute_sum(expr, terms):
+    """Rebuild an ADD from the substituted (result, changed) pairs of its flat terms."""
+    if not any(changed for _, changed in terms):
+        return expr, False
+    # SUB has already negated its addend, so the result is a plain ADD
+    total = ADD._join(None, None)
+    total._set_terms(_simplified_operands(terms))
+    total._simplify_node()
+    return _reduced(total), True
+
+def _simplified_operands(operands):
+    """The operands from (result, changed) pairs, ready for a node's own rule.
+
+    Changed ones are simplified already; the others are simplified now, since
+    every _simplify_node assumes its operands are.
+    """
+    ready = []
+    for operand, changed in operands:
+        if not changed and not _is_a(operand, Term):
+            simplify_tree(operand)
+            operand = _reduced(operand)
+        ready.append(operand)
+    return ready
+
+def _evaluated(expr):
+    """Substitute each Variable's value into expr; None if nothing changes."""
+    values = {}
+    stack = [expr]
+    while stack:
+        node = stack.pop()
+        if _is_a(node, Term):
+            for var in node.variables:
+                if var.base.value is not None:
+                    values[var.base.label] = var.base.value
+        else:
+            stack.extend(_operands(node))
+    if not values:
+        return None
+    result, changed = _substitute(expr.clone(), _normalize_values(values))
+    return result if changed else None
+
+def substitute(expr, values):
+    """Return a new expression with the variables in values replaced.
+
+    Parameters:
+    expr -- a Term or any operation
+    values -- a dict mapping Variables (or their labels) to an int, float, Term,
+        or any operation, e.g. {x: 2, y: ADD(Term(z), 1)}
+
+    The tree is copied once, then walked once: numeric constants are folded as
+    they appear, and only the subtrees that contain a substituted variable are
+    simplified again. expr itself is not changed.
+    """
+    result, _ = _substitute(expr.clone(), _normalize_values(values))
+    return result
+
+def substitute_many(expr, value_maps):
+    """Substitute each of the value_maps into expr; returns a list of results.
+
+    Work that doesn't depend on the substituted values is done once: the terms of
+    a top level sum that no map touches are found up front, combined a single
+    time and reused for every result; only the others are copied and walked again
+    for each map.
+    """
+    maps = [_normalize_values(values) for values in value_maps]
+    labels = set()
+    for values in maps:
+        labels.update(values)
+    dependent = set()
+    _depends_on(expr, labels, dependent)
+
+    if not _is_a(expr, ADD) or id(expr) not in dependent:
+        return [substitute(expr, values) if id(expr) in dependent else expr.clone() for values in maps]
+
+    shared = []
+    varying = []
+    for term in expr.terms:
+        if id(term) in dependent:
+            varying.append(term)
+        else:
+            shared.append(term)
+    if shared:
+        shared_sum = ADD._join(None, None)
+        shared_sum._set_terms([term.clone() for term in shared])
+        shared_sum._simplify_node()
+        shared = shared_sum.terms
+
+    results = []
+    for values in maps:
+        terms = [term.clone() for term in shared]
+        for term in varying:
+            # terms are combined in place, so never hand the sum a node from expr
+            term, _ = _substitute(term.clone(), values)
+            terms.append(term)
+        total = ADD._join(None, None)
+        total._set_terms(terms)
+        total._simplify_node()
+        results.append(total.value)
+    return results
@@ -0,0 +1,118 @@
+import threading
+from contextlib import contextmanager
+
+from .term import Term, _is_a
+
+
+# Monomial orders. Variables are ranked by label, so x > y > z.
+# lex -- compare exponents variable by variable
+# grlex -- compare total degree first, then lex
+# grevlex -- compare total degree first; on a tie, the monomial with the
+#     smaller exponent in the last variable where they differ is bigger
+ORDERS = ("lex", "grlex", "grevlex")
+_order = "grlex"
+
+# Orders selected with using() apply to the thread that selected them only;
+# set_monomial_order sets the one every other thread uses.
+_local = threading.local()
+
+
+def _checked(order):
+    if order not in ORDERS:
+        raise ValueError("unknown monomial order: {}".format(order))
+    return order
+
+def set_monomial_order(order):
+    """Select the monomial order simplified sums are sorted by.
+
+    This is the process-wide setting; a thread inside a using() block keeps the
+    order of that block until it ends.
+    """
+    global _order
+    _order = _checked(order)
+
+def get_monomial_order():
+    order = getattr(_local, "order", None)
+    return order if order is not None else _order
+
+@contextmanager
+def using(order):
+    """Select a monomial order inside a with block, for this thread only; the previous one is restored after."""
+    previous = getattr(_local, "order", None)
+    _local.order = _checked(order)
+    try:
+        yield order
+    finally:
+        _local.order = previous
+
+def _labels(terms):
+    return sorted({var.base.label for term in terms for var in term.variables})
+
+def monomial_keys(terms, order=None):
+    """Return a sort key for each Term; sorting by them puts the leading term first.
+
+    Like terms get equal keys. Keys are only comparable within one call, since
+    they depend on the variables of all the terms passed.
+    """
+    order = _checked(order or get_monomial_order())
+    labels = _labels(terms)
+    keys = []
+    for term in terms:
+        powers = {var.base.label: var.power for var in term.variables}
+        exponents = [powers.get(label, 0) for label in labels]
+        if order == "lex":
+            keys.append(tuple(-power for power in exponents))
+        elif order == "grlex":
+            keys.append((-sum(exponents),) + tuple(-power for power in exponents))
+        else:
+            keys.append((-sum(exponents),) + tuple(reversed(exponents)))
+    return keys
+
+def sort_terms(terms, order=None):
+    """Return the Terms sorted leading term first."""
+    keys = monomial_keys(terms, order)
+    return [terms[i] for i in sorted(range(len(terms)), key=keys.__getitem__)]
+
+def combine_terms(terms, order=None):
+    """Sort Terms and combine like terms; returns new Terms, leading term first.
+
+    Like terms end up next to each other, so combining them is a single pass.
+    Zero terms are dropped. The Terms passed in are not changed.
+    """
+    keys = monomial_keys(terms, order)
+    combined = []
+    last = None
+    for i in sorted(range(len(terms)), key=keys.__getitem__):
+        if combined and keys[i] == last:
+            combined[-1].add(terms[i])
+        else:
+            combined.append(terms[i].clone())
+            last = keys[i]
+    return [term for term in combined if not term.is_zero]
+
+def merge_terms(terms_a, terms_b, order=None):
+    """Add two lists of Terms that are each sorted and combined, in one linear merge.
+
+    Returns new Terms, sorted and combined, without zero terms.
+    """
+    keys = monomial_keys(terms_a + terms_b, order)
+    keys_a, keys_b = keys[:len(terms_a)], keys[len(terms_a):]
+    merged = []
+    i = j = 0
+    while i < len(terms_a) and j < len(terms_b):
+        if keys_a[i] < keys_b[j]:
+            merged.append(terms_a[i].clone())
+            i += 1
+        elif keys_b[j] < keys_a[i]:
+            merged.append(terms_b[j].clone())
+            j += 1
+        else:
+            term = terms_a[i].clone()
+            term.add(terms_b[j])
+            if not term.is_zero:
+                merged.append(term)
+            i += 1
+            j += 1
+    merged += [term.clone() for term in terms_a[i:]]
+    merged += [term.clone() for term in terms_b[j:]]
+    return merged
@@ -0,0 +1,177 @@
+import operator
+import os
+import threading
+import zlib
+from itertools import repeat
+
+from .term import Term, _is_a
+from .monomial import encoder_for_product
+from . import budget as _budget
+
+
+# ADD.distribute multiplies two sums in parallel when the number of term pairs
+# is at least THRESHOLD. WORKERS is the number of processes (None: one per CPU).
+THRESHOLD = 1000000
+WORKERS = None
+
+# How often (seconds) multiply checks the current budget while it waits for the workers.
+POLL = 0.1
+
+
+def _encode(term):
+    """Compact, picklable form of a Term that can't be packed (see monomial):
+    (coefficient, ((label, power), ...)) sorted by label."""
+    return (term.coefficient, tuple(sorted((var.base.label, var.power) for var in term.variables)))
+
+def _multiply_monomials(a, b):
+    """Multiply two encoded monomials by merging their sorted (label, power) pairs."""
+    if not a: return b
+    if not b: return a
+    product = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        if a[i][0] == b[j][0]:
+            power = a[i][1] + b[j][1]
+            if power != 0:
+                product.append((a[i][0], power))
+            i += 1
+            j += 1
+        elif a[i][0] < b[j][0]:
+            product.append(a[i])
+            i += 1
+        else:
+            product.append(b[j])
+            j += 1
+    product.extend(a[i:])
+    product.extend(b[j:])
+    return tuple(product)
+
+def _partition(monomial, partitions):
+    if _is_a(monomial, int):
+        return monomial % partitions
+    # str hashes are salted per process, so use a hash every worker agrees on
+    return zlib.crc32(repr(monomial).encode()) % partitions
+
+def _chunks(items, count):
+    size = max(1, -(-len(items) // count))
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _multiply_chunk(chunk, factor, partitions):
+    """Multiply a chunk of one operand by the whole other operand, factor.
+
+    Like terms are combined as they are produced, and the results are split into
+    partitions by monomial hash so each partition can be merged independently.
+    """
+    buckets = [{} for _ in range(partitions)]
+    # packed monomials multiply by integer addition
+    product = operator.add if factor and _is_a(factor[0][1], int) else _multiply_monomials
+    for coefficient_a, monomial_a in chunk:
+        # only has a budget to check when multiply runs this in its own process
+        _budget.check()
+        for coefficient_b, monomial_b in factor:
+            monomial = product(monomial_a, monomial_b)
+            bucket = buckets[_partition(monomial, partitions)]
+            bucket[monomial] = bucket.get(monomial, 0) + coefficient_a * coefficient_b
+    return buckets
+
+def _merge_partition(buckets):
+    """Combine like terms across the buckets of one partition, dropping zeros."""
+    total = {}
+    for bucket in buckets:
+        for monomial, coefficient in bucket.items():
+            total[monomial] = total.get(monomial, 0) + coefficient
+    return [(coefficient, monomial) for monomial, coefficient in total.items() if coefficient != 0]
+
+
+# The pools multiply uses unless it is given one, by number of workers; each is
+# started on first use and kept, so only the first product pays for starting
+# the worker processes.
+_pools = {}
+_pool_lock = threading.Lock()
+
+def _shared_pool(workers):
+    with _pool_lock:
+        if workers not in _pools:
+            # imported here: multiprocessing is slow to load, and most processes never multiply in parallel
+            from concurrent.futures import ProcessPoolExecutor
+            _pools[workers] = ProcessPoolExecutor(workers)
+        return _pools[workers]
+
+def shutdown():
+    """Stop the worker processes of the shared pools (a later multiply starts new ones)."""
+    with _pool_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.shutdown()
+
+def _in_worker():
+    """True in a worker process of a pool (the server's, say). A pool started
+    there would outlive the tasks and keep the worker from exiting."""
+    import multiprocessing
+    return multiprocessing.parent_process() is not None
+
+def _results(pool, func, *iterables):
+    """list(pool.map(func, *iterables)), checking the current budget while the
+    tasks run. Tasks not started yet are cancelled when it runs out; running
+    ones finish in their worker, and their results are dropped."""
+    from concurrent.futures import wait
+    futures = [pool.submit(func, *args) for args in zip(*iterables)]
+    try:
+        while wait(futures, timeout=POLL).not_done:
+            _budget.check()
+        _budget.check()
+    except BaseException:
+        for future in futures:
+            future.cancel()
+        raise
+    return [future.result() for future in futures]
+
+def multiply(terms_a, terms_b, workers=None, pool=None):
+    """Multiply two sums of Terms in a process pool; returns the list of product Terms.
+
+    Terms travel to the workers with their monomials packed into integers (see
+    monomial.MonomialEncoder), or as sorted (label, power) tuples when they can't
+    be packed. The larger operand is split into chunks; each worker multiplies its
+    chunks by the whole smaller operand, combining like terms as it goes. The
+    partial products are then merged in parallel, one monomial hash partition per
+    task.
+
+    In a child process (a worker of the server's pool, say) the product is
+    computed in that process instead of in a pool of its own. The current budget (see budget.using) is checked
+    while the workers run, so BudgetExceeded can stop a product part way.
+
+    pool -- a concurrent.futures.ProcessPoolExecutor to use; by default a shared
+        pool with workers processes is started on first use and kept (see shutdown)
+    """
+    for term in terms_a + terms_b:
+        if not _is_a(term, Term):
+            raise TypeError("{} must be of type Term to multiply in parallel.".format(term))
+    if len(terms_a) < len(terms_b):
+        terms_a, terms_b = terms_b, terms_a
+    workers = workers or WORKERS or os.cpu_count() or 1
+    partitions = workers
+    encoder = encoder_for_product(terms_a, terms_b)
+    if encoder is not None:
+        encoded_a = [(term.coefficient, encoder.encode(term)) for term in terms_a]
+        encoded_b = [(term.coefficient, encoder.encode(term)) for term in terms_b]
+        decode = encoder.decode
+    else:
+        variables = {var.base.label: var.base for term in terms_a + terms_b for var in term.variables}
+        encoded_a = [_encode(term) for term in terms_a]
+        encoded_b = [_encode(term) for term in terms_b]
+        decode = lambda monomial: [(variables[label], power) for label, power in monomial]
+
+    if pool is None and _in_worker():
+        # already one of many processes: multiply here, in one partition
+        merged = [_merge_partition(_multiply_chunk(encoded_a, encoded_b, 1))]
+    else:
+        pool = pool or _shared_pool(workers)
+        chunks = _chunks(encoded_a, workers * 4)
+        partials = _results(pool, _multiply_chunk, chunks, repeat(encoded_b, len(chunks)), repeat(partitions, len(chunks)))
+        by_partition = [[partial[i] for partial in partials] for i in range(partitions)]
+        merged = _results(pool, _merge_partition, by_partition)
+    # the workers don't know the coefficient backend; the Terms reduce the sums
+    terms = [Term(coefficient, decode(monomial)) for part in merged for coefficient, monomial in part]
+    return [term for term in terms if not term.is_zero]
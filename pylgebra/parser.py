@@ -0,0 +1,127 @@
+from .operations import *
+from .term import Term, _is_a
+from . import coefficients
+from .tokenlist import *
+
+
+# Grammar rules
+# expression        -> addition ;
+# addition          -> multiplication ( ("-" | "+") multiplication )* ;
+# multiplication    -> unary ( ("/" | "*")? unary )* ;
+# unary             -> ("-") unary | power ;
+# power             -> primary "^" unary | primary ;
+# primary           -> NUMBER | VARIABLE | "(" expression ")" ;
+#
+# Factors written next to each other multiply ("3xy^2", "2(x + 1)"), and
+# adjacent Terms are merged into a single Term as they are parsed.
+class Parser(object):
+    def __init__(self, equation):
+        self.equation = equation
+        self.tokens = TokenList(equation).tokenize()
+        self.current = 0
+
+    def parse(self):
+        """Parse the whole string as an expression.
+
+        Raises:
+        ValueError -- if the string isn't a well formed expression
+        """
+        expr = self.expression()
+        if not self.is_at_end():
+            self._err("unexpected " + self.peek())
+        return expr
+
+    def _err(self, msg):
+        raise ValueError(" ".join((self.equation, "not formatted correctly >>", msg)))
+
+    def expression(self):
+        return self.addition()
+
+    def addition(self):
+        expr = self.multiplication()
+        while self.match(PLUS, MINUS):
+            operator = self.previous()
+            right = self.multiplication()
+            if operator == PLUS: expr = ADD(expr, right)
+            else: expr = SUB(expr, right)
+        return expr
+
+    def multiplication(self):
+        expr = self.unary()
+        while True:
+            if self.match(STAR, SLASH):
+                operator = self.previous()
+            elif self.check(NUMBER, VARIABLE, LEFT_PAREN):
+                # implied multiplication
+                operator = STAR
+            else:
+                break
+            right = self.unary()
+            if operator == SLASH: expr = DIV(expr, right)
+            elif _is_a(expr, Term) and _is_a(right, Term): expr = Term(expr, right)
+            else: expr = MULT(expr, right)
+        return expr
+
+    def unary(self):
+        if self.match(MINUS):
+            right = self.unary()
+            if _is_a(right, Term): return Term(-1, right)
+            return MULT(-1, right)
+        return self.power()
+
+    def power(self):
+        expr = self.primary()
+        if self.match(POWER):
+            # exponents are plain numbers, whatever the coefficient backend
+            with coefficients.using("exact"):
+                exponent = self.unary()
+                if not _is_a(exponent, Term):
+                    exponent.simplify()
+                    exponent = exponent.value
+            if not _is_a(exponent, Term) or not exponent.is_constant:
+                self._err("exponents must be numbers")
+            exponent = exponent.coefficient
+            exponent = int(exponent) if exponent == int(exponent) else float(exponent)
+            if _is_a(expr, Term) and _is_a(exponent, int):
+                expr = expr.clone()
+                expr.power(exponent)
+            else:
+                expr = POW(expr, exponent)
+        return expr
+
+    def primary(self):
+        if self.match(NUMBER):
+            token = self.previous()
+            return Term(float(token) if "." in token else int(token))
+        if self.match(VARIABLE):
+            return Term(self.previous())
+        if self.match(LEFT_PAREN):
+            expr = self.expression()
+            if not self.match(RIGHT_PAREN):
+                self._err("expected )")
+            return expr
+        self._err("unexpected " + (self.peek() if not self.is_at_end() else "end of expression"))
+
+    def match(self, *symbols):
+        if self.check(*symbols):
+            self.advance()
+            return True
+        return False
+
+    def check(self, *symbols):
+        if self.is_at_end(): return False
+        return kind(self.peek()) in symbols
+
+    def advance(self):
+        if not self.is_at_end():
+            self.current += 1
+        return self.previous()
+
+    def is_at_end(self):
+        return self.current == self.tokens.length
+
+    def peek(self):
+        return self.tokens.get(self.current)
+
+    def previous(self):
+        return self.tokens.get(self.current - 1)
@@ -0,0 +1,247 @@
+from .operations import ADD, MULT, DIV, POW, OPERATION, choose, simplify_tree
+from .operations import _operands, _set_operands, _reduced
+from .term import Term, _is_a
+from . import budget as _budget
+
+
+# Forms an expression can be simplified to:
+# expanded -- everything multiplied out (what simplify() does)
+# factored -- nothing multiplied out: products and powers of sums are kept
+# partial -- only the products and powers whose expansion stays small
+#     (at most ratio times the size of the factored node) are multiplied out
+STRATEGIES = ("expanded", "factored", "partial")
+
+# What the result is for; each weighs the size of a form against the work of
+# producing it differently (see Plan).
+GOALS = ("evaluate", "compare", "display", "solve")
+
+
+class _Estimate(object):
+    """Size estimates for one node, as each strategy would leave it.
+
+    terms -- upper bound on the terms of the expanded node
+    highest -- highest power of each variable label, or None if not a polynomial
+    size, work -- per strategy: Terms in the result, and Term products to get there
+    keep -- per strategy: True if the node is left as it is rather than expanded
+    """
+    __slots__ = ("terms", "highest", "size", "work", "keep")
+
+
+def _monomial_bound(highest):
+    if highest is None:
+        return None
+    bound = 1
+    for power in highest.values():
+        bound *= power + 1
+    return bound
+
+def _bounded(terms, highest):
+    bound = _monomial_bound(highest)
+    return terms if bound is None else min(terms, bound)
+
+def _merge(highest_a, highest_b, combine):
+    if highest_a is None or highest_b is None:
+        return None
+    merged = dict(highest_a)
+    for label, power in highest_b.items():
+        merged[label] = combine(merged.get(label, 0), power)
+    return merged
+
+def _term_estimate(term):
+    estimate = _Estimate()
+    estimate.terms = 1
+    estimate.highest = {}
+    for var in term.variables:
+        if not _is_a(var.power, int) or var.power < 0:
+            estimate.highest = None
+            break
+        estimate.highest[var.base.label] = var.power
+    estimate.size = {strategy: 1 for strategy in STRATEGIES}
+    estimate.work = {strategy: 0 for strategy in STRATEGIES}
+    estimate.keep = {strategy: False for strategy in STRATEGIES}
+    return estimate
+
+def _node_estimate(node, operands, ratio):
+    """The estimate of an operation, given the estimates of its operands."""
+    estimate = _Estimate()
+    if _is_a(node, ADD):
+        estimate.terms = sum(operand.terms for operand in operands)
+        estimate.highest = {}
+        for operand in operands:
+            estimate.highest = _merge(estimate.highest, operand.highest, max)
+        # sums are always combined; they never multiply anything out
+        estimate.size = {s: sum(operand.size[s] for operand in operands) for s in STRATEGIES}
+        estimate.work = {s: sum(operand.work[s] for operand in operands) for s in STRATEGIES}
+        estimate.keep = {s: False for s in STRATEGIES}
+        return estimate
+
+    if _is_a(node, MULT):
+        a, b = operands
+        estimate.highest = _merge(a.highest, b.highest, lambda x, y: x + y)
+        estimate.terms = _bounded(a.terms * b.terms, estimate.highest)
+        expansion = a.terms * b.terms
+    elif _is_a(node, DIV):
+        a, b = operands
+        # a sum over a Term is divided term by term; anything else stays a quotient
+        estimate.highest = None
+        estimate.terms = a.terms if b.terms == 1 else a.terms + b.terms
+        expansion = a.terms
+    else:
+        (a,) = operands
+        exponent = node._exponent
+        if _is_a(exponent, int) and exponent >= 0:
+            estimate.highest = None if a.highest is None else \
+                {label: power * exponent for label, power in a.highest.items()}
+            estimate.terms = _bounded(choose(a.terms + exponent - 1, a.terms - 1), estimate.highest) \
+                if exponent else 1
+            # repeated squaring: every step multiplies something up to the result's size by the base
+            expansion = estimate.terms * a.terms * max(1, exponent.bit_length())
+        else:
+            estimate.highest = None
+            estimate.terms = a.terms
+            expansion = a.terms
+
+    estimate.size, estimate.work, estimate.keep = {}, {}, {}
+    for strategy in STRATEGIES:
+        factored_size = sum(operand.size[strategy] for operand in operands)
+        operand_work = sum(operand.work[strategy] for operand in operands)
+        if strategy == "expanded":
+            keep = False
+        elif any(operand.keep[strategy] for operand in operands):
+            # expanding around a kept node would multiply it out after all
+            keep = True
+        elif strategy == "factored":
+            keep = estimate.terms > 1
+        else:
+            keep = estimate.terms > ratio * factored_size
+        estimate.keep[strategy] = keep
+        if keep:
+            estimate.size[strategy] = factored_size
+            estimate.work[strategy] = operand_work
+        else:
+            estimate.size[strategy] = estimate.terms
+            estimate.work[strategy] = operand_work + expansion
+    return estimate
+
+def _children(node):
+    # like simplify_tree, a sum is handled as a whole through its flat terms
+    return node.terms if _is_a(node, ADD) else _operands(node)
+
+
+class Plan(object):
+    """How to simplify an expression for a goal, and the estimates behind the choice.
+
+    Estimates are upper bounds from term counts and degrees (the multinomial
+    count of powers of sums, capped by the number of monomials that fit under the
+    highest powers); no expansion is done to make them.
+
+    Instance variables:
+    expr -- the expression planned for
+    goal -- one of GOALS
+    strategy -- the chosen one of STRATEGIES
+    estimates -- {strategy: {"size": Terms in the result, "work": Term products
+        to get there, "cost": the two weighed for the goal}}
+
+    Public methods:
+    apply -- simplify expr in place by the chosen strategy
+    """
+    def __init__(self, expr, goal, strategy, estimates, keep):
+        self.expr = expr
+        self.goal = goal
+        self.strategy = strategy
+        self.estimates = estimates
+        self._keep = keep
+
+    def apply(self, budget=None, strategy=None):
+        """Simplify expr in place by strategy (by default the chosen one); read the
+        result back through .value, as with simplify().
+
+        Nodes kept factored still get their operands simplified.
+        """
+        strategy = strategy or self.strategy
+        if strategy == "expanded":
+            simplify_tree(self.expr, budget)
+            return
+        keep = self._keep[strategy]
+        with _budget.using(budget):
+            stack = [(self.expr, False)]
+            while stack:
+                node, ready = stack.pop()
+                if ready:
+                    _budget.spend()
+                    if id(node) in keep:
+                        _set_operands(node, [_reduced(operand) for operand in _operands(node)])
+                    else:
+                        node._simplify_node()
+                elif not _is_a(node, Term):
+                    stack.append((node, True))
+                    stack.extend((child, False) for child in _children(node) if not _is_a(child, Term))
+
+    def __str__(self):
+        lines = ["{} for {}:".format(self.strategy, self.goal)]
+        for strategy in STRATEGIES:
+            lines.append("  {}: size {size}, work {work}, cost {cost}".format(strategy, **self.estimates[strategy]))
+        return "\n".join(lines)
+
+
+def _cost(goal, strategy, size, work, variables, canonical):
+    if goal == "evaluate":
+        return work + size
+    if goal == "display":
+        return size + work / 100
+    if goal == "compare":
+        # only fully expanded sums have one form to compare term by term
+        return work + size if canonical else float("inf")
+    # solve: the residual and a derivative per unknown are compiled; derivatives
+    # of products and powers (product and chain rules) grow about twice as fast
+    return work + size * (1 + (1 if canonical else 2) * variables)
+
+def plan(expr, goal="evaluate", ratio=4):
+    """Estimate each strategy for simplifying expr and choose the cheapest for goal.
+
+    ratio -- for the partial strategy, the most a product or power may grow
+        (expanded Terms per factored Term) and still be multiplied out
+    """
+    if goal not in GOALS:
+        raise ValueError("unknown goal: {}".format(goal))
+    if not _is_a(expr, Term, OPERATION):
+        raise TypeError("{} must be a Term or operation to plan for.".format(expr))
+    estimates = {}
+    keep = {strategy: set() for strategy in STRATEGIES}
+    labels = set()
+    stack = [(expr, False)]
+    while stack:
+        node, ready = stack.pop()
+        if _is_a(node, Term):
+            estimates[id(node)] = _term_estimate(node)
+            labels.update(var.base.label for var in node.variables)
+        elif not ready:
+            stack.append((node, True))
+            stack.extend((child, False) for child in _children(node))
+        else:
+            operands = [estimates[id(child)] for child in _children(node)]
+            estimate = _node_estimate(node, operands, ratio)
+            estimates[id(node)] = estimate
+            for strategy in STRATEGIES:
+                if estimate.keep[strategy]:
+                    keep[strategy].add(id(node))
+    root = estimates[id(expr)]
+
+    summary = {}
+    for strategy in STRATEGIES:
+        size, work = root.size[strategy], root.work[strategy]
+        canonical = strategy == "expanded" or not keep[strategy]
+        summary[strategy] = {"size": size, "work": work,
+                             "cost": _cost(goal, strategy, size, work, len(labels), canonical)}
+    # ties go to the strategy that changes the least
+    best = min(("factored", "partial", "expanded"), key=lambda strategy: summary[strategy]["cost"])
+    if not keep[best]:
+        # nothing is kept factored, so it is the same as expanding
+        best = "expanded"
+    return Plan(expr, goal, best, summary, keep)
+
+def simplify_for(expr, goal="evaluate", budget=None):
+    """Simplify expr in place into the cheapest form for goal; returns the Plan used."""
+    chosen = plan(expr, goal)
+    chosen.apply(budget)
+    return chosen
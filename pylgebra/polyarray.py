@@ -0,0 +1,218 @@
+import json
+import os
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .operations import ADD
+from .term import Term, Variable, _is_a
+
+
+# evaluate works through the terms in blocks of this many rows, so evaluating
+# at many points at once needs memory for BLOCK_SIZE * points values at most
+BLOCK_SIZE = 1 << 16
+
+
+def _require_numpy():
+    if numpy is None:
+        raise ImportError("PolyArray needs NumPy; install numpy to use it.")
+
+def _coefficient_array(coefficients):
+    """Store coefficients natively when NumPy can, as Python objects when it can't."""
+    try:
+        return numpy.array(coefficients)
+    except OverflowError:
+        return numpy.array(coefficients, dtype=object)
+
+
+class PolyArray(object):
+    """A polynomial stored as parallel NumPy arrays instead of Term objects.
+
+    Instance variables:
+    coefficients -- 1-D array, one entry per term
+    exponents -- 2-D integer array, one row per term and one column per variable
+    variables -- list of variable labels; column i of exponents belongs to variables[i]
+
+    The arrays may be memory-mapped (see open), in which case the PolyArray is
+    read-only: every method returns a new PolyArray and never writes to them.
+
+    Public methods:
+    from_terms, from_expr -- (classmethods) build from Terms, or from a Term or ADD of Terms
+    to_terms, to_expr -- convert back to a list of Terms, or to a Term or ADD
+    add -- sum with another PolyArray, combining like terms
+    multiply_term -- multiply every term by a Term
+    evaluate -- value at a point, or at many points given as arrays
+    sort -- order the terms by a monomial order, leading term first
+    combine -- combine like terms and drop zero terms
+    save -- write to a directory of .npy files
+    open -- (classmethod) load a saved PolyArray, memory-mapped by default
+    """
+    def __init__(self, coefficients, exponents, variables):
+        _require_numpy()
+        if exponents.ndim != 2 or exponents.shape != (len(coefficients), len(variables)):
+            raise ValueError("exponents must have one row per coefficient and one column per variable")
+        self.coefficients = coefficients
+        self.exponents = exponents
+        self.variables = list(variables)
+
+    @classmethod
+    def from_terms(cls, terms):
+        _require_numpy()
+        labels = sorted({var.base.label for term in terms for var in term.variables})
+        column = {label: i for i, label in enumerate(labels)}
+        exponents = numpy.zeros((len(terms), len(labels)), dtype=numpy.int64)
+        for row, term in enumerate(terms):
+            if not _is_a(term, Term):
+                raise TypeError("{} must be of type Term to store in a PolyArray.".format(term))
+            for var in term.variables:
+                exponents[row, column[var.base.label]] = var.power
+        return cls(_coefficient_array([term.coefficient for term in terms]), exponents, labels)
+
+    @classmethod
+    def from_expr(cls, expr):
+        """Build from a Term, or an ADD whose terms are all Terms (simplify it first)."""
+        if _is_a(expr, Term):
+            return cls.from_terms([expr])
+        if _is_a(expr, ADD):
+            return cls.from_terms(expr.terms)
+        raise TypeError("{} must be a Term or ADD of Terms to store in a PolyArray.".format(expr))
+
+    def to_terms(self):
+        terms = []
+        for coefficient, row in zip(self.coefficients.tolist(), self.exponents.tolist()):
+            terms.append(Term(coefficient, [(label, power) for label, power in zip(self.variables, row) if power]))
+        return terms
+
+    def to_expr(self):
+        terms = self.to_terms()
+        if not terms:
+            return Term(0)
+        if len(terms) == 1:
+            return terms[0]
+        expr = ADD._join(None, None)
+        expr._set_terms(terms)
+        return expr
+
+    def _with_variables(self, labels):
+        """Exponents with one column per label (a superset of self.variables)."""
+        if labels == self.variables:
+            return self.exponents
+        exponents = numpy.zeros((len(self), len(labels)), dtype=self.exponents.dtype)
+        index = {label: i for i, label in enumerate(labels)}
+        exponents[:, [index[label] for label in self.variables]] = self.exponents
+        return exponents
+
+    def combine(self):
+        """Return a new PolyArray with like terms combined and zero terms dropped."""
+        if not len(self):
+            return PolyArray(self.coefficients.copy(), self.exponents.copy(), self.variables)
+        unique, inverse = numpy.unique(self.exponents, axis=0, return_inverse=True)
+        coefficients = numpy.zeros(len(unique), dtype=self.coefficients.dtype)
+        numpy.add.at(coefficients, inverse.reshape(-1), self.coefficients)
+        keep = coefficients != 0
+        # drop variables that no longer appear in any term
+        used = unique[keep].any(axis=0)
+        return PolyArray(coefficients[keep], unique[keep][:, used],
+                         [label for label, keep_column in zip(self.variables, used) if keep_column])
+
+    def add(self, other):
+        """Return the sum of this PolyArray and other, with like terms combined."""
+        labels = sorted(set(self.variables) | set(other.variables))
+        exponents = numpy.concatenate((self._with_variables(labels), other._with_variables(labels)))
+        coefficients = numpy.concatenate((self.coefficients, other.coefficients))
+        return PolyArray(coefficients, exponents, labels).combine()
+
+    def multiply_term(self, term):
+        """Return this PolyArray with every term multiplied by term."""
+        if not _is_a(term, Term):
+            raise TypeError("{} must be of type Term to multiply a PolyArray.".format(term))
+        labels = sorted(set(self.variables) | {var.base.label for var in term.variables})
+        shift = numpy.zeros(len(labels), dtype=self.exponents.dtype)
+        for var in term.variables:
+            shift[labels.index(var.base.label)] += var.power
+        result = PolyArray(self.coefficients * term.coefficient, self._with_variables(labels) + shift, labels)
+        return result.combine() if term.is_zero or (shift < 0).any() else result
+
+    def evaluate(self, values):
+        """Evaluate at the given values.
+
+        values maps Variables (or labels) to numbers or equal-length 1-D arrays;
+        with arrays the result is an array with one value per point.
+
+        Raises:
+        ValueError -- if a variable of the polynomial has no value
+        """
+        by_label = {(var.label if _is_a(var, Variable) else var): value for var, value in values.items()}
+        missing = [label for label in self.variables if label not in by_label]
+        if missing:
+            raise ValueError("no value for {}".format(", ".join(missing)))
+        points = numpy.broadcast_arrays(*[numpy.asarray(by_label[label], dtype=float) for label in self.variables]) \
+            if self.variables else []
+        shape = points[0].shape if points else ()
+        points = [point.reshape(1, -1) for point in points]
+
+        total = numpy.zeros(shape, dtype=float).reshape(-1)
+        for start in range(0, len(self), BLOCK_SIZE):
+            stop = start + BLOCK_SIZE
+            block = numpy.asarray(self.coefficients[start:stop], dtype=float).reshape(-1, 1)
+            for column, point in enumerate(points):
+                block = block * point ** self.exponents[start:stop, column].reshape(-1, 1)
+            total += block.sum(axis=0)
+        return total.reshape(shape)[()] if shape else float(total[0]) if len(total) else 0.0
+
+    def sort(self, order="lex"):
+        """Return a new PolyArray with the terms sorted by order, leading term first.
+
+        Variables are ranked by label (x > y > z). order is one of:
+        lex -- compare exponents variable by variable
+        grlex -- compare total degree, then lex
+        grevlex -- compare total degree, then the smallest exponent of the last
+            differing variable wins
+        """
+        columns = [self.exponents[:, i] for i in range(len(self.variables))]
+        degree = self.exponents.sum(axis=1)
+        # lexsort sorts by its last key first
+        if order == "lex":
+            keys = [-column for column in reversed(columns)]
+        elif order == "grlex":
+            keys = [-column for column in reversed(columns)] + [-degree]
+        elif order == "grevlex":
+            keys = columns + [-degree]
+        else:
+            raise ValueError("unknown monomial order: {}".format(order))
+        index = numpy.lexsort(keys) if keys else numpy.arange(len(self))
+        return PolyArray(self.coefficients[index], self.exponents[index], self.variables)
+
+    def save(self, path):
+        """Write to the directory path as coefficients.npy, exponents.npy and variables.json."""
+        os.makedirs(path, exist_ok=True)
+        numpy.save(os.path.join(path, "coefficients.npy"), self.coefficients,
+                   allow_pickle=self.coefficients.dtype == object)
+        numpy.save(os.path.join(path, "exponents.npy"), self.exponents)
+        with open(os.path.join(path, "variables.json"), "w") as f:
+            json.dump(self.variables, f)
+
+    @classmethod
+    def open(cls, path, mmap_mode="r"):
+        """Load a PolyArray saved in the directory path.
+
+        By default the arrays are memory-mapped read-only: opening is instant, and
+        every process that opens the same files shares their pages instead of
+        copying them. Pass mmap_mode=None to read them into memory instead.
+        (Coefficients too big for NumPy's integers are stored as Python objects,
+        which are always read into memory.)
+        """
+        _require_numpy()
+        with open(os.path.join(path, "variables.json")) as f:
+            variables = json.load(f)
+        try:
+            coefficients = numpy.load(os.path.join(path, "coefficients.npy"), mmap_mode=mmap_mode)
+        except ValueError:
+            coefficients = numpy.load(os.path.join(path, "coefficients.npy"), allow_pickle=True)
+        exponents = numpy.load(os.path.join(path, "exponents.npy"), mmap_mode=mmap_mode)
+        return cls(coefficients, exponents, variables)
+
+    def __len__(self):
+        return len(self.coefficients)
@@ -0,0 +1,320 @@
+import asyncio
+import json
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from .term import Term, Variable, _is_a
+from .parser import Parser
+from .equation import Equation
+from .newton import NewtonSolver
+from .budget import Budget
+
+
+class ServerError(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+# The work itself runs in the process pool, so it has to live at module level
+# where the workers can find it.
+# limits is a dict of budget.Budget arguments; a worker stops by itself once its
+# budget runs out, rather than running on after its request timed out.
+def _simplify_text(expr_str, limits):
+    expr = Parser(expr_str).parse()
+    if not _is_a(expr, Term):
+        expr.simplify(Budget(**limits))
+        expr = expr.value
+    return str(expr)
+
+def _solve_text(eqn_str, variables, start, limits):
+    equation = Equation([Variable(label) for label in variables], eqn_str=eqn_str)
+    return NewtonSolver(equation, budget=Budget(**limits)).solve(start)
+
+def _run(func, *args):
+    """func(*args) in a worker. Errors come back as a ServerError naming the
+    original: the pool pickles them, and an exception that doesn't pickle would
+    break the whole pool."""
+    try:
+        return func(*args)
+    except Exception as err:
+        raise ServerError("{}: {}".format(type(err).__name__, err)) from None
+
+
+class SolveServer(object):
+    """A local asyncio server for simplify and solve requests, speaking JSON Lines.
+
+    Each request is one JSON object per line:
+        {"id": 1, "op": "simplify", "expr": "(x + 1)^2"}
+        {"id": 2, "op": "solve", "equation": "x^2 = 2", "variables": ["x"], "start": 1}
+    optionally with "deadline" (seconds) to shorten the server's deadline for
+    that request. Each
+    response echoes the id with either "result" or "error". Responses are sent as
+    soon as they are ready, so they may come back out of order.
+
+    Parsing, simplifying and solving run in a process pool, never on the event
+    loop. Identical requests that arrive while one is being computed share that
+    computation, and recent results are kept in an LRU cache. If a worker dies,
+    the requests it had fail and the pool is replaced for the ones after them.
+
+    Each computation runs on a budget.Budget: it gives up after the server's
+    deadline, and with max_terms set, expansions estimated to grow past that many
+    terms are rejected before they start.
+
+    Backpressure: each connection has at most max_in_flight requests running
+    (the server stops reading from it until one finishes), and the server as a
+    whole rejects new work with a "busy" error past max_pending computations.
+
+    Public methods:
+    start -- start listening; address tells where
+    close -- stop listening and shut the process pool down, dropping queued work
+    serve_forever -- start, and serve until cancelled
+
+    Properties:
+    address -- (host, port) for TCP, or the socket path
+    stats -- counters for requests, cache hits, coalesced requests and computations
+    """
+    def __init__(self, host="127.0.0.1", port=0, path=None, workers=None, max_pending=64,
+                 max_in_flight=16, deadline=30.0, cache_size=1024, max_line=1 << 20, max_terms=None):
+        self.host = host
+        self.port = port
+        self.path = path
+        self.workers = workers
+        self.max_pending = max_pending
+        self.max_in_flight = max_in_flight
+        self.deadline = deadline
+        self.cache_size = cache_size
+        self.max_line = max_line
+        self.max_terms = max_terms
+        self.stats = {"requests": 0, "cached": 0, "coalesced": 0, "computed": 0, "rejected": 0}
+        self._cache = OrderedDict()
+        self._in_flight = {}
+        self._connections = set()
+        self._server = None
+        self._pool = None
+
+    async def start(self):
+        self._pool = ProcessPoolExecutor(self.workers)
+        if self.path is not None:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path, limit=self.max_line)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port, limit=self.max_line)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for connection in list(self._connections):
+                connection.cancel()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+            await self._server.wait_closed()
+            self._server = None
+        if self._pool is not None:
+            # queued computations are dropped; a running one has no one waiting for
+            # it, and stops by itself once its budget's deadline passes
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    @property
+    def address(self):
+        if self.path is not None:
+            return self.path
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def _handle(self, reader, writer):
+        connection = asyncio.current_task()
+        self._connections.add(connection)
+        slots = asyncio.Semaphore(self.max_in_flight)
+        tasks = set()
+        try:
+            while True:
+                await slots.acquire()
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # longer than max_line; the stream can't be resynchronized
+                    self._send(writer, {"id": None, "error": "request too long"})
+                    break
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+                task.add_done_callback(lambda _: slots.release())
+            if tasks:
+                await asyncio.gather(*tasks)
+        except asyncio.CancelledError:
+            # the server is closing; this is the top of the connection's task, so
+            # finish quietly instead of reporting the cancellation as an error
+            for task in tasks:
+                task.cancel()
+        finally:
+            self._connections.discard(connection)
+            writer.close()
+
+    def _send(self, writer, response):
+        writer.write(json.dumps(response).encode() + b"\n")
+
+    async def _respond(self, line, writer):
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not _is_a(request, dict):
+                raise ServerError("request must be a JSON object")
+            request_id = request.get("id")
+            deadline = min(float(request.get("deadline", self.deadline)), self.deadline)
+            key, func, args = self._parse_request(request, deadline)
+            result = await asyncio.wait_for(asyncio.shield(self._compute(key, func, args, deadline)), deadline)
+            response = {"id": request_id, "result": result}
+        except asyncio.TimeoutError:
+            response = {"id": request_id, "error": "deadline exceeded"}
+        except ServerError as err:
+            response = {"id": request_id, "error": err.message}
+        except Exception as err:
+            response = {"id": request_id, "error": "{}: {}".format(type(err).__name__, err)}
+        self._send(writer, response)
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+
+    def _parse_request(self, request, deadline):
+        """Return (cache key, worker function, arguments) for a request, to be
+        computed within deadline seconds."""
+        self.stats["requests"] += 1
+        op = request.get("op")
+        if op == "simplify":
+            expr_str = request.get("expr")
+            if not _is_a(expr_str, str):
+                raise ServerError("simplify needs an 'expr' string")
+            expr_str = expr_str.replace(" ", "")
+            return (op, expr_str), _simplify_text, (expr_str, self._limits(deadline))
+        if op == "solve":
+            eqn_str = request.get("equation")
+            variables = request.get("variables")
+            start = request.get("start", 1.0)
+            if not _is_a(eqn_str, str):
+                raise ServerError("solve needs an 'equation' string")
+            if not _is_a(variables, list) or not variables or not all(_is_a(var, str) for var in variables):
+                raise ServerError("solve needs a list of 'variables'")
+            eqn_str = eqn_str.replace(" ", "")
+            start = tuple(start) if _is_a(start, list) else start
+            return (op, eqn_str, tuple(variables), start), _solve_text, (eqn_str, variables, start, self._limits(deadline))
+        raise ServerError("unknown op: {}".format(op))
+
+    def _limits(self, deadline):
+        return {"deadline": deadline, "max_terms": self.max_terms}
+
+    def _compute(self, key, func, args, deadline):
+        """Return a future for the result of func(*args), sharing it between identical keys.
+
+        Only requests with the same deadline share a computation, since the
+        worker gives up at its request's deadline; any of them fills the cache.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            self.stats["cached"] += 1
+            future.set_result(self._cache[key])
+            return future
+        flight = (key, deadline)
+        if flight in self._in_flight:
+            self.stats["coalesced"] += 1
+            return self._in_flight[flight]
+        if len(self._in_flight) >= self.max_pending:
+            self.stats["rejected"] += 1
+            raise ServerError("busy")
+
+        self.stats["computed"] += 1
+        pool = self._pool
+        try:
+            future = pool.submit(_run, func, *args)
+        except BrokenProcessPool:
+            pool = self._restart(pool)
+            future = pool.submit(_run, func, *args)
+        future = asyncio.wrap_future(future)
+        self._in_flight[flight] = future
+
+        def finished(future):
+            del self._in_flight[flight]
+            if not future.cancelled() and _is_a(future.exception(), BrokenProcessPool):
+                self._restart(pool)
+            if not future.cancelled() and future.exception() is None:
+                self._cache[key] = future.result()
+                if len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        future.add_done_callback(finished)
+        return future
+
+    def _restart(self, pool):
+        """Replace pool, whose worker died, with a new one; returns the pool to use."""
+        if self._pool is pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = ProcessPoolExecutor(self.workers)
+        return self._pool
+
+
+class SolveClient(object):
+    """A client for SolveServer; requests can be sent concurrently over one connection.
+
+    Public methods:
+    connect -- (classmethod, coroutine) open a connection to a server
+    request -- (coroutine) send a request and return its result
+    close -- (coroutine) close the connection
+    """
+    def __init__(self, reader, writer):
+        self._reader = reader
+        self._writer = writer
+        self._next_id = 0
+        self._waiting = {}
+        self._listener = asyncio.ensure_future(self._listen())
+
+    @classmethod
+    async def connect(cls, host="127.0.0.1", port=None, path=None):
+        if path is not None:
+            reader, writer = await asyncio.open_unix_connection(path)
+        else:
+            reader, writer = await asyncio.open_connection(host, port)
+        return cls(reader, writer)
+
+    async def _listen(self):
+        while True:
+            line = await self._reader.readline()
+            if not line:
+                break
+            response = json.loads(line)
+            future = self._waiting.pop(response.get("id"), None)
+            if future is not None and not future.done():
+                future.set_result(response)
+        for future in self._waiting.values():
+            future.set_exception(ServerError("connection closed"))
+
+    async def request(self, op, **params):
+        """Send {"op": op, **params} and return the result.
+
+        Raises:
+        ServerError -- if the server answers with an error
+        """
+        self._next_id += 1
+        request = dict(params, id=self._next_id, op=op)
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[self._next_id] = future
+        self._writer.write(json.dumps(request).encode() + b"\n")
+        await self._writer.drain()
+        response = await future
+        if "error" in response:
+            raise ServerError(response["error"])
+        return response["result"]
+
+    async def close(self):
+        self._writer.close()
+        await self._writer.wait_closed()
+        self._listener.cancel()
@@ -0,0 +1,383 @@
+import heapq
+import marshal
+import os
+import tempfile
+from fractions import Fraction
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .operations import ADD, MULT, DIV, POW, OPERATION
+from .term import Term, _is_a
+from .monomial import VariableIndex
+from .coefficients import get_coefficient_backend
+from . import budget as _budget
+
+
+# Terms an ExternalCombiner holds in memory before it sorts them and writes them
+# out as a run.
+MAX_TERMS = 1 << 20
+
+# Most runs merged at once; more are merged in several passes, so the files open
+# at any time (and their read buffers) stay bounded too.
+MAX_FANIN = 64
+
+# Runs are files of records, one marshal'd (monomial, coefficient) tuple each.
+# A monomial is a flat tuple (slot, power, slot, power, ...) sorted by slot,
+# slots coming from the VariableIndex of the combiner; comparing them as tuples
+# is the order runs are sorted and merged in. Fractions are stored as
+# (numerator, denominator), since marshal only knows built-in types.
+
+
+def _encode_coefficient(c):
+    return (c.numerator, c.denominator) if _is_a(c, Fraction) else c
+
+def _decode_coefficient(c):
+    return Fraction(*c) if _is_a(c, tuple) else c
+
+def _read(path):
+    """The (monomial, coefficient) records of a run, in order."""
+    with open(path, "rb") as f:
+        while True:
+            try:
+                monomial, c = marshal.load(f)
+            except EOFError:
+                return
+            yield monomial, _decode_coefficient(c)
+
+def _write(path, records):
+    """Write records to a run; returns how many there were."""
+    count = 0
+    with open(path, "wb") as f:
+        for monomial, c in records:
+            marshal.dump((monomial, _encode_coefficient(c)), f)
+            count += 1
+    return count
+
+def _combined(records):
+    """Sum the coefficients of consecutive records with the same monomial, dropping zeros."""
+    add = get_coefficient_backend().add
+    monomial = c = None
+    for next_monomial, next_c in records:
+        if next_monomial == monomial:
+            c = add(c, next_c)
+            continue
+        if monomial is not None and c != 0:
+            yield monomial, c
+        monomial, c = next_monomial, next_c
+    if monomial is not None and c != 0:
+        yield monomial, c
+
+def _times(a, b):
+    """Product of two flat monomials."""
+    powers = dict(zip(a[::2], a[1::2]))
+    for slot, power in zip(b[::2], b[1::2]):
+        powers[slot] = powers.get(slot, 0) + power
+    return tuple(x for slot in sorted(powers) if powers[slot] for x in (slot, powers[slot]))
+
+
+class ExternalCombiner(object):
+    """Combines like terms of a stream of Terms too big to hold in memory.
+
+    Terms are collected in memory, like terms combined as they come, until
+    max_terms different monomials are held; they are then sorted and written to a
+    temporary file (a run) and memory is cleared. finish merges the runs k ways,
+    summing the coefficients of like terms and dropping those that cancel, into
+    one sorted run. Memory is bounded by max_terms, whatever the size of the input
+    or the result.
+
+    Public methods:
+    add -- add a Term
+    extend -- add many Terms
+    finish -- merge everything added into an ExternalTerms
+    """
+    def __init__(self, max_terms=None, directory=None, index=None):
+        """Parameters:
+        max_terms -- monomials held in memory at most; defaults to MAX_TERMS
+        directory -- where the temporary files go; defaults to tempfile's
+        index -- the VariableIndex for monomials; pass one to share it between combiners
+        """
+        self.max_terms = max_terms or MAX_TERMS
+        self.directory = directory
+        self.index = index if index is not None else VariableIndex()
+        self.runs = 0
+        self._buffer = {}
+        self._paths = []
+        self._count = 0
+        self._add = get_coefficient_backend().add
+
+    def add(self, term):
+        if not _is_a(term, Term):
+            raise TypeError("{} must be of type Term to combine.".format(term))
+        index = self.index.index
+        monomial = tuple(x for slot, power in sorted((index(var.base), var.power) for var in term.variables)
+                         for x in (slot, power))
+        self._add_encoded(monomial, term.coefficient)
+
+    def extend(self, terms):
+        for term in terms:
+            self.add(term)
+
+    def _add_encoded(self, monomial, c):
+        buffer = self._buffer
+        if monomial in buffer:
+            buffer[monomial] = self._add(buffer[monomial], c)
+        else:
+            buffer[monomial] = c
+            if len(buffer) >= self.max_terms:
+                self._spill()
+
+    def _temporary(self):
+        fd, path = tempfile.mkstemp(suffix=".run", dir=self.directory)
+        os.close(fd)
+        self._paths.append(path)
+        return path
+
+    def _spill(self):
+        _budget.check()
+        self._count = _write(self._temporary(), ((m, c) for m, c in sorted(self._buffer.items()) if c != 0))
+        self._buffer = {}
+        self.runs += 1
+
+    def finish(self):
+        """Merge the runs; returns the combined Terms as an ExternalTerms, sorted by monomial.
+
+        The combiner is empty again afterwards.
+        """
+        if self._buffer or not self._paths:
+            self._spill()
+        paths, self._paths = self._paths, []
+        count = self._count
+        try:
+            while len(paths) > 1:
+                _budget.check()
+                merged = []
+                for i in range(0, len(paths), MAX_FANIN):
+                    group = paths[i:i + MAX_FANIN]
+                    path = self._temporary()
+                    records = heapq.merge(*(_read(p) for p in group), key=lambda record: record[0])
+                    count = _write(path, _combined(records))
+                    for p in group:
+                        os.remove(p)
+                    merged.append(path)
+                paths = merged
+                self._paths = []
+        except BaseException:
+            for p in paths + self._paths:
+                if os.path.exists(p):
+                    os.remove(p)
+            self._paths = []
+            raise
+        self.runs = 0
+        return ExternalTerms(paths[0], self.index, count)
+
+
+class ExternalTerms(object):
+    """Combined Terms in a file, sorted by monomial; read back as a stream.
+
+    Only one Term at a time is in memory while iterating. The file is deleted by
+    close (or at the end of a with block).
+
+    Instance variables:
+    path -- the file
+    index -- VariableIndex of the variables the monomials refer to
+
+    Public methods:
+    records -- iterate over (monomial, coefficient), monomials as in the file
+    to_expr -- read everything into a Term or ADD (only for results that fit in memory)
+    save -- write a memory-mapped PolyArray, one Term at a time
+    close -- delete the file
+    """
+    def __init__(self, path, index, count):
+        self.path = path
+        self.index = index
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def records(self):
+        return _read(self.path)
+
+    def __iter__(self):
+        variables = self.index.variables
+        for monomial, c in self.records():
+            yield Term(c, [(variables[slot], power) for slot, power in zip(monomial[::2], monomial[1::2])])
+
+    def to_expr(self):
+        terms = list(self)
+        if not terms:
+            return Term(0)
+        if len(terms) == 1:
+            return terms[0]
+        expr = ADD._join(None, None)
+        expr._set_terms(terms)
+        return expr
+
+    def save(self, path):
+        """Write the Terms as a PolyArray to the directory path (see PolyArray.save), and
+        return it opened memory-mapped.
+
+        The arrays are filled in place through memory maps, so this needs no more
+        memory than one Term. Coefficients that don't fit in int64 or float64
+        have to be stored as Python objects, which NumPy can't memory-map; they
+        are collected in memory instead.
+        """
+        from .polyarray import PolyArray, _require_numpy
+        import json
+        _require_numpy()
+        os.makedirs(path, exist_ok=True)
+        labels = [var.label for var in self.index.variables]
+        kinds = {type(c) for _, c in self.records()}
+        if kinds <= {int} and all(-(1 << 63) <= c < 1 << 63 for _, c in self.records()):
+            dtype = numpy.int64
+        elif kinds <= {int, float}:
+            dtype = numpy.float64
+        else:
+            dtype = object
+        exponents = numpy.lib.format.open_memmap(os.path.join(path, "exponents.npy"), mode="w+",
+                                                 dtype=numpy.int64, shape=(len(self), len(labels)))
+        coefficients = [] if dtype is object else numpy.lib.format.open_memmap(
+            os.path.join(path, "coefficients.npy"), mode="w+", dtype=dtype, shape=(len(self),))
+        for row, (monomial, c) in enumerate(self.records()):
+            for slot, power in zip(monomial[::2], monomial[1::2]):
+                exponents[row, slot] = power
+            if dtype is object:
+                coefficients.append(c)
+            else:
+                coefficients[row] = c
+        exponents.flush()
+        del exponents
+        if dtype is object:
+            array = numpy.empty(len(coefficients), dtype=object)
+            array[:] = coefficients
+            numpy.save(os.path.join(path, "coefficients.npy"), array, allow_pickle=True)
+        else:
+            coefficients.flush()
+            del coefficients
+        with open(os.path.join(path, "variables.json"), "w") as f:
+            json.dump(labels, f)
+        return PolyArray.open(path)
+
+    def close(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _multiply(a, b, max_terms, directory, index):
+    """The product of two ExternalTerms, as an ExternalTerms."""
+    if len(a) < len(b):
+        a, b = b, a
+    combiner = ExternalCombiner(max_terms, directory, index)
+    # the smaller factor is kept in memory if it fits, otherwise it is read
+    # again for every term of the other one
+    small = list(b.records()) if len(b) <= max_terms else None
+    multiply = get_coefficient_backend().multiply
+    for monomial_a, c_a in a.records():
+        _budget.check()
+        for monomial_b, c_b in (small if small is not None else b.records()):
+            combiner._add_encoded(_times(monomial_a, monomial_b), multiply(c_a, c_b))
+    return combiner.finish()
+
+def expand_external(expr, max_terms=None, directory=None):
+    """Multiply out expr, combining like terms on disk once they don't fit in memory.
+
+    Every sum, product and power in expr (and quotient by a Term) is expanded
+    into an ExternalTerms: products term by term into an ExternalCombiner, powers
+    by repeated squaring.
+    Memory holds at most about 2 * max_terms terms at any point (the combiner's
+    buffer, and one factor of a product if it fits), however big the
+    intermediate or final results get.
+
+    Returns an ExternalTerms, sorted by monomial; close it to delete its file.
+
+    Raises:
+    ValueError -- for quotients by anything but a Term, and powers that aren't
+        non-negative ints
+    BudgetExceeded -- if the current budget.Budget runs out
+    """
+    if not _is_a(expr, Term, OPERATION):
+        raise TypeError("{} must be a Term or operation to expand.".format(expr))
+    max_terms = max_terms or MAX_TERMS
+    index = VariableIndex()
+    values = {}
+    stack = [(expr, False)]
+    try:
+        while stack:
+            node, ready = stack.pop()
+            if _is_a(node, Term):
+                combiner = ExternalCombiner(max_terms, directory, index)
+                combiner.add(node)
+                values[id(node)] = combiner.finish()
+                continue
+            children = node.terms if _is_a(node, ADD) else \
+                (node._multiplicand, node._multiplier) if _is_a(node, MULT) else \
+                (node._dividend,) if _is_a(node, DIV) else (node._base,)
+            if not ready:
+                if _is_a(node, DIV) and (not _is_a(node._divisor, Term) or node._divisor.is_zero):
+                    raise ValueError("expand_external only divides by a nonzero Term: {}".format(node))
+                if _is_a(node, POW) and (not _is_a(node._exponent, int) or node._exponent < 0):
+                    raise ValueError("expand_external only expands non-negative int powers: {}".format(node))
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            # operands stay in values until they are used up, so they are
+            # deleted on errors too (close can be called more than once)
+            operands = [values[id(child)] for child in children]
+            if _is_a(node, ADD):
+                combiner = ExternalCombiner(max_terms, directory, index)
+                for operand in operands:
+                    for monomial, c in operand.records():
+                        combiner._add_encoded(monomial, c)
+                    operand.close()
+                values[id(node)] = combiner.finish()
+            elif _is_a(node, MULT):
+                values[id(node)] = _multiply(operands[0], operands[1], max_terms, directory, index)
+            elif _is_a(node, DIV):
+                # multiply by the reciprocal of the Term
+                divisor = node._divisor
+                combiner = ExternalCombiner(max_terms, directory, index)
+                combiner.add(Term(get_coefficient_backend().divide(1, divisor.coefficient),
+                                  [(var.base, -var.power) for var in divisor.variables]))
+                with combiner.finish() as reciprocal:
+                    values[id(node)] = _multiply(operands[0], reciprocal, max_terms, directory, index)
+            else:
+                values[id(node)] = _power(operands[0], node._exponent, max_terms, directory, index)
+            for child in children:
+                values.pop(id(child)).close()
+    except BaseException:
+        for value in values.values():
+            value.close()
+        raise
+    return values[id(expr)]
+
+def _power(base, exponent, max_terms, directory, index):
+    """base ** exponent by repeated squaring; base is consumed."""
+    combiner = ExternalCombiner(max_terms, directory, index)
+    combiner.add(Term(1))
+    result = combiner.finish()
+    try:
+        while exponent:
+            if exponent & 1:
+                product = _multiply(result, base, max_terms, directory, index)
+                result.close()
+                result = product
+            exponent >>= 1
+            if exponent:
+                square = _multiply(base, base, max_terms, directory, index)
+                base.close()
+                base = square
+    except BaseException:
+        result.close()
+        raise
+    finally:
+        base.close()
+    return result
@@ -0,0 +1,187 @@
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .operations import ADD, MULT, OPERATION, simplify_tree
+from .term import Term, Variable, _is_a
+from .equation import Equation
+from .compiler import compile_exprs, _labels
+from .derivative import Differentiator
+from .newton import SolveError
+from .polyarray import _require_numpy
+
+
+def _residual(expr):
+    """left - right of an Equation, simplified; any other expression simplified as it is."""
+    if _is_a(expr, Equation):
+        expr = ADD(expr.left, MULT(-1, expr.right))
+    else:
+        expr = expr.clone()
+    if _is_a(expr, Term):
+        return expr
+    simplify_tree(expr)
+    return expr.value
+
+def _sum(terms):
+    if not terms:
+        return Term(0)
+    if len(terms) == 1:
+        return terms[0]
+    result = ADD._join(None, None)
+    result._set_terms(terms)
+    return result
+
+def _polynomial_coefficients(residual, unknown):
+    """The coefficient of each power of unknown in residual, as expressions of the
+    other variables; None if residual is not a polynomial in unknown."""
+    terms = residual.terms if _is_a(residual, ADD) else [residual]
+    by_power = {}
+    for term in terms:
+        if not _is_a(term, Term):
+            return None
+        power = 0
+        others = []
+        for var in term.variables:
+            if var.base.label == unknown:
+                power = var.power
+            else:
+                others.append(var.clone())
+        if not _is_a(power, int) or power < 0:
+            return None
+        by_power.setdefault(power, []).append(Term(term.coefficient, others))
+    degree = max(by_power) if by_power else 0
+    return [_sum(by_power.get(power, [])) for power in range(degree + 1)]
+
+
+class Template(object):
+    """An expression or Equation whose coefficients are named parameters, prepared
+    once and then evaluated or solved for many rows of parameter values.
+
+    The template is simplified once. For solving, the residual (left - right) is
+    split into the coefficients of each power of the unknown; each coefficient is
+    an expression of the parameters only, and all of them are compiled into one
+    function. Binding a block of rows is then one call of that function on NumPy
+    columns, followed by the closed form of the roots:
+    degree 1 -- -c0 / c1
+    degree 2 -- the quadratic formula, in the form that doesn't cancel; rows whose
+        leading coefficient is 0 fall back to degree 1
+    Anything else (higher degrees, or not a polynomial in the unknown) has no
+    symbolic solution here; it is solved numerically, by Newton iterations run for
+    all rows at once, with the residual and its derivative compiled once.
+
+    Rows are given either as a 2-D array with one column per parameter (in the
+    order of parameters), or as a mapping from parameter label to a column.
+
+    Instance variables:
+    expr -- the simplified expression (the residual for an Equation)
+    parameters -- labels of the parameters, in column order
+    unknowns -- labels of the other variables
+    coefficients -- for one unknown, the coefficient expressions of each power
+        (constant first), or None if expr is not a polynomial in it
+
+    Public methods:
+    evaluate -- value of expr for every row, at given values of the unknowns
+    solve -- the roots for the unknown for every row
+    """
+    def __init__(self, expr, parameters, unknowns=None):
+        """Parameters:
+        expr -- a Term, operation, or Equation
+        parameters -- Variables or labels that change from row to row
+        unknowns -- Variables or labels; defaults to the variables of an Equation
+        """
+        _require_numpy()
+        if not _is_a(expr, Term, OPERATION, Equation):
+            raise TypeError("{} must be a Term, operation, or Equation.".format(expr))
+        self.parameters = _labels(parameters)
+        if unknowns is None:
+            unknowns = expr.variables if _is_a(expr, Equation) else []
+        self.unknowns = [label for label in _labels(unknowns) if label not in self.parameters]
+        self.expr = _residual(expr)
+        self._evaluate = compile_exprs([self.expr], self.unknowns + self.parameters)
+
+        self.coefficients = None
+        self._coefficients = None
+        self._system = None
+        if len(self.unknowns) == 1:
+            unknown = self.unknowns[0]
+            self.coefficients = _polynomial_coefficients(self.expr, unknown)
+            if self.coefficients is not None and len(self.coefficients) <= 3:
+                self._coefficients = compile_exprs(self.coefficients, self.parameters)
+            else:
+                derivative = Differentiator().differentiate(self.expr, unknown)
+                self._system = compile_exprs([self.expr, derivative], self.unknowns + self.parameters)
+
+    def _columns(self, rows):
+        if hasattr(rows, "keys"):
+            columns = [numpy.asarray(rows[label], dtype=float) for label in self.parameters]
+        else:
+            rows = numpy.asarray(rows, dtype=float)
+            if rows.ndim != 2 or rows.shape[1] != len(self.parameters):
+                raise ValueError("rows must have one column per parameter")
+            columns = [rows[:, i] for i in range(len(self.parameters))]
+        if not columns:
+            raise ValueError("a template needs at least one parameter")
+        return columns
+
+    def evaluate(self, rows, *values):
+        """expr for every row, with the unknowns at values (numbers or columns)."""
+        columns = self._columns(rows)
+        if len(values) != len(self.unknowns):
+            raise ValueError("need a value for each of {}".format(", ".join(self.unknowns)))
+        with numpy.errstate(all="ignore"):
+            result = self._evaluate(*values, *columns)[0]
+        return numpy.broadcast_to(numpy.asarray(result, dtype=float), columns[0].shape).copy()
+
+    def solve(self, rows, start=0.0, tolerance=1e-12, max_iterations=50):
+        """Roots of the template for every row.
+
+        Returns a 2-D float array with one row per parameter row and one column per
+        root (two for quadratics, one otherwise); roots that aren't real or weren't
+        found are nan. start, tolerance and max_iterations are only used when the
+        roots are found numerically (see NewtonSolver).
+
+        Raises:
+        SolveError -- if the template doesn't have exactly one unknown
+        """
+        if len(self.unknowns) != 1:
+            raise SolveError("a template is solved for exactly one unknown; it has {}".format(len(self.unknowns)))
+        columns = self._columns(rows)
+        shape = columns[0].shape
+        with numpy.errstate(all="ignore"):
+            if self._coefficients is None:
+                return self._newton(columns, start, tolerance, max_iterations)[:, None]
+            coefficients = [numpy.broadcast_to(numpy.asarray(c, dtype=float), shape)
+                            for c in self._coefficients(*columns)]
+            if len(coefficients) == 1:
+                return numpy.empty(shape + (0,))
+            linear = -coefficients[0] / coefficients[1]
+            if len(coefficients) == 2:
+                return linear[:, None]
+            return self._quadratic(*coefficients, linear)
+
+    @staticmethod
+    def _quadratic(c, b, a, linear):
+        root = numpy.sqrt(b * b - 4 * a * c)
+        # q = -(b + sign(b) * root) / 2 never subtracts nearly equal numbers
+        q = -(b + numpy.where(b < 0, -root, root)) / 2
+        first = numpy.where(q != 0, q / a, 0.0)
+        second = numpy.where(q != 0, c / q, 0.0)
+        degenerate = a == 0
+        first = numpy.where(degenerate, linear, first)
+        second = numpy.where(degenerate, numpy.nan, second)
+        return numpy.stack([first, second], axis=1)
+
+    def _newton(self, columns, start, tolerance, max_iterations):
+        x = numpy.full(columns[0].shape, float(start))
+        done = numpy.zeros(x.shape, dtype=bool)
+        for _ in range(max_iterations):
+            residual, derivative = (numpy.broadcast_to(numpy.asarray(v, dtype=float), x.shape)
+                                    for v in self._system(x, *columns))
+            done |= numpy.abs(residual) <= tolerance
+            step = numpy.where(done, 0.0, -residual / derivative)
+            x = x + step
+            done |= numpy.abs(step) <= tolerance * (1 + numpy.abs(x))
+            if done.all():
+                break
+        return numpy.where(done & numpy.isfinite(x), x, numpy.nan)
@@ -1,3 +1,8 @@
+from fractions import Fraction
+
+from .coefficients import get_coefficient_backend
+
+
 def _is_a(obj, *types):
     """Returns True if obj is any of the given types; False otherwise."""
     types = list(types)
@@ -9,6 +14,9 @@ def _is_a(obj, *types):
         elif isinstance(obj, t): return True
     return False
 
+# the types a coefficient can have (see coefficients)
+NUMBER = (int, float, Fraction)
+
 
 class Variable(object):
     """Base object to represent an unknown value."""
@@ -19,6 +27,10 @@ class Variable(object):
     def __eq__(self, other):
         return (self.label == other.label)
 
+    def __hash__(self):
+        # variables with the same label are the same unknown (see __eq__)
+        return hash(self.label)
+
     def __str__(self):
         return self.label
 
@@ -70,6 +82,9 @@ class Term(object):
     add -- add a given Term, if possible, to this Term by adding coefficients.
     multiply -- multiply this term by an int, float, or Term. 
     power -- raise this Term to the given power.
+    simplify -- does nothing: a Term is always simplified (see operations.set_eager_folding)
+    substitute -- return a new expression with some variables replaced
+    evaluate -- substitute the value of every Variable that has one, in place
     clone -- create a new Term exactly like the current one
 
     Properties:
@@ -93,7 +108,8 @@ class Term(object):
         TypeError -- if anything other than the above is passed in 
 
         Instance variables:
-        coefficient -- the real number multiplying the term
+        coefficient -- the number multiplying the term: an int, Fraction or float,
+            depending on the coefficient backend (see coefficients)
         variables -- list of all variables raised to their respective powers
         """
         # in case there are lists or tuples in factors we'll need to be able to
@@ -102,7 +118,7 @@ class Term(object):
         self.coefficient = 1
         self.variables = []
         for factor in factors:
-            if _is_a(factor, int, float):
+            if _is_a(factor, NUMBER):
                 self.coefficient *= factor
             elif _is_a(factor, str, Variable):
                 self._merge_variable(VariablePower(factor))
@@ -118,6 +134,8 @@ class Term(object):
                 self._merge_variables(factor.variables)
             else:
                 raise TypeError("parameters must be of type int, float, str, Variable, VariablePower, or Term.")
+        # coefficients follow the selected backend (see coefficients.set_coefficient_backend)
+        self.coefficient = get_coefficient_backend().normalize(self.coefficient)
         # just in case there are var^0, clear them now to prevent like-term mistakes
         self._simplify()
     
@@ -130,13 +148,12 @@ class Term(object):
         If division == True, multiply other_var.power by -1 before adding, since
         (x^a)/(x^b) = x^(a-b).
         """
-        # if no variables are multiplying this term, multiply 
-        # all of the incoming variables as is
+        # if no variables are multiplying this term, multiply all of the
+        # incoming variables as is; copies, since they belong to another term
+        # and this one's powers change in place
         if not self.variables:
-            self.variables = other_vars.copy()
-            if division:
-                for var in self.variables:
-                    var.power *= -1
+            sign = 1 if not division else -1
+            self.variables = [VariablePower(var.variable, var.power * sign) for var in other_vars]
             return
 
         to_add = []
@@ -181,14 +198,14 @@ class Term(object):
         ValueError -- if the terms to be added are not like terms
         """
         # allow ints, floats to be added to constants
-        if _is_a(other, int, float) and self.is_constant:
-            self.coefficient += other
+        if _is_a(other, NUMBER) and self.is_constant:
+            self.coefficient = get_coefficient_backend().add(self.coefficient, other)
             return
         if not _is_a(other, Term):
             raise TypeError("{} must be of type Term to add to {}".format(other, self))
         if not self.like_term(other):
             raise ValueError("{} and {} are not like terms".format(self, other))
-        self.coefficient += other.coefficient
+        self.coefficient = get_coefficient_backend().add(self.coefficient, other.coefficient)
         self._simplify()
 
     def multiply(self, other):
@@ -197,29 +214,34 @@ class Term(object):
         Raises:
         TypeError -- if other is a type other than int, float, or Term
         """
-        if _is_a(other, int, float):
-            self.coefficient *= other
+        multiply = get_coefficient_backend().multiply
+        if _is_a(other, NUMBER):
+            self.coefficient = multiply(self.coefficient, other)
         elif _is_a(other, Term) and other.is_constant:
-            self.coefficient *= other.coefficient
+            self.coefficient = multiply(self.coefficient, other.coefficient)
         elif _is_a(other, Term):
-            self.coefficient *= other.coefficient
+            self.coefficient = multiply(self.coefficient, other.coefficient)
             self._merge_variables(other.variables)
         else:
             raise TypeError("must multiply a Term by an int, float, or Term.")
         self._simplify()
     
     def divide(self, other):
-        """Multiply this Term by an int, float, or Term.
+        """Divide this Term by an int, float, or Term.
+
+        With the exact backend (the default) an uneven division of ints gives a
+        Fraction rather than a float (see coefficients).
         
         Raises:
         TypeError -- if other is a type other than int, float, or Term
         """
-        if _is_a(other, int, float):
-            self.coefficient /= other
+        divide = get_coefficient_backend().divide
+        if _is_a(other, NUMBER):
+            self.coefficient = divide(self.coefficient, other)
         elif _is_a(other, Term) and other.is_constant:
-            self.coefficient /= other.coefficient
+            self.coefficient = divide(self.coefficient, other.coefficient)
         elif _is_a(other, Term):
-            self.coefficient /= other.coefficient
+            self.coefficient = divide(self.coefficient, other.coefficient)
             self._merge_variables(other.variables, division=True)
         else:
             raise TypeError("must divide a Term by an int, float, or Term.")
@@ -229,17 +251,43 @@ class Term(object):
         """Raise this Term to the exp power."""
         if not _is_a(exp, int):
             raise ValueError("Terms can only be raised to integer powers")
-        self.coefficient = self.coefficient ** exp
+        self.coefficient = get_coefficient_backend().power(self.coefficient, exp)
         for var in self.variables:
             var.power *= exp
         self._simplify()
 
+    def simplify(self, budget=None):
+        pass
+
+    def substitute(self, values):
+        """Return a new expression with the variables in values replaced.
+
+        See operations.substitute; the result is a Term unless a variable is 
+        replaced by an operation.
+        """
+        # operations imports term, so import it here to avoid a circular import
+        from .operations import substitute
+        return substitute(self, values)
+
+    def evaluate(self):
+        """Substitute the value of every Variable that has one, in place.
+
+        Raises:
+        TypeError -- if a variable's value is an operation; a Term can't hold that
+        """
+        from .operations import _evaluated
+        result = _evaluated(self)
+        if result is None:
+            return
+        if not _is_a(result, Term):
+            raise TypeError("{} can't be evaluated in place; use substitute instead.".format(self))
+        self.coefficient = result.coefficient
+        self.variables = result.variables
+
     def clone(self):
         """Return a new Term instance, cloning all variables."""
-        variables = []
-        for var in self.variables:
-            variables.append(var.clone())
-        return Term(self.coefficient, variables)
+        # the new Term copies the VariablePowers it is given (see _merge_variables)
+        return Term(self.coefficient, self.variables)
 
     @property
     def is_constant(self):
@@ -0,0 +1,642 @@
+import asyncio
+import contextlib
+import io
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from fractions import Fraction
+
+from .operations import ADD, SUB, MULT, DIV, POW, substitute_many, set_eager_folding
+from .operations import get_eager_folding, eager_folding
+from .term import Variable, VariablePower, Term
+from .equation import Equation
+from .newton import NewtonSolver, newton, newton_system, SolveError
+from .derivative import differentiate
+from .parser import Parser
+from .server import SolveServer, SolveClient, ServerError
+from . import parallel
+from .polyarray import PolyArray, numpy
+from .monomial import MonomialEncoder, MonomialOverflow, PackedTerm
+from .order import set_monomial_order, get_monomial_order
+from . import order
+from .budget import Budget, BudgetExceeded
+from . import budget as _budget
+from . import coefficients
+from .multimodular import expand_multimodular
+from .writer import write, to_string
+from .planner import plan, simplify_for
+from .template import Template
+from .groebner import groebner
+from . import spill
+from .identity import equal, is_zero
+from . import threads
+from . import IMPORT_TIME_TARGET
+
+x = Variable("x")
+y = Variable("y")
+xp = []
+yp = []
+for i in range(1, 6):
+    xp.append(VariablePower(x, i))
+    yp.append(VariablePower(y, i))
+
+class ADDTestCase(unittest.TestCase):
+    def setUp(self):
+        self.one = Term(1)
+        self.x_1 = Term(VariablePower(x))
+        self.x_2 = Term(VariablePower(x, 2))
+        self.x_1_plus_one = ADD(self.x_1, self.one)
+        self.x_2_plus_one = ADD(self.x_2, self.one)
+        self.x_2_plus_x_1 = ADD(self.x_2, self.x_1)
+    
+    def test_add_constants(self):
+        two = Term(2)
+        res = ADD(self.one, self.one)
+        res.simplify()
+        self.assertEqual(res.value, two, "incorrect result for adding constants")
+    
+    def test_add_constant_varpow(self):
+        ans = ADD(self.x_1, Term(1))
+        res = ans.clone()
+        res.simplify()
+        self.assertEqual(res.value, ans, "incorrect result for adding constant and variable power")
+
+class SubstituteTestCase(unittest.TestCase):
+    def setUp(self):
+        # 3x + y^2
+        self.expr = ADD(MULT(3, Term(x)), Term(yp[1]))
+
+    def test_substitute_constants(self):
+        res = self.expr.substitute({x: 2, y: 3})
+        self.assertEqual(res, Term(15), "constants were not folded")
+        self.assertEqual(str(self.expr), "3 * [x] + [y^2]", "substitute changed the original")
+
+    def test_substitute_expression(self):
+        res = self.expr.substitute({"x": ADD(Term(y), 1)})
+        self.assertEqual(res, ADD(ADD(Term(3, y), Term(yp[1])), 3))
+
+    def test_substitute_many(self):
+        results = substitute_many(self.expr, [{x: 1}, {x: 2}])
+        self.assertEqual(results, [ADD(Term(yp[1]), 3), ADD(Term(yp[1]), 6)])
+
+    def test_deep_nesting(self):
+        # x / y / y / ..., nested far deeper than the recursion limit
+        expr = Term(x)
+        for i in range(5000):
+            expr = DIV(expr, Term(y))
+        self.assertEqual(expr.substitute({y: 1}), Term(x))
+        self.assertEqual(substitute_many(ADD._join(expr, Term(1)), [{x: 2, y: 1}]), [Term(3)])
+
+class NewtonTestCase(unittest.TestCase):
+    def test_newton(self):
+        # (x + 1)^3 = 8
+        eqn = Equation(x, POW(ADD(Term(x), 1), 3), Term(8))
+        self.assertAlmostEqual(newton(eqn, 0), 1.0)
+
+    def test_newton_system(self):
+        # x^2 + y^2 = 4, x = y
+        eqns = [Equation([x, y], ADD(Term(xp[1]), Term(yp[1])), Term(4)),
+                Equation([x, y], Term(x), Term(y))]
+        root = newton_system(eqns, [1, 0.5])
+        self.assertAlmostEqual(root[0], 2 ** 0.5)
+        self.assertAlmostEqual(root[1], 2 ** 0.5)
+
+    def test_overflow(self):
+        with self.assertRaises(SolveError):
+            newton(Equation(x, Parser("x^3").parse(), Term(8)), 1e200)
+
+    def test_solve_many_backtracks(self):
+        # undamped Newton cycles 0 -> 1 -> 0 on x^3 - 2x + 2
+        solver = NewtonSolver(Equation(x, Parser("x^3 - 2x").parse(), Term(-2)))
+        root = solver.solve(0.0)
+        for found in solver.solve_many([0.0, 1.0, 3.0]):
+            self.assertAlmostEqual(found, root)
+
+    def test_deep_derivative(self):
+        # x / 2 / 2 / ..., nested far deeper than the recursion limit
+        expr = Term(x)
+        for i in range(5000):
+            expr = DIV(expr, Term(2))
+        derivative = differentiate(expr, x)
+        derivative.simplify()
+        self.assertEqual(derivative.value, Term(Fraction(1, 2 ** 5000)))
+
+class ParserTestCase(unittest.TestCase):
+    def test_parse_terms(self):
+        self.assertEqual(Parser("3x^2y").parse(), Term(3, xp[1], y))
+
+    def test_parse_expression(self):
+        res = Parser("2(x + 1)^2").parse()
+        res.simplify()
+        self.assertEqual(res.value, ADD(ADD(Term(2, xp[1]), Term(4, x)), 2))
+
+    def test_parse_error(self):
+        with self.assertRaises(ValueError):
+            Parser("(x + 1").parse()
+
+class ServerTestCase(unittest.TestCase):
+    async def _session(self):
+        server = SolveServer(workers=1)
+        await server.start()
+        client = await SolveClient.connect(*server.address)
+        try:
+            results = await asyncio.gather(*[client.request("simplify", expr="(x + 1)^2") for _ in range(4)])
+            root = await client.request("solve", equation="x^2 = 2", variables=["x"], start=1)
+            with self.assertRaises(ServerError):
+                await client.request("simplify", expr="(x +")
+            return server.stats, results, root
+        finally:
+            await client.close()
+            await server.close()
+
+    def test_end_to_end(self):
+        stats, results, root = asyncio.run(self._session())
+        self.assertEqual(len(set(results)), 1)
+        self.assertAlmostEqual(root, 2 ** 0.5)
+        # the four identical simplify requests were computed once
+        self.assertEqual(stats["coalesced"] + stats["cached"], 3)
+
+    async def _malformed_then_valid(self):
+        server = SolveServer(workers=1)
+        await server.start()
+        client = await SolveClient.connect(*server.address)
+        try:
+            with self.assertRaises(ServerError) as caught:
+                await client.request("solve", equation="x^2", variables=["x"])
+            root = await client.request("solve", equation="x^2 = 2", variables=["x"], start=1)
+            return caught.exception.message, root
+        finally:
+            await client.close()
+            await server.close()
+
+    async def _short_deadline(self):
+        server = SolveServer(workers=1)
+        await server.start()
+        client = await SolveClient.connect(*server.address)
+        try:
+            with self.assertRaises(ServerError):
+                await client.request("simplify", expr="(x + y + z + w + 1)^30", deadline=0.2)
+            # the one worker gave up at the request's deadline, so it is free again
+            return await asyncio.wait_for(client.request("simplify", expr="(x + 1)^2"), 10)
+        finally:
+            await client.close()
+            await server.close()
+
+    def test_request_deadline(self):
+        self.assertEqual(asyncio.run(self._short_deadline()), "[x^2] + 2[x] + 1")
+
+    def test_worker_error(self):
+        message, root = asyncio.run(self._malformed_then_valid())
+        self.assertTrue(message.startswith("EquationError"))
+        self.assertAlmostEqual(root, 2 ** 0.5)
+
+def _multiply_in_worker(terms_a, terms_b):
+    import multiprocessing
+    product = parallel.multiply(terms_a, terms_b, workers=2)
+    return sorted(map(str, product)), len(multiprocessing.active_children())
+
+class ParallelTestCase(unittest.TestCase):
+    def tearDown(self):
+        parallel.shutdown()
+
+    def test_parallel_multiply(self):
+        # (x + y + 1)(x - y + 2)
+        a = ADD(ADD(Term(x), Term(y)), 1)
+        b = ADD(ADD(Term(x), Term(-1, y)), 2)
+        ans = a.clone()
+        ans.distribute(b)
+        ans.simplify()
+        res = parallel.multiply(a.terms, b.terms, workers=2)
+        self.assertEqual(sorted(map(str, res)), sorted(map(str, ans.value.terms)))
+
+    def test_multiply_in_worker(self):
+        from concurrent.futures import ProcessPoolExecutor
+        a = ADD(ADD(Term(x), Term(y)), 1)
+        b = ADD(ADD(Term(x), Term(-1, y)), 2)
+        with ProcessPoolExecutor(1) as pool:
+            product, children = pool.submit(_multiply_in_worker, a.terms, b.terms).result()
+        self.assertEqual(product, sorted(map(str, parallel.multiply(a.terms, b.terms, workers=2))))
+        # no pool was started inside the worker
+        self.assertEqual(children, 0)
+
+    def test_multiply_budget(self):
+        a = Parser("(x + y + 1)^3").parse()
+        a.simplify()
+        budget = Budget()
+        budget.cancel()
+        with self.assertRaises(BudgetExceeded):
+            with _budget.using(budget):
+                parallel.multiply(a.value.terms, a.value.terms, workers=2)
+
+    def test_distribute_threshold(self):
+        a = Parser("(x + y + 1)^3").parse()
+        b = Parser("(x - y + 2)^2").parse()
+        a.simplify()
+        b.simplify()
+        ans = a.value
+        ans.distribute(b.value)
+        ans.simplify()
+        old_threshold, old_workers, multiply = parallel.THRESHOLD, parallel.WORKERS, parallel.multiply
+        calls = []
+        parallel.THRESHOLD, parallel.WORKERS = 1, 2
+        parallel.multiply = lambda *args: calls.append(args) or multiply(*args)
+        try:
+            res = a.value
+            res.distribute(b.value)
+        finally:
+            parallel.THRESHOLD, parallel.WORKERS, parallel.multiply = old_threshold, old_workers, multiply
+        self.assertEqual(len(calls), 1)
+        res.simplify()
+        self.assertEqual(res, ans.value)
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class PolyArrayTestCase(unittest.TestCase):
+    def setUp(self):
+        # x^2 + 2xy + 3
+        self.poly = ADD(ADD(Term(xp[1]), Term(2, x, y)), 3)
+
+    def test_round_trip(self):
+        self.assertEqual(PolyArray.from_expr(self.poly).to_expr(), self.poly)
+
+    def test_add_and_evaluate(self):
+        res = PolyArray.from_expr(self.poly).add(PolyArray.from_expr(Term(-2, x, y)))
+        self.assertEqual(len(res), 2)
+        self.assertEqual(list(res.evaluate({x: numpy.array([1, 2]), y: 5})), [4.0, 7.0])
+
+class PackedTermTestCase(unittest.TestCase):
+    def test_multiply(self):
+        encoder = MonomialEncoder()
+        res = PackedTerm.from_term(Term(2, xp[1], y), encoder)
+        res.multiply(PackedTerm.from_term(Term(3, x), encoder))
+        self.assertEqual(res.to_term(), Term(6, xp[2], y))
+        self.assertTrue(res.like_term(PackedTerm.from_term(Term(xp[2], y), encoder)))
+
+    def test_overflow(self):
+        encoder = MonomialEncoder(bits=2)
+        res = PackedTerm.from_term(Term(xp[2]), encoder)
+        with self.assertRaises(MonomialOverflow):
+            res.multiply(PackedTerm.from_term(Term(x), encoder))
+
+class OrderTestCase(unittest.TestCase):
+    def setUp(self):
+        self.saved_order = get_monomial_order()
+        # y^2 + x + x*y + 1
+        self.poly = ADD(ADD(ADD(Term(yp[1]), Term(x)), Term(x, y)), 1)
+
+    def tearDown(self):
+        set_monomial_order(self.saved_order)
+
+    def test_sorted_terms(self):
+        set_monomial_order("lex")
+        self.poly.simplify()
+        self.assertEqual(list(map(str, self.poly.terms)), ["[x][y]", "[x]", "[y^2]", "1"])
+        set_monomial_order("grlex")
+        self.poly.simplify()
+        self.assertEqual(list(map(str, self.poly.terms)), ["[x][y]", "[y^2]", "[x]", "1"])
+        self.assertEqual(self.poly.leading_term, Term(x, y))
+
+    def test_merge(self):
+        self.poly.simplify()
+        other = ADD(Term(-1, x, y), Term(2, x))
+        other.simplify()
+        res = ADD(self.poly, other)
+        res.simplify()
+        self.assertEqual(res, ADD(ADD(Term(yp[1]), Term(3, x)), 1))
+
+class SimplifyTestCase(unittest.TestCase):
+    def test_deep_nesting(self):
+        # ((((2x + 1)^1 + 1)^1 + 1)^1 ..., nested far deeper than the recursion limit
+        expr = MULT(Term(x), 2)
+        for i in range(5000):
+            expr = POW(ADD._join(expr, Term(1)), 1)
+        expr.simplify()
+        self.assertEqual(expr.value, ADD(Term(2, x), 5000))
+
+    def test_quotient_of_sums(self):
+        expr = Parser("(x + 1)/(x + 2)").parse()
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            expr.simplify()
+        self.assertEqual(out.getvalue(), "")
+        self.assertEqual(str(expr.value), "([x] + 1) / ([x] + 2)")
+
+    def test_power_of_trinomial(self):
+        res = POW(ADD(ADD(Term(x), Term(y)), 1), 2)
+        res.simplify()
+        self.assertEqual(res.value, ADD(ADD(ADD(ADD(ADD(Term(xp[1]), Term(2, x, y)), Term(yp[1])),
+                                                Term(2, x)), Term(2, y)), 1))
+
+class BudgetTestCase(unittest.TestCase):
+    def test_estimate(self):
+        expr = Parser("(a + b + c + d + e)^60").parse()
+        with self.assertRaises(BudgetExceeded):
+            expr.simplify(Budget(max_terms=100000))
+
+    def test_partial_state(self):
+        expr = Parser("(x + 1)^3(x - 2)^2 + 3(x + 2)(x - 1)").parse()
+        with self.assertRaises(BudgetExceeded):
+            expr.simplify(Budget(max_nodes=20))
+        # stopped part way, but still the same expression
+        self.assertEqual(expr.substitute({x: 3}), Term(1 * 64 + 30))
+
+    def test_cancel(self):
+        budget = Budget()
+        budget.cancel()
+        with self.assertRaises(BudgetExceeded):
+            newton(Equation(x, Term(xp[1]), Term(2)), 1, budget=budget)
+
+class EagerFoldingTestCase(unittest.TestCase):
+    def setUp(self):
+        set_eager_folding(True)
+
+    def tearDown(self):
+        set_eager_folding(False)
+
+    def test_constants(self):
+        self.assertEqual(ADD(1, 2), Term(3))
+        self.assertEqual(MULT(3, Term(4)), Term(12))
+        self.assertEqual(POW(2, 10), Term(1024))
+        self.assertEqual(SUB(0, Term(x)), Term(-1, x))
+
+    def test_identities(self):
+        sum_ = ADD(Term(x), 1)
+        self.assertEqual(MULT(1, sum_), sum_)
+        self.assertEqual(MULT(sum_, 0), Term(0))
+        self.assertIs(POW(sum_, 1), sum_)
+        self.assertIsInstance(DIV(sum_, 2), DIV)
+
+class CoefficientTestCase(unittest.TestCase):
+    def test_exact_division(self):
+        res = Term(1, x)
+        res.divide(3)
+        self.assertEqual(res.coefficient, Fraction(1, 3))
+        res.multiply(3)
+        self.assertIs(type(res.coefficient), int)
+
+    def test_modular(self):
+        with coefficients.using("modular", 7):
+            res = Parser("(x + 1)^7").parse()
+            res.simplify()
+            self.assertEqual(res.value, ADD(Term((x, 7)), 1))
+        # 4 has no inverse modulo 6
+        with self.assertRaises(ValueError):
+            coefficients.set_coefficient_backend("modular", 6)
+
+    def test_multimodular(self):
+        expr = Parser("(123456789x - 987654321y + 55555)^6").parse()
+        ans = expr.clone()
+        ans.simplify()
+        self.assertEqual(expand_multimodular(expr), ans.value)
+        for text in ["(x + 1)^2 / (x - 1)", "(x + 1)^-2"]:
+            with self.assertRaises(ValueError):
+                expand_multimodular(Parser(text).parse())
+
+class WriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.expr = Parser("2(x + 1)^2 - 3x^2y/(y + 1) - 2/3").parse()
+
+    def test_styles(self):
+        self.assertEqual(to_string(self.expr, "parser"), "2*(x + 1)^2 + -3*x^2*y/(y + 1) - (2/3)")
+        self.assertEqual(to_string(self.expr, "latex"),
+                         "2 \\cdot \\left(x + 1\\right)^{2} + \\frac{-3x^{2}y}{y + 1} - \\frac{2}{3}")
+
+    def test_round_trip(self):
+        expr = Parser("(x - 2y + 1)^3 - x/3").parse()
+        expr.simplify()
+        expr = expr.value
+        res = Parser(to_string(expr, "parser")).parse()
+        res.simplify()
+        self.assertEqual(res.value, expr)
+
+    def test_deep(self):
+        expr = Term(x)
+        for i in range(5000):
+            expr = POW(ADD._join(expr, Term(1)), 2)
+        out = io.StringIO()
+        write(expr, out, "parser", buffer_size=100)
+        self.assertTrue(out.getvalue().startswith("(" * 5000 + "x + 1)^2 + 1)^2"))
+
+class PlannerTestCase(unittest.TestCase):
+    def test_estimates(self):
+        # (x + y + 1)^12 has C(14, 2) = 91 terms
+        p = plan(POW(Parser("x + y + 1").parse(), 12), "evaluate")
+        self.assertEqual(p.estimates["expanded"]["size"], 91)
+        self.assertEqual(p.strategy, "factored")
+        self.assertEqual(plan(p.expr, "compare").strategy, "expanded")
+
+    def test_partial(self):
+        expr = Parser("(x + y)^20 + (x + 1)(x - 1)").parse()
+        p = plan(expr, "evaluate")
+        p.apply(strategy="partial")
+        self.assertEqual(str(expr.value), "[x^2] + -1 + ([x] + [y])^20")
+
+    def test_apply(self):
+        expr = Parser("(x + 1)(y + 2) + 3(x + 1)").parse()
+        expected = expr.clone()
+        expected.simplify()
+        self.assertEqual(simplify_for(expr, "compare").strategy, "expanded")
+        self.assertEqual(expr.value, expected.value)
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class TemplateTestCase(unittest.TestCase):
+    def test_quadratic(self):
+        t = Template(Equation(x, eqn_str="a x^2 + b x + c = 0"), ["a", "b", "c"])
+        roots = t.solve(numpy.array([[1, -3, 2], [0, 2, -4], [2, 0, -8]]))
+        self.assertEqual(roots[:, 0].tolist(), [2, 2, -2])
+        self.assertEqual(roots[0, 1], 1)
+        self.assertTrue(numpy.isnan(roots[1, 1]))
+
+    def test_numeric(self):
+        t = Template(Equation(x, eqn_str="x^3 + p x = q"), ["p", "q"])
+        roots = t.solve({"p": numpy.array([1.0, 2.0]), "q": numpy.array([2.0, 3.0])}, start=1)
+        self.assertEqual(roots.tolist(), [[1.0], [1.0]])
+
+class GroebnerTestCase(unittest.TestCase):
+    def test_basis(self):
+        g = groebner([Parser("x^3 - 2x y").parse(), Parser("x^2 y - 2y^2 + x").parse()], order="grlex")
+        self.assertEqual([str(p) for p in g.polynomials], ["[y^2] + -1/2[x]", "[x][y]", "[x^2]"])
+        self.assertTrue(g.contains(Parser("x^2 + x y").parse()))
+        with coefficients.using("modular", 32003):
+            g = groebner([Parser("x^3 - 2x y").parse(), Parser("x^2 y - 2y^2 + x").parse()], order="grlex")
+        self.assertEqual(str(g.polynomials[0]), "[y^2] + 16001[x]")
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_triangular(self):
+        eqns = [Equation([x, y], eqn_str="x^2 + y^2 = 1"), Equation([x, y], eqn_str="x = y")]
+        g = groebner(eqns, order="lex")
+        self.assertEqual([(label, [str(p) for p in group]) for label, group in g.triangular()],
+                         [("y", ["[y^2] + -1/2"]), ("x", ["[x] + -1[y]"])])
+        roots = sorted(round(s["x"], 9) for s in g.solve())
+        self.assertEqual(roots, [round(-0.5 ** 0.5, 9), round(0.5 ** 0.5, 9)])
+
+_IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+from pylgebra import Parser, Term
+Parser("x^2 + 1").parse()
+print(time.perf_counter() - start)
+print(" ".join(m for m in ("numpy", "asyncio", "multiprocessing", "concurrent.futures", "unittest")
+               if m in sys.modules))
+"""
+
+class ImportTestCase(unittest.TestCase):
+    def test_cold_import(self):
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.run([sys.executable, "-c", _IMPORT_PROBE], cwd=root, check=True,
+                             capture_output=True, text=True).stdout.split("\n")
+        self.assertEqual(out[1], "")
+        self.assertLess(float(out[0]), IMPORT_TIME_TARGET)
+
+class FingerprintTestCase(unittest.TestCase):
+    def test_canonical(self):
+        eqn = Equation([x, y], eqn_str="3 = y x 2 + x^2")
+        self.assertEqual(str(eqn.canonical()), "[x^2] + 2[x][y] + -3 = 0 | for x, y")
+        self.assertEqual(eqn.fingerprint(), Equation([x, y], eqn_str="2x^2 + 4x y = 6").fingerprint())
+        self.assertEqual(len(eqn.fingerprint()), 32)
+
+    def test_rename(self):
+        a = Equation([x, y], eqn_str="2x^2 + 4x y = 6")
+        b = Equation([Variable("q"), Variable("p")], eqn_str="2q^2 + 4p q - 6 = 0")
+        self.assertNotEqual(a.fingerprint(), b.fingerprint())
+        self.assertEqual(a.fingerprint(rename=True), b.fingerprint(rename=True))
+        self.assertNotEqual(a.fingerprint(rename=True), Equation([x, y], eqn_str="x^2 + 2x y = 1").fingerprint(True))
+
+    def test_rename_quotient(self):
+        a = Equation([x, y], eqn_str="x/(x + 2y^2) = y")
+        b = Equation([Variable("q"), Variable("p")], eqn_str="q/(q + 2p^2) = p")
+        self.assertEqual(a.fingerprint(rename=True), b.fingerprint(rename=True))
+        self.assertNotEqual(a.fingerprint(rename=True), Equation([x, y], eqn_str="x/(y + 2x^2) = y").fingerprint(True))
+
+    def test_rename_nested_sum(self):
+        a = Equation([x, y], eqn_str="1/(x + y) + x^2 = 0")
+        b = Equation([Variable("q"), Variable("p")], eqn_str="1/(q + p) + q^2 = 0")
+        self.assertEqual(str(a.canonical(rename=True)), str(b.canonical(rename=True)))
+        self.assertEqual(a.fingerprint(rename=True), b.fingerprint(rename=True))
+
+    def test_order_independent(self):
+        eqn = Equation([x, y], eqn_str="1/(x + y^2) = x")
+        with order.using("lex"):
+            lex = eqn.fingerprint()
+        self.assertEqual(lex, eqn.fingerprint())
+
+class SpillTestCase(unittest.TestCase):
+    def test_expand(self):
+        expr = Parser("(x + y - z + 2)^5 - (x/2 - 1)(y + 3)^2").parse()
+        expected = expr.clone()
+        expected.simplify()
+        with spill.expand_external(expr, max_terms=7) as res:
+            self.assertEqual(len(res), len(expected.value.terms))
+            got = res.to_expr()
+            got.simplify()
+            self.assertEqual(got.value, expected.value)
+
+    def test_runs(self):
+        old = spill.MAX_FANIN
+        spill.MAX_FANIN = 3
+        try:
+            combiner = spill.ExternalCombiner(max_terms=4)
+            for i in range(40):
+                combiner.add(Term(i % 3 - 1, (x, i % 10)))
+            self.assertGreater(combiner.runs, spill.MAX_FANIN)
+            with combiner.finish() as res:
+                self.assertEqual([str(term) for term in res],
+                                 ["-1", "[x^2]", "-1[x^3]", "[x^5]", "-1[x^6]", "[x^8]", "-1[x^9]"])
+        finally:
+            spill.MAX_FANIN = old
+
+    @unittest.skipIf(numpy is None, "NumPy is not installed")
+    def test_save(self):
+        with spill.expand_external(Parser("(x + y)^4").parse(), max_terms=2) as res, \
+                tempfile.TemporaryDirectory() as path:
+            array = res.save(path)
+            self.assertEqual(sorted(array.coefficients.tolist()), [1, 1, 4, 4, 6])
+            self.assertEqual(array.exponents.sum(axis=1).tolist(), [4] * 5)
+
+class IdentityTestCase(unittest.TestCase):
+    def test_equal(self):
+        rng = random.Random(0)
+        self.assertTrue(equal(Parser("(x + y + z + 1)^30").parse(), Parser("((z + 1 + y + x)^15)^2").parse(), rng=rng))
+        self.assertFalse(equal(Parser("(x + y)^20").parse(), Parser("(x + y)^19 (x + y + 1)").parse(), rng=rng))
+        self.assertTrue(equal(Parser("(x + 1)/(x - 1)").parse(), Parser("1 + 2/(x - 1)").parse(), rng=rng))
+        self.assertTrue(is_zero(Parser("(x + y)(x - y) - x^2 + y^2").parse(), rng=rng))
+        self.assertFalse(equal(Parser("2x + 1").parse(), Parser("x + 1").parse()))
+
+    def test_floats(self):
+        # no value modulo a prime; compared exactly
+        self.assertTrue(equal(Parser("(0.5x + 1)^2").parse(), Parser("0.25x^2 + x + 1").parse()))
+        self.assertFalse(equal(Parser("(0.5x + 1)^2").parse(), Parser("0.25x^2 + 1").parse()))
+
+    def test_fractional_exponents(self):
+        # no value modulo a prime, and can't be multiplied out
+        root = POW(ADD(Term(x), 1), 0.5)
+        self.assertTrue(equal(root, root.clone()))
+        with self.assertRaises(ValueError):
+            equal(root, POW(ADD(Term(y), 1), 0.5))
+
+class ThreadsTestCase(unittest.TestCase):
+    def test_simplify_all(self):
+        exprs = [Parser("(x + {})^3".format(i)).parse() for i in range(6)]
+        before = [str(expr) for expr in exprs]
+        results = threads.simplify_all(exprs, workers=3)
+        expected = []
+        for expr in exprs:
+            expr = expr.clone()
+            expr.simplify()
+            expected.append(expr.value)
+        self.assertEqual(results, expected)
+        self.assertEqual([str(expr) for expr in exprs], before)
+
+    def test_shared_expression(self):
+        expr = Parser("(x + y)^3 - 2x y + 3").parse()
+        before = str(expr)
+        maps = [{"x": i, "y": Term(2, Variable("z"))} for i in range(20)]
+        results = threads.substitute_all(expr, maps, workers=4)
+        self.assertEqual(results, substitute_many(expr, maps))
+        self.assertEqual(str(expr), before)
+
+    def test_backend_per_thread(self):
+        seen = []
+        with coefficients.using("modular", 7):
+            thread = threading.Thread(target=lambda: seen.append(coefficients.get_coefficient_backend().name))
+            thread.start()
+            thread.join()
+            # the pool uses the caller's backend
+            result = threads.simplify_all([Parser("4x + 5x").parse()] * 2, workers=2)
+        self.assertEqual(seen, ["exact"])
+        self.assertEqual([str(term) for term in result], ["2[x]", "2[x]"])
+
+    def test_order_per_thread(self):
+        seen = []
+        with order.using("lex"):
+            thread = threading.Thread(target=lambda: seen.append(get_monomial_order()))
+            thread.start()
+            thread.join()
+            # the pool uses the caller's order
+            result = threads.simplify_all([Parser("y^2 + x").parse()] * 2, workers=2)
+        self.assertEqual(seen, ["grlex"])
+        self.assertEqual([str(expr) for expr in result], ["[x] + [y^2]"] * 2)
+
+    def test_eager_folding_per_thread(self):
+        seen = []
+        with eager_folding(True):
+            thread = threading.Thread(target=lambda: seen.append(get_eager_folding()))
+            thread.start()
+            thread.join()
+            self.assertEqual(ADD(2, 3), Term(5))
+        self.assertEqual(seen, [False])
+        self.assertNotIsInstance(ADD(2, 3), Term)
+
+    def test_no_shared_powers(self):
+        term = Term(x)
+        quotient = Term(2)
+        quotient.divide(term)
+        quotient.power(3)
+        self.assertEqual(str(term), "[x]")
+        self.assertEqual(str(quotient), "8[x^-3]")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+"""Simplify and substitute in a thread pool, sharing the expressions between threads.
+
+Thread-safety model:
+
+- Expressions are not frozen, and nothing here checks that they aren't
+  changed. What is guaranteed: clone, value, terms, str and the writer,
+  substitute and substitute_many, compile_expr, differentiate, identity.equal
+  and plan leave their input as it is, and what they return shares no
+  mutable object with it. So any number of threads may call them on an
+  expression that no thread changes.
+- simplify, evaluate, distribute, Plan.apply and the arithmetic methods of
+  Term change the expression in place. Only one thread may call them on it,
+  and no other thread may read it meanwhile.
+- simplify_all and substitute_all copy their expressions before any task
+  starts, and the tasks only work on those copies: the inputs are never
+  changed, and changing them once the call has returned doesn't affect the
+  results. They must not be changed while the call is copying them.
+- Settings: the coefficient backend, monomial order and eager folding
+  selected with coefficients.using(), order.using() and
+  operations.eager_folding() apply to the thread that selected them (the
+  parser and expand_multimodular rely on that), and the functions here run
+  their tasks with the caller's. set_coefficient_backend, set_monomial_order
+  and set_eager_folding set the process-wide defaults every other thread
+  uses. The current Budget (see budget.using) is per thread too.
+- Caches: a writer's factor cache is a plain dict, safe to share. Two threads
+  may both compute the same entry, and either result is the same. A
+  Differentiator's memo numbers subexpressions as it goes, so give each
+  thread its own.
+
+On builds of CPython with the GIL, threads take turns running Python code, so
+CPU bound batches don't get faster here, and WORKERS defaults to one thread;
+the process pool (see parallel and server) runs them at the same time. On
+free-threaded builds the threads run at the same time with no pickling.
+"""
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from .operations import OPERATION, substitute_many, get_eager_folding, eager_folding
+from .term import Term, _is_a
+from .coefficients import get_coefficient_backend, _selected
+from .order import get_monomial_order, using as _using_order
+from . import budget as _budget
+
+
+# True on a free-threaded build of CPython with the GIL disabled.
+FREE_THREADED = not getattr(sys, "_is_gil_enabled", lambda: True)()
+
+# Threads per call; None: one per CPU on a free-threaded build, otherwise one
+# (with the GIL, more threads only add switching).
+WORKERS = None
+
+
+def _workers(workers):
+    if workers is not None:
+        return workers
+    if WORKERS is not None:
+        return WORKERS
+    return (os.cpu_count() or 1) if FREE_THREADED else 1
+
+def _map(task, items, workers, budget):
+    """task(item) for each item in a thread pool; every thread uses the caller's
+    coefficient backend, monomial order, eager folding and budget."""
+    backend = get_coefficient_backend()
+    order = get_monomial_order()
+    eager = get_eager_folding()
+
+    def run(item):
+        with _selected(backend), _using_order(order), eager_folding(eager), _budget.using(budget):
+            return task(item)
+
+    workers = _workers(workers)
+    if workers <= 1 or len(items) <= 1:
+        return [run(item) for item in items]
+    with ThreadPoolExecutor(workers) as pool:
+        return list(pool.map(run, items))
+
+def _simplified(expr):
+    """Simplify expr, a copy owned by the task."""
+    if _is_a(expr, Term):
+        return expr
+    expr.simplify()
+    return expr.value
+
+def simplify_all(exprs, budget=None, workers=None):
+    """Return the simplified value of each expression, simplifying them in a thread pool.
+
+    The expressions are copied before the tasks start, and not changed: each
+    task simplifies its own copy.
+
+    budget -- optional budget.Budget shared by the whole batch; cancelling it
+        stops every task (its node count is approximate, since the tasks count
+        into it concurrently)
+    workers -- number of threads (see WORKERS)
+    """
+    exprs = list(exprs)
+    for expr in exprs:
+        if not _is_a(expr, Term, OPERATION):
+            raise TypeError("{} must be a Term or operation to simplify.".format(expr))
+    return _map(_simplified, [expr.clone() for expr in exprs], workers, budget)
+
+def substitute_all(expr, value_maps, budget=None, workers=None):
+    """Substitute each of the value_maps into expr in a thread pool; returns a list of results.
+
+    Like operations.substitute_many, whose work the threads split between them:
+    each thread substitutes a share of the maps into one copy of expr, which
+    they all read and none of them changes.
+    """
+    if not _is_a(expr, Term, OPERATION):
+        raise TypeError("{} must be a Term or operation to substitute into.".format(expr))
+    expr = expr.clone()
+    value_maps = list(value_maps)
+    workers = _workers(workers)
+    size = max(1, -(-len(value_maps) // workers))
+    chunks = [value_maps[i:i + size] for i in range(0, len(value_maps), size)]
+    results = _map(lambda chunk: substitute_many(expr, chunk), chunks, workers, budget)
+    return [result for chunk in results for result in chunk]
@@ -9,6 +9,12 @@ OPERATORS = (PLUS, MINUS, STAR, SLASH, LEFT_PAREN, RIGHT_PAREN, POWER)
 NUMBER = "number"
 VARIABLE = "variable"
 
+def kind(token):
+    """Return NUMBER, VARIABLE, or the operator itself for a token."""
+    if token[0].isdigit(): return NUMBER
+    if token.isalpha(): return VARIABLE
+    return token
+
 class TokenList(object):
     def __init__(self, equation):
         self.tokens = []
@@ -31,6 +37,7 @@ class TokenList(object):
                 index = self._consume_real(index)
             else:
                 self._err(self.equation, "unrecognized character: " + char)
+        return self
 
     def _consume_real(self, index):
         decimal = False
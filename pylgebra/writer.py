@@ -0,0 +1,233 @@
+import io
+import math
+from decimal import Decimal
+from fractions import Fraction
+
+from .operations import ADD, MULT, DIV, POW, OPERATION
+from .term import Term, _is_a
+
+
+# Output styles:
+# text -- the notation of str(): 3[x^2][y] + 2 * ([x] + 1)
+# parser -- text Parser reads back to the same expression: 3*x^2*y + 2*(x + 1)
+# latex -- LaTeX math: 3x^{2}y + 2\left(x + 1\right)
+STYLES = ("text", "parser", "latex")
+
+# Precedence of what is written, lowest binding first. A node written where a
+# higher precedence is needed gets parentheses.
+_SUM, _PRODUCT, _POWER, _ATOM = range(4)
+
+
+def _number(number, style):
+    """Source for a coefficient or exponent."""
+    if style == "text" or type(number) is int:
+        return str(number)
+    if type(number) is Fraction:
+        if style == "latex":
+            sign = "-" if number < 0 else ""
+            return "{}\\frac{{{}}}{{{}}}".format(sign, abs(number.numerator), number.denominator)
+        return "({}/{})".format(number.numerator, number.denominator)
+    if not math.isfinite(number):
+        raise ValueError("{} can't be written as a number".format(number))
+    # the tokenizer reads neither exponents nor "inf"
+    source = repr(number)
+    return format(Decimal(source), "f") if "e" in source or "E" in source else source
+
+def _label(label, style):
+    if style == "latex" and len(label) > 1:
+        return "\\mathrm{{{}}}".format(label)
+    return label
+
+def _term_precedence(term):
+    if term.is_constant:
+        return _ATOM if term.coefficient >= 0 and not _is_a(term.coefficient, Fraction) else _PRODUCT
+    if term.coefficient != 1 or len(term.variables) > 1:
+        return _PRODUCT
+    return _ATOM if term.variables[0].power == 1 else _POWER
+
+def _precedence(expr):
+    if _is_a(expr, Term): return _term_precedence(expr)
+    if _is_a(expr, ADD): return _SUM
+    if _is_a(expr, MULT, DIV): return _PRODUCT
+    return _POWER
+
+
+class _Writer(object):
+    """Writes an expression to a file piece by piece, with an explicit stack.
+
+    The stack holds pieces of text still to write and the nodes still to expand,
+    in reverse order. Sums and products are flattened as they are expanded, so
+    long right-nested sums (the way simplified sums are packed) keep the stack
+    a constant size. Written text is collected in a small buffer, flushed to the
+    file whenever it fills.
+    """
+    def __init__(self, file, style, buffer_size):
+        if style not in STYLES:
+            raise ValueError("unknown style: {}".format(style))
+        self.file = file
+        self.style = style
+        self.buffer_size = buffer_size
+        self._pieces = []
+        self._size = 0
+        # the source of each (label, power) factor, made once per monomial factor
+        self._factors = {}
+
+    def _emit(self, text):
+        self._pieces.append(text)
+        self._size += len(text)
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        if self._pieces:
+            self.file.write("".join(self._pieces))
+            self._pieces = []
+            self._size = 0
+
+    def _open(self):
+        return "\\left(" if self.style == "latex" else "("
+
+    def _close(self):
+        return "\\right)" if self.style == "latex" else ")"
+
+    def write(self, expr):
+        # items are str (written as they are), (node, minimum precedence), or
+        # ("sum", node, first) for the terms of a sum
+        stack = [(expr, _SUM)]
+        while stack:
+            item = stack.pop()
+            if _is_a(item, str):
+                self._emit(item)
+            elif len(item) == 3:
+                self._sum_item(stack, item[1], item[2])
+            else:
+                node, minimum = item
+                if _precedence(node) < minimum:
+                    stack.append(self._close())
+                    stack.append((node, _SUM))
+                    self._emit(self._open())
+                else:
+                    self._node(stack, node)
+        self.flush()
+
+    def _factor(self, var):
+        key = (var.variable.label, var.power)
+        factor = self._factors.get(key)
+        if factor is None:
+            style = self.style
+            if style == "text":
+                factor = "[{}]".format(var)
+            else:
+                factor = _label(var.base.label, style)
+                if var.power != 1:
+                    power = _number(var.power, style)
+                    factor += "^{{{}}}".format(power) if style == "latex" else "^" + power
+            self._factors[key] = factor
+        return factor
+
+    def _term(self, term, coefficient=None):
+        """The source of a Term, optionally with a different coefficient; Terms are
+        flat, so this never recurses."""
+        if coefficient is None:
+            coefficient = term.coefficient
+        style = self.style
+        cache = self._factors
+        factors = [cache.get((var.variable.label, var.power)) or self._factor(var) for var in term.variables]
+        if style == "text":
+            if coefficient != 1 or not factors:
+                factors.insert(0, str(coefficient))
+            return "".join(factors)
+        if not factors or coefficient not in (1, -1):
+            factors.insert(0, _number(coefficient, style))
+        elif coefficient == -1:
+            return "-" + ("".join(factors) if style == "latex" else "*".join(factors))
+        return "".join(factors) if style == "latex" else "*".join(factors)
+
+    def _sum_term(self, term, first):
+        """Write a Term of a sum, with the sign as its separator."""
+        coefficient = term.coefficient
+        if self.style != "text" and coefficient < 0:
+            text = self._term(term, -coefficient)
+            if _term_precedence(term) < _PRODUCT:
+                text = self._open() + text + self._close()
+            separator = "-" if first else " - "
+        else:
+            text = self._term(term)
+            separator = "" if first else " + "
+        self._pieces.append(separator)
+        self._pieces.append(text)
+        self._size += len(text) + 3
+        if self._size >= self.buffer_size:
+            self.flush()
+
+    def _sum_item(self, stack, node, first):
+        # write the Terms along the right spine of the sum directly, which is
+        # where all the terms of a simplified sum are (isinstance rather than
+        # _is_a, since this runs once per term)
+        while isinstance(node, ADD):
+            augend = node._augend
+            if not isinstance(augend, Term):
+                stack.append(("sum", node._addend, False))
+                stack.append(("sum", augend, first))
+                return
+            self._sum_term(augend, first)
+            first = False
+            node = node._addend
+        if isinstance(node, Term):
+            self._sum_term(node, first)
+            return
+        if not first:
+            self._emit(" + ")
+        stack.append((node, _SUM))
+
+    def _node(self, stack, node):
+        style = self.style
+        if _is_a(node, Term):
+            self._emit(self._term(node))
+        elif _is_a(node, ADD):
+            stack.append(("sum", node, True))
+        elif _is_a(node, MULT):
+            separator = {"text": " * ", "parser": "*", "latex": " \\cdot "}[style]
+            stack.append((node._multiplier, _PRODUCT))
+            stack.append(separator)
+            stack.append((node._multiplicand, _PRODUCT))
+        elif _is_a(node, DIV):
+            if style == "latex":
+                stack.extend(("}", (node._divisor, _SUM), "}{", (node._dividend, _SUM)))
+                self._emit("\\frac{")
+            else:
+                stack.append((node._divisor, _POWER))
+                stack.append(" / " if style == "text" else "/")
+                stack.append((node._dividend, _PRODUCT))
+        elif _is_a(node, POW):
+            exponent = _number(node._exponent, style)
+            if style == "latex":
+                stack.append("^{{{}}}".format(exponent))
+            else:
+                stack.append("^" + exponent)
+            if style == "text":
+                # str() has always put the base of a power in parentheses
+                stack.extend((")", (node._base, _SUM)))
+                self._emit("(")
+            else:
+                stack.append((node._base, _ATOM))
+        else:
+            raise TypeError("{} must be a Term or operation to write.".format(node))
+
+
+def write(expr, file, style="text", buffer_size=1 << 16):
+    """Write expr to the file-like object file, in one of STYLES.
+
+    The expression is walked without recursion and written in pieces of about
+    buffer_size characters, so neither the depth nor the size of the expression
+    is limited by the Python stack or by memory for the output.
+    """
+    if not _is_a(expr, Term, OPERATION):
+        raise TypeError("{} must be a Term or operation to write.".format(expr))
+    _Writer(file, style, buffer_size).write(expr)
+
+def to_string(expr, style="text"):
+    """Return the text write would produce."""
+    out = io.StringIO()
+    write(expr, out, style)
+    return out.getvalue()